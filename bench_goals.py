@@ -0,0 +1,68 @@
+"""
+Goal generation timing: one LLM call per persona (unique_goal) vs batched async requests,
+with a simulated per-call latency so no API key is needed.
+
+Usage:
+  python bench_goals.py --count 1000 --latency 0.8 --skip_sequential
+  python bench_goals.py --count 200 --latency 0.05
+"""
+import argparse, asyncio, random, time
+from typing import Dict, List
+
+import generate_personas as gp
+
+def build(count: int, seed: int) -> List[Dict]:
+    random.seed(seed)
+    return [gp.build_diverse(i + 1) for i in range(count)]
+
+def fake_goal(diet: str, mode: str, budget: int, n: int) -> str:
+    return f"Order a {diet} {gp.FOODS[n % len(gp.FOODS)]} ({mode}, under ${budget}) near campus v{n}"
+
+def run_sequential(personas: List[Dict], latency: float) -> float:
+    n = [0]
+    def llm_goal_one(diet, location, mode, budget, access):
+        time.sleep(latency); n[0] += 1
+        return fake_goal(diet, mode, budget, n[0])
+    orig, orig_flag = gp.llm_goal_one, gp.USE_OPENAI
+    gp.llm_goal_one, gp.USE_OPENAI = llm_goal_one, True
+    try:
+        t0 = time.perf_counter()
+        used = set()
+        for p in personas:
+            p["goal"] = gp.unique_goal(p["diet"], p["location"], p["income"], p["accessibility"], used)
+        return time.perf_counter() - t0
+    finally:
+        gp.llm_goal_one, gp.USE_OPENAI = orig, orig_flag
+
+def run_batched(personas: List[Dict], latency: float, batch: int, concurrency: int, rpm: int):
+    async def request(rows):
+        await asyncio.sleep(latency * (1 + len(rows) / 20))  # longer completions for bigger batches
+        return {r["i"]: fake_goal(r["diet"], r["mode"], r["budget"], r["i"]) for r in rows}
+    t0 = time.perf_counter()
+    st = asyncio.run(gp.generate_goals_batched(personas, set(), batch_size=batch, concurrency=concurrency,
+                                               rpm=rpm, request=request))
+    return time.perf_counter() - t0, st
+
+def main(args):
+    print(f"{args.count} personas, simulated latency {args.latency:.2f}s/call")
+    if not args.skip_sequential:
+        t = run_sequential(build(args.count, args.seed), args.latency)
+        print(f"  sequential : {t:8.2f}s  ({args.count} calls)")
+    else:
+        print(f"  sequential : {args.count * args.latency:8.2f}s  (estimated, {args.count} calls)")
+    personas = build(args.count, args.seed)
+    t, st = run_batched(personas, args.latency, args.batch_size, args.concurrency, args.rpm)
+    print(f"  batched    : {t:8.2f}s  ({st['calls']} calls, batch {args.batch_size}, "
+          f"{args.concurrency} in flight, {st['local_goals']} local fallbacks)")
+    gp.validate_diverse(personas)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--count", type=int, default=1000)
+    ap.add_argument("--latency", type=float, default=0.8, help="Simulated seconds per LLM call")
+    ap.add_argument("--batch_size", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rpm", type=int, default=0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--skip_sequential", action="store_true", help="Estimate the sequential time instead of waiting for it")
+    main(ap.parse_args())
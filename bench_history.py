@@ -0,0 +1,81 @@
+"""
+Memory / token comparison: raw dict history vs compact History records on synthetic 60-step sessions.
+
+Usage:
+  python bench_history.py --steps 60 --sessions 200
+"""
+import argparse, json, random, time, tracemalloc
+from typing import Dict, Any, List
+
+from run_operators import History, digest_history, summarize_history, estimate_tokens
+
+SELECTORS = [
+    "button:has-text('Accept')", "input[placeholder*='Search']", "div[data-testid='store-card'] >> nth=0",
+    "button:has-text('Add to cart')", "button[aria-label='Filters']", "text=Vegan", "a[href*='/store/']",
+]
+TAGS = ["budget_met", "budget_over", "diet_mismatch", "label_ambiguous", "milestone_item_added", "filter_missing"]
+
+def synth_session(rng: random.Random, steps: int) -> List[str]:
+    """Raw model outputs as JSON strings, like act_with_llm receives them."""
+    out = []
+    for i in range(1, steps + 1):
+        kind = rng.choice(["click", "type", "wait_for", "wait_ms", "note", "warn"])
+        if kind == "note":
+            d = {"action": "note", "tag": rng.choice(TAGS), "detail": f"${rng.randint(8, 16)} vs ${rng.randint(9, 14)} target"}
+        elif kind == "warn":
+            d = {"warn": f"selector_missing {rng.choice(SELECTORS)}"}
+        else:
+            d = {"action": kind, "selector": rng.choice(SELECTORS), "text": "vegan ramen" if kind == "type" else "",
+                 "ms": rng.choice([350, 700, 1200]), "state": "visible"}
+        d["step"] = i
+        out.append(json.dumps(d))
+    return out
+
+def measure(build, raws: List[List[str]]) -> int:
+    tracemalloc.start()
+    keep = [build(r) for r in raws]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    return size
+
+def main(args):
+    rng = random.Random(args.seed)
+    raws = [synth_session(rng, args.steps) for _ in range(args.sessions)]
+
+    mem_dict = measure(lambda r: [json.loads(x) for x in r], raws)
+    mem_rec = measure(lambda r: History(json.loads(x) for x in r), raws)
+
+    # per-step digest cost over a whole session (what the agent loop pays every step)
+    sess = [json.loads(x) for x in raws[0]]
+    t0 = time.perf_counter()
+    lst: List[Dict[str, Any]] = []
+    for h in sess:
+        lst.append(h); digest_history(lst, args.history_k)
+    t_list = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    H = History()
+    for h in sess:
+        H.append(h); digest_history(H, args.history_k)
+    t_hist = time.perf_counter() - t0
+
+    tok_raw = sum(estimate_tokens(json.dumps([json.loads(x) for x in r])) for r in raws) / len(raws)
+    tok_sum = sum(estimate_tokens(json.dumps(summarize_history([json.loads(x) for x in r], args.keep_recent)))
+                  for r in raws) / len(raws)
+
+    print(f"{args.sessions} sessions × {args.steps} steps")
+    print(f"  memory   dict history : {mem_dict / 1024:8.1f} KiB")
+    print(f"  memory   StepRecords  : {mem_rec / 1024:8.1f} KiB  ({100 * (1 - mem_rec / mem_dict):.0f}% less)")
+    print(f"  digest   list rescan  : {1000 * t_list:8.2f} ms/session")
+    print(f"  digest   incremental  : {1000 * t_hist:8.2f} ms/session")
+    print(f"  analysis tokens raw   : {tok_raw:8.0f} /session")
+    print(f"  analysis tokens summ. : {tok_sum:8.0f} /session (keep_recent={args.keep_recent})")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--steps", type=int, default=60)
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--history_k", type=int, default=6)
+    ap.add_argument("--keep_recent", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    main(ap.parse_args())
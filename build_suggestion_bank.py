@@ -0,0 +1,87 @@
+"""
+Pre-generate the axis suggestion bank consumed by run_operators.py (--suggestion_bank).
+
+Each axis (diet, accessibility, budget, nav, generic) is filled in bulk with
+deduplicated suggestions stored with their normalized form and category tag,
+so analysis only calls the LLM when an axis runs out of unused entries.
+
+Usage:
+  python build_suggestion_bank.py --out suggestions_bank.json --per_axis 60
+  python build_suggestion_bank.py --out suggestions_bank.json --axes vegan,halal,budget
+  python build_suggestion_bank.py --out suggestions_bank.json --import_file suggestions_axis.json
+  python build_suggestion_bank.py --out suggestions_bank.json --reset_used
+"""
+import argparse, asyncio, json, pathlib
+from typing import Dict, Any, List
+
+from run_operators import SUGGESTIONS_AXIS, SuggestionBank, generate_axis_suggestions
+
+DIET_AXES = {"vegan","vegetarian","pescatarian","halal","kosher","gluten-free","lactose-free",
+             "low-sodium","nut-free","low-carb","keto","low-FODMAP"}
+ACCESS_AXES = {"screen-reader","large-text","colorblind","motor-impairment","reduced-motion","dyslexia-friendly"}
+
+def bank_persona(axis: str) -> Dict[str, Any]:
+    """Neutral persona so suggestions stay reusable across the cohort."""
+    return {
+        "age": "any", "location": "any city", "income": "student budget",
+        "diet": axis if axis in DIET_AXES else "none",
+        "accessibility": axis if axis in ACCESS_AXES else "none",
+        "goal": "order a meal that fits my constraints, pre-checkout",
+    }
+
+async def fill_axis(bank: SuggestionBank, axis: str, *, target: int, batch: int,
+                    model: str, temp: float, max_rounds: int, sem: asyncio.Semaphore):
+    for _ in range(max_rounds):
+        if len(bank.unused.get(axis, {})) >= target:
+            return
+        forbid = set(bank.entries.get(axis, {}).keys())
+        async with sem:
+            got = await generate_axis_suggestions(
+                bank_persona(axis), axis, model=model, temp=temp,
+                need=batch, forbid_phrases=forbid, corpus_phrases=set()
+            )
+        added = sum(1 for s in got if bank.add_unique(axis, s))
+        print(f"  {axis}: +{added} (unused {len(bank.unused.get(axis, {}))}/{target})")
+        if not got:
+            return
+
+async def main(args):
+    bank = SuggestionBank.load(args.out)
+    if args.reset_used:
+        bank.reset_used()
+
+    if args.import_file:
+        fp = pathlib.Path(args.import_file)
+        data = json.loads(fp.read_text(encoding="utf-8")) if fp.exists() else {}
+        for k, v in (data or {}).items():
+            for s in (v if isinstance(v, list) else []):
+                bank.add_unique(k, str(s))
+
+    axes: List[str] = ([a.strip() for a in args.axes.split(",") if a.strip()]
+                       if args.axes else list(SUGGESTIONS_AXIS.keys()))
+    sem = asyncio.Semaphore(max(1, args.concurrency))
+    await asyncio.gather(*[
+        fill_axis(bank, ax, target=args.per_axis, batch=args.batch,
+                  model=args.model, temp=args.temp, max_rounds=args.max_rounds, sem=sem)
+        for ax in axes
+    ])
+
+    bank.dirty = True
+    bank.save()
+    for ax, (total, unused) in bank.counts().items():
+        print(f"{ax:>18}: {unused} unused / {total} total")
+    print(f"✅ Bank Saved: {args.out}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="suggestions_bank.json")
+    ap.add_argument("--axes", type=str, default=None, help="Comma-separated axes (default: all known axes)")
+    ap.add_argument("--per_axis", type=int, default=60, help="Target unused entries per axis")
+    ap.add_argument("--batch", type=int, default=20, help="Suggestions requested per LLM call")
+    ap.add_argument("--max_rounds", type=int, default=6)
+    ap.add_argument("--model", default="gpt-5-mini")
+    ap.add_argument("--temp", type=float, default=1.20)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--import_file", type=str, default=None, help="Seed from an axis JSON like --suggestions_file")
+    ap.add_argument("--reset_used", action="store_true", help="Mark every entry unused again")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,222 @@
+"""
+Cluster Critical / Minor / Suggested bullets from every runs/**/issues.json into a ranked issue table.
+
+Bullets are normalized (normalize_line), exact duplicates collapsed, then grouped in two greedy passes
+over word-shingle MinHash + LSH banding:
+  1. texts, most frequent first, join the best-matching medoid among their LSH candidates when the
+     estimated Jaccard similarity passes --threshold, otherwise become a medoid themselves;
+  2. the resulting groups are merged the same way on their centroids (shingles shared by at least half
+     of a group's bullets), repeated until nothing merges, so rewordings of one issue end up together.
+Every join is checked against a medoid / centroid, never along a chain, so clusters cannot drift.
+Clusters are ranked by distinct personas.
+
+Outputs <out>.csv, <out>.md and <out>.json.
+
+Usage:
+  python cluster_issues.py --input runs --out issue_clusters
+  python cluster_issues.py --input runs --sections critical,minor --threshold 0.6
+"""
+import argparse, json, pathlib, time, zlib
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+
+from compose_report import gather_runs
+from issue_text import normalize_line, extract_bullets
+
+SECTIONS = {
+    "critical": "## Critical Issues",
+    "minor": "## Minor Friction",
+    "suggested": "## Suggested Improvements",
+}
+PRIME = np.uint64((1 << 61) - 1)
+MASK32 = np.uint64(0xFFFFFFFF)
+
+def collect_bullets(root: pathlib.Path, sections: List[str]) -> List[Dict[str, Any]]:
+    out = []
+    for it in gather_runs(root):
+        md = it.get("analysis") or ""
+        pid = it["persona"].get("id", "")
+        cond = it["persona"].get("condition", "")
+        for sec in sections:
+            for b in extract_bullets(md, SECTIONS[sec]):
+                out.append({"text": b, "section": sec, "persona": pid, "condition": cond})
+    return out
+
+def shingle_hashes(norm: str) -> List[int]:
+    """Word unigrams + bigrams: bigrams keep phrasing, unigrams keep one inserted word from splitting a cluster."""
+    toks = norm.split()
+    grams = toks + [toks[i] + " " + toks[i + 1] for i in range(len(toks) - 1)]
+    return [zlib.crc32(g.encode("utf-8")) for g in grams] or [0]
+
+def minhash(shingle_sets: Sequence[Sequence[int]], num_perm: int, seed: int = 1) -> np.ndarray:
+    """(len(shingle_sets), num_perm) uint32 signatures; permutations applied in slabs."""
+    flat, starts = [], []
+    for sh in shingle_sets:
+        starts.append(len(flat))
+        flat.extend(sh or [0])
+    H = np.asarray(flat, dtype=np.uint64)
+    starts = np.asarray(starts, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    sig = np.empty((len(shingle_sets), num_perm), dtype=np.uint32)
+    slab = max(1, 8_000_000 // max(1, len(H)))
+    for s in range(0, num_perm, slab):
+        e = min(num_perm, s + slab)
+        vals = ((a[s:e, None] * H[None, :] + b[s:e, None]) % PRIME) & MASK32
+        sig[:, s:e] = np.minimum.reduceat(vals, starts, axis=1).T.astype(np.uint32)
+    return sig
+
+def band_keys(sig: np.ndarray, bands: int) -> List[List[bytes]]:
+    rows = sig.shape[1] // bands
+    out = []
+    for bnd in range(bands):
+        block = np.ascontiguousarray(sig[:, bnd * rows:(bnd + 1) * rows])
+        out.append(block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel().tolist())
+    return out
+
+def medoid_assign(sig: np.ndarray, weights: Sequence[float], bands: int, threshold: float) -> List[int]:
+    """
+    Medoid row per row. Rows are visited by descending weight; each joins the most similar existing
+    medoid sharing an LSH bucket (signature agreement ≥ threshold) or becomes a new medoid.
+    """
+    n = sig.shape[0]
+    keys = band_keys(sig, bands)
+    buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+    medoid = [-1] * n
+    for i in sorted(range(n), key=lambda r: (-weights[r], r)):
+        cands = {m for bnd in range(bands) for m in buckets[bnd].get(keys[bnd][i], ())}
+        best, best_sim = -1, threshold
+        if cands:
+            cl = list(cands)
+            sims = (sig[cl] == sig[i]).mean(axis=1)
+            j = int(sims.argmax())
+            if sims[j] >= best_sim:
+                best = cl[j]
+        if best < 0:
+            best = i
+            for bnd in range(bands):
+                buckets[bnd].setdefault(keys[bnd][i], []).append(i)
+        medoid[i] = best
+    return medoid
+
+def centroid(shingle_sets: List[List[int]], weights: List[float]) -> List[int]:
+    """Shingles present in at least half of the group's (weighted) members."""
+    total = sum(weights)
+    counts: Dict[int, float] = {}
+    for sh, w in zip(shingle_sets, weights):
+        for h in set(sh):
+            counts[h] = counts.get(h, 0) + w
+    return [h for h, c in counts.items() if 2 * c >= total]
+
+def lsh_clusters(shingle_sets: List[List[int]], weights: List[float], *,
+                 num_perm: int, bands: int, threshold: float, max_rounds: int = 5) -> List[int]:
+    """
+    Cluster id per row: medoid groups (pass 1), then groups merged by centroid similarity (pass 2,
+    repeated with fresh centroids until nothing merges).
+    """
+    label = medoid_assign(minhash(shingle_sets, num_perm), weights, bands, threshold)
+    for _ in range(max_rounds):
+        groups: Dict[int, List[int]] = {}
+        for i, m in enumerate(label):
+            groups.setdefault(m, []).append(i)
+        heads = list(groups)
+        cents, gw = [], []
+        for m in heads:
+            members = groups[m]
+            ws = [weights[i] for i in members]
+            cents.append(centroid([shingle_sets[i] for i in members], ws) or shingle_sets[m])
+            gw.append(sum(ws))
+        merged = medoid_assign(minhash(cents, num_perm), gw, bands, threshold)
+        if len(set(merged)) == len(heads):
+            break
+        head_of = {m: heads[merged[g]] for g, m in enumerate(heads)}
+        label = [head_of[m] for m in label]
+    return label
+
+def cluster_bullets(bullets: List[Dict[str, Any]], *, num_perm: int, bands: int, threshold: float) -> List[Dict[str, Any]]:
+    # collapse exact normalized duplicates first; only unique texts are hashed
+    norms = [normalize_line(b["text"]) for b in bullets]
+    uniq: Dict[str, int] = {}
+    doc_of = [uniq.setdefault(nm, len(uniq)) for nm in norms]
+    docs = list(uniq.keys())
+    weights = [0.0] * len(docs)
+    for d in doc_of:
+        weights[d] += 1
+    roots = lsh_clusters([shingle_hashes(d) for d in docs], weights,
+                         num_perm=num_perm, bands=bands, threshold=threshold) if docs else []
+
+    groups: Dict[int, List[int]] = {}
+    for i, d in enumerate(doc_of):
+        groups.setdefault(roots[d], []).append(i)
+    clusters = []
+    for members in groups.values():
+        texts: Dict[str, int] = {}
+        for i in members:
+            texts[bullets[i]["text"]] = texts.get(bullets[i]["text"], 0) + 1
+        rep = max(texts.items(), key=lambda kv: (kv[1], -len(kv[0])))[0]
+        conds: Dict[str, int] = {}
+        secs: Dict[str, int] = {}
+        personas = set()
+        for i in members:
+            b = bullets[i]
+            personas.add(b["persona"])
+            conds[b["condition"]] = conds.get(b["condition"], 0) + 1
+            secs[b["section"]] = secs.get(b["section"], 0) + 1
+        clusters.append({
+            "representative": rep, "bullets": len(members), "variants": len(texts),
+            "personas": len(personas), "persona_ids": sorted(personas),
+            "conditions": conds, "sections": secs,
+            "examples": [t for t, _ in sorted(texts.items(), key=lambda kv: -kv[1])[:5]],
+        })
+    clusters.sort(key=lambda c: (-c["personas"], -c["bullets"], c["representative"]))
+    for r, c in enumerate(clusters, 1):
+        c["rank"] = r
+    return clusters
+
+def write_outputs(clusters: List[Dict[str, Any]], out: str, top_md: int):
+    import csv
+    with open(f"{out}.csv", "w", encoding="utf-8", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(["rank", "personas", "bullets", "variants", "uniform", "diet", "diverse",
+                    "critical", "minor", "suggested", "representative", "persona_ids"])
+        for c in clusters:
+            w.writerow([c["rank"], c["personas"], c["bullets"], c["variants"],
+                        *(c["conditions"].get(k, 0) for k in ("uniform", "diet", "diverse")),
+                        *(c["sections"].get(k, 0) for k in SECTIONS),
+                        c["representative"], ";".join(c["persona_ids"])])
+    lines = ["# Issue Clusters", "",
+             "| # | Personas | Bullets | uniform/diet/diverse | Sections | Representative |",
+             "|---|---|---|---|---|---|"]
+    for c in clusters[:top_md]:
+        cond = "/".join(str(c["conditions"].get(k, 0)) for k in ("uniform", "diet", "diverse"))
+        secs = ", ".join(f"{k} {v}" for k, v in c["sections"].items())
+        lines.append(f"| {c['rank']} | {c['personas']} | {c['bullets']} | {cond} | {secs} | {c['representative']} |")
+    pathlib.Path(f"{out}.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    pathlib.Path(f"{out}.json").write_text(json.dumps(clusters, ensure_ascii=False, indent=1), encoding="utf-8")
+
+def main(args):
+    t0 = time.perf_counter()
+    sections = [s.strip() for s in args.sections.split(",") if s.strip() in SECTIONS]
+    bullets = collect_bullets(pathlib.Path(args.input), sections)
+    t1 = time.perf_counter()
+    clusters = cluster_bullets(bullets, num_perm=args.num_perm, bands=args.bands, threshold=args.threshold)
+    t2 = time.perf_counter()
+    write_outputs(clusters, args.out, args.top)
+    print(f"{len(bullets)} bullets → {len(clusters)} clusters "
+          f"(read {t1 - t0:.1f}s, cluster {t2 - t1:.1f}s)")
+    for c in clusters[:10]:
+        print(f"  #{c['rank']:<3} {c['personas']:>4} personas  {c['representative'][:90]}")
+    print(f"✅ Clusters Saved: {args.out}.csv / .md / .json")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", default="runs")
+    ap.add_argument("--out", default="issue_clusters")
+    ap.add_argument("--sections", default="critical,minor,suggested")
+    ap.add_argument("--threshold", type=float, default=0.5, help="Min estimated Jaccard (word uni+bigrams) to join a cluster")
+    ap.add_argument("--num_perm", type=int, default=64)
+    ap.add_argument("--bands", type=int, default=16, help="LSH bands; num_perm must divide evenly")
+    ap.add_argument("--top", type=int, default=100, help="Clusters listed in the markdown table")
+    main(ap.parse_args())
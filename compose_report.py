@@ -1,12 +1,41 @@
 """
 Scan runs/*/issues.json and compose consolidated_report.pdf.
 Requires: jinja2, wkhtmltopdf
+Optional: ijson (streams only the report fields), pypdf (merges cached per-chunk PDFs)
+Export (--export DIR): pandas; pyarrow for Parquet, CSV otherwise
+
+Runs are grouped by condition and split into persona-number ranges of --chunk_size (ids 1-25, 26-50, ...).
+Chunks are rendered in worker processes and converted by concurrent wkhtmltopdf calls; each chunk PDF is
+cached under <input>/.report_cache by content hash. Numbering is global, so a new persona rebuilds its own
+range and any later chunk whose first number shifted; appending to the last range rebuilds one chunk.
 """
-import argparse, json, pathlib, subprocess, tempfile, re
+import argparse, hashlib, json, os, pathlib, shutil, subprocess, tempfile, re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from jinja2 import Template
 
-TEMPLATE_HTML = """
-<!doctype html><html><head>
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    from pyarrow import ArrowInvalid, ArrowTypeError
+    PARQUET_ERRORS: Tuple[type, ...] = (ImportError, ArrowInvalid, ArrowTypeError)
+except ImportError:
+    PARQUET_ERRORS = (ImportError,)
+
+STYLE = """
 <meta charset="utf-8"><style>
 body{font-family:Arial,Helvetica,sans-serif;margin:40px;}
 h1{page-break-before:always;}
@@ -19,16 +48,28 @@ display:inline-block;
 font-weight:bold;
 margin:8px 0;
 white-space: nowrap;}
-</style></head><body>
+</style>
+"""
+
+HEADER_HTML = """
+<!doctype html><html><head>""" + STYLE + """</head><body>
 <h1>UEATS-LLM Consolidated Report</h1>
-<p>Total personas: {{items|length}}</p>
+<p>Total personas: {{total}}</p>
+{% if saved %}<p>LLM calls saved by macro replay: {{ saved }}</p>{% endif %}
+</body></html>
+"""
 
+CHUNK_HTML = """
+<!doctype html><html><head>""" + STYLE + """</head><body>
 {% for it in items %}
-<h2>{{loop.index}}. {{ it.persona.id or it.persona.name }}</h2>
+<h2>{{start + loop.index}}. {{ it.persona.id or it.persona.name }}</h2>
 <p><strong>Condition:</strong> {{it.persona.condition}}</p>
 {% if it.score is not none %}
 <div class="scorebox">{{ '%.1f'|format(it.score) }}&nbsp; / &nbsp;5.0</div>
 {% endif %}
+{% if it.llm_saved %}
+<p><strong>LLM calls saved (macro):</strong> {{ it.llm_saved }}</p>
+{% endif %}
 {% if it.description %}
 <p><strong>Description:</strong> {{ it.description }}</p>
 {% endif %}
@@ -37,46 +78,399 @@ white-space: nowrap;}
 </body></html>
 """
 
-def gather_runs(root_dir: pathlib.Path):
+STATS_HTML = """
+<!doctype html><html><head>""" + STYLE + """</head><body>
+<h1>Condition Comparison</h1>
+<p>Bootstrap {{ s.n_boot }} resamples, {{ s.n_perm }} permutations (seed {{ s.seed }}).</p>
+<table border="1" cellpadding="4" cellspacing="0">
+<tr><th>Condition</th><th>n</th><th>Mean score</th><th>95% CI</th><th>Median</th></tr>
+{% for c, r in s.conditions.items() if r.n %}
+<tr><td>{{c}}</td><td>{{r.n}}</td><td>{{ '%.2f'|format(r.mean) }}</td>
+<td>[{{ '%.2f'|format(r.ci_lo) }}, {{ '%.2f'|format(r.ci_hi) }}]</td><td>{{ '%.1f'|format(r.median) }}</td></tr>
+{% endfor %}
+</table>
+<h2>Score differences (permutation test)</h2>
+<ul>{% for pr in s.pairs %}<li>{{pr.a}} − {{pr.b}}: Δ {{ '%+.2f'|format(pr.diff) }}, p = {{ '%.4f'|format(pr.p) }}</li>{% endfor %}</ul>
+{% for pr in s.tags.pairs if pr.tags %}
+<h2>Note tags: {{pr.a}} vs {{pr.b}}</h2>
+<table border="1" cellpadding="4" cellspacing="0">
+<tr><th>Tag</th><th>{{pr.a}}</th><th>{{pr.b}}</th><th>Δ</th><th>p</th></tr>
+{% for t in pr.tags %}<tr><td>{{t.tag}}</td><td>{{ '%.0f%%'|format(100*t.share_a) }}</td><td>{{ '%.0f%%'|format(100*t.share_b) }}</td>
+<td>{{ '%+.0f'|format(100*t.diff) }} pt</td><td>{{ '%.4f'|format(t.p) }}</td></tr>{% endfor %}
+</table>
+{% endfor %}
+{% if s.coverage %}
+<h2>Issue-category coverage (Minor Friction)</h2>
+<ul>{% for c, cv in s.coverage.items() %}
+<li><strong>{{c}}</strong>: {{cv.categories}} categories ({{ '%.0f%%'|format(100*cv.coverage) }} of all seen){% if cv.unique %}; only here: {{ cv.unique|join(', ') }}{% endif %}</li>
+{% endfor %}</ul>
+{% endif %}
+</body></html>
+"""
+
+# ---------------- Reading runs ----------------
+REPORT_KEYS = ("persona", "analysis", "description", "score")
+SAVED_PREFIX = "run.macro.llm_calls_saved"
+
+def _stream_fields(fh) -> Dict[str, Any]:
+    """
+    Build only the report keys from ijson events. run (with its history) precedes analysis in issues.json,
+    so it is still tokenized but never materialized; parsing stops once the report keys are read.
+    """
+    out: Dict[str, Any] = {}
+    key, builder = None, None
+    for prefix, event, value in ijson.parse(fh, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == key and event in ("end_map", "end_array"):
+                out[key] = builder.value; builder = None
+            continue
+        if prefix in REPORT_KEYS:
+            if event in ("start_map", "start_array"):
+                key, builder = prefix, ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif event != "map_key":
+                out[prefix] = value
+        elif prefix == SAVED_PREFIX:
+            out["llm_saved"] = value
+        if all(k in out for k in REPORT_KEYS):
+            break  # llm_saved (inside run) has been seen by now if present
+    return out
+
+def read_fields(path: pathlib.Path) -> Dict[str, Any]:
+    if ijson is not None:
+        with open(path, "rb") as fh:
+            data = _stream_fields(fh)
+    else:
+        full = json.load(open(path, encoding="utf-8"))
+        data = {k: full.get(k) for k in REPORT_KEYS}
+        data["llm_saved"] = ((full.get("run") or {}).get("macro") or {}).get("llm_calls_saved")
+    try:
+        score = float(data.get("score"))
+    except Exception:
+        score = None
+    return {
+        "persona": data.get("persona") or {},
+        "analysis": data.get("analysis") or "",
+        "description": data.get("description") or "",
+        "score": score,
+        "llm_saved": int(data.get("llm_saved") or 0),
+    }
+
+def gather_runs(root_dir: pathlib.Path, cache_dir: Optional[pathlib.Path] = None):
+    """Report fields per issues.json, sorted by condition then persona number. Unchanged files (mtime+size) come from the cache."""
+    index_fp = cache_dir / "fields.json" if cache_dir else None
+    index: Dict[str, Any] = {}
+    if index_fp and index_fp.exists():
+        try: index = json.loads(index_fp.read_text(encoding="utf-8"))
+        except Exception: index = {}
+    fresh: Dict[str, Any] = {}
     items = []
     for json_path in root_dir.rglob("issues.json"):
-        data = json.load(open(json_path))
-        try:
-            score = float(data.get("score"))
-        except Exception:
-            score = None
-        items.append({
-            "persona": data["persona"],
-            "analysis": data["analysis"],
-            "description": data.get("description") or "",
-            "score": score,
-        })
+        st = json_path.stat()
+        rel = str(json_path.relative_to(root_dir))
+        ent = index.get(rel)
+        if not ent or ent["mtime"] != st.st_mtime_ns or ent["size"] != st.st_size:
+            ent = {"mtime": st.st_mtime_ns, "size": st.st_size, "fields": read_fields(json_path)}
+        fresh[rel] = ent
+        items.append(ent["fields"])
+    if index_fp:
+        index_fp.write_text(json.dumps(fresh, ensure_ascii=False), encoding="utf-8")
 
     order = {"uniform": 0, "diet": 1, "diverse": 2}
     def sort_key(it):
         cond = it["persona"].get("condition", "")
-        raw  = it["persona"].get("id", "")
-        m = re.search(r"(\d+)", raw)
-        num = int(m.group(1)) if m else 0
-        return (order.get(cond, 99), num)
+        return (order.get(cond, 99), persona_num(it), it["persona"].get("id", ""))
 
     return sorted(items, key=sort_key)
 
+# ---------------- Chunks ----------------
+def persona_num(it: Dict[str, Any]) -> int:
+    m = re.search(r"(\d+)", it["persona"].get("id", ""))
+    return int(m.group(1)) if m else 0
+
+def make_chunks(items: List[Dict[str, Any]], chunk_size: int) -> List[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    (global start index, items) per (condition, persona number // chunk_size) range, so chunk membership
+    does not depend on how many personas precede it. Ranges holding more than chunk_size items
+    (variants, ids without numbers) are split further.
+    """
+    chunks, i = [], 0
+    while i < len(items):
+        key = (items[i]["persona"].get("condition", ""), persona_num(items[i]) // chunk_size)
+        j = i
+        while j < len(items) and j - i < chunk_size and \
+                (items[j]["persona"].get("condition", ""), persona_num(items[j]) // chunk_size) == key:
+            j += 1
+        chunks.append((i, items[i:j]))
+        i = j
+    return chunks
+
+def chunk_hash(template: str, payload: Any) -> str:
+    blob = template + json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+def render_chunk(job: Tuple[str, Dict[str, Any], str]) -> str:
+    """Worker: render one chunk to its HTML path."""
+    template, ctx, out_html = job
+    pathlib.Path(out_html).write_text(Template(template).render(**ctx), encoding="utf-8")
+    return out_html
+
+def html_to_pdf(html_path: str, pdf_path: str) -> str:
+    tmp = pdf_path + ".part"
+    subprocess.run(["wkhtmltopdf", "--quiet", html_path, tmp], check=True)
+    os.replace(tmp, pdf_path)
+    return pdf_path
+
+def merge_pdfs(parts: List[str], out_pdf: str):
+    writer = PdfWriter()
+    for p in parts:
+        writer.append(p)
+    with open(out_pdf, "wb") as fh:
+        writer.write(fh)
+
+# ---------------- Columnar export ----------------
+CONDITION_ORDER = ["uniform", "diet", "diverse"]
+PERSONA_FIELDS = ("id", "condition", "age", "income", "location", "diet", "accessibility", "goal")
+MILESTONES = ("m_item", "m_cart", "m_review", "prechk_stop", "budget_met", "budget_over", "stuck_stop")
+# model-written history can carry numbers as strings ("ms":"1500"); mixed columns break Parquet
+NUMERIC_COLUMNS = ("step", "ms", "score", "llm_calls", "elapsed_s", "time_to_stop_s",
+                   "prompt_tokens", "completion_tokens", "cached_tokens")
+
+def _num(v: Any) -> Optional[float]:
+    if isinstance(v, bool) or v is None:
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+def file_sha1(path: pathlib.Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def flatten_run(source: str, data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """One persona row (persona fields, score, counts, timings, sig_*) and one row per history entry."""
+    persona = data.get("persona") or {}
+    run = data.get("run") or {}
+    history = run.get("history") or []
+    tok = run.get("tokens") or {}
+    pid = persona.get("id") or source.rsplit("/", 2)[0]
+    cond = persona.get("condition") or ""
+    try:
+        score = float(data.get("score"))
+    except Exception:
+        score = None
+
+    steps, tags = [], []
+    for i, h in enumerate(history):
+        kind = next((k for k in ("action", "warn", "error", "info") if k in h), "other")
+        if h.get("action") == "note" and h.get("tag"):
+            tags.append(h["tag"])
+        steps.append({
+            "source": source, "persona_id": pid, "condition": cond, "idx": i,
+            "step": _num(h.get("step")), "kind": kind, "action": h.get("action"),
+            "selector": h.get("selector"), "tag": h.get("tag"), "tab": h.get("tab"),
+            "ms": _num(h.get("ms")),
+            "detail": h.get("detail") or h.get("warn") or h.get("error") or h.get("info"),
+        })
+
+    row: Dict[str, Any] = {"source": source, "persona_id": pid}
+    for k in PERSONA_FIELDS[1:]:
+        row[k] = persona.get(k)
+    row.update({
+        "variant": (run.get("variant") or {}).get("id"),
+        "score": score,
+        "steps": len(history),
+        "actions": sum(1 for s_ in steps if s_["kind"] == "action"),
+        "notes": len(tags),
+        "warns": sum(1 for s_ in steps if s_["kind"] == "warn"),
+        "errors": sum(1 for s_ in steps if s_["kind"] == "error"),
+        "note_tags": ";".join(tags),
+        "llm_calls": run.get("llm_calls"),
+        "elapsed_s": run.get("elapsed_s"),
+        "time_to_stop_s": run.get("time_to_stop_s"),
+        "prompt_tokens": tok.get("prompt_tokens"),
+        "completion_tokens": tok.get("completion_tokens"),
+        "cached_tokens": tok.get("cached_tokens"),
+    })
+    for k, v in (data.get("signals") or {}).items():
+        if isinstance(v, (bool, int, float, str)) or v is None:
+            row[f"sig_{k}"] = v
+    for k in NUMERIC_COLUMNS:
+        if k in row:
+            row[k] = _num(row[k])
+    return row, steps
+
+def load_table(out_dir: pathlib.Path, name: str):
+    pq, csv_ = out_dir / f"{name}.parquet", out_dir / f"{name}.csv"
+    if pq.exists():
+        return pd.read_parquet(pq)
+    if csv_.exists():
+        return pd.read_csv(csv_)
+    return None
+
+def save_table(df, out_dir: pathlib.Path, name: str) -> pathlib.Path:
+    """Parquet when an engine is installed, CSV otherwise; the other format is removed so reloads stay unambiguous."""
+    pq, csv_ = out_dir / f"{name}.parquet", out_dir / f"{name}.csv"
+    for k in NUMERIC_COLUMNS:
+        if k in df:
+            df[k] = pd.to_numeric(df[k], errors="coerce")  # rows kept from older exports
+    try:
+        df.to_parquet(pq, index=False)
+        csv_.unlink(missing_ok=True)
+        return pq
+    except PARQUET_ERRORS as e:
+        if not isinstance(e, ImportError):
+            print(f"  {name}: Parquet failed ({e}), writing CSV")
+        df.to_csv(csv_, index=False)
+        pq.unlink(missing_ok=True)
+        return csv_
+
+def export_runs(root: pathlib.Path, out_dir: pathlib.Path):
+    """
+    Incremental export of every issues.json into personas + steps tables.
+    Files with the same mtime/size (or the same sha1 after a touch) keep their existing rows.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_fp = out_dir / "_manifest.json"
+    manifest: Dict[str, Any] = json.loads(manifest_fp.read_text(encoding="utf-8")) if manifest_fp.exists() else {}
+    personas, steps = load_table(out_dir, "personas"), load_table(out_dir, "steps")
+    if personas is None or steps is None:
+        manifest = {}
+
+    fresh: Dict[str, Any] = {}
+    changed: List[Tuple[str, pathlib.Path]] = []
+    for json_path in sorted(root.rglob("issues.json")):
+        rel = json_path.relative_to(root).as_posix()
+        st = json_path.stat()
+        ent = manifest.get(rel)
+        if ent and ent["mtime"] == st.st_mtime_ns and ent["size"] == st.st_size:
+            fresh[rel] = ent; continue
+        digest = file_sha1(json_path)
+        fresh[rel] = {"mtime": st.st_mtime_ns, "size": st.st_size, "sha1": digest}
+        if not ent or ent.get("sha1") != digest:
+            changed.append((rel, json_path))
+
+    drop = {rel for rel, _ in changed} | (set(manifest) - set(fresh))
+    p_rows, s_rows = [], []
+    for rel, json_path in changed:
+        try:
+            row, srows = flatten_run(rel, json.load(open(json_path, encoding="utf-8")))
+        except Exception as e:
+            print(f"  skip {rel}: {e!r}")
+            fresh.pop(rel, None); continue
+        p_rows.append(row); s_rows.extend(srows)
+
+    if drop or personas is None:
+        keep_p = personas[~personas["source"].isin(drop)] if personas is not None else None
+        keep_s = steps[~steps["source"].isin(drop)] if steps is not None else None
+        personas = pd.concat([x for x in (keep_p, pd.DataFrame(p_rows)) if x is not None], ignore_index=True)
+        steps = pd.concat([x for x in (keep_s, pd.DataFrame(s_rows)) if x is not None], ignore_index=True)
+        p_path = save_table(personas, out_dir, "personas")
+        s_path = save_table(steps, out_dir, "steps")
+        manifest_fp.write_text(json.dumps(fresh, indent=1), encoding="utf-8")
+    else:
+        p_path = s_path = None
+    return personas, steps, {"files": len(fresh), "changed": len(changed), "removed": len(drop) - len(changed),
+                             "personas_path": p_path, "steps_path": s_path}
+
+def condition_summary(personas):
+    """Per-condition score distribution, milestone rates and severe-note rates (vectorized groupbys)."""
+    if personas is None or personas.empty:
+        return pd.DataFrame()
+    cond = personas["condition"].fillna("")
+    score = personas["score"].astype(float)
+    out = [score.groupby(cond).describe().add_prefix("score_")]
+    out.append(pd.crosstab(cond, score.round().astype("Int64")).add_prefix("score_eq_"))
+    cols = [f"sig_{m}" for m in MILESTONES if f"sig_{m}" in personas]
+    if cols:
+        flags = personas[cols].apply(lambda c: c.astype(str).str.lower().isin(["true", "1", "1.0"]))
+        out.append(flags.groupby(cond).mean().rename(columns=lambda c: c[4:] + "_rate"))
+    if "sig_notes_severe" in personas:
+        sev = pd.to_numeric(personas["sig_notes_severe"], errors="coerce").fillna(0)
+        out.append(pd.DataFrame({"severe_note_rate": (sev > 0).groupby(cond).mean(),
+                                 "severe_notes_mean": sev.groupby(cond).mean()}))
+    summ = pd.concat(out, axis=1)
+    order = [c for c in CONDITION_ORDER if c in summ.index] + [c for c in summ.index if c not in CONDITION_ORDER]
+    return summ.reindex(order)
+
+def export_main(args):
+    if pd is None:
+        raise SystemExit("--export needs pandas (pip install pandas; pyarrow for Parquet)")
+    out_dir = pathlib.Path(args.export)
+    personas, steps, st = export_runs(pathlib.Path(args.input), out_dir)
+    summ = condition_summary(personas)
+    summ.to_csv(out_dir / "summary_by_condition.csv")
+    print(f"Files: {st['files']} ({st['changed']} changed, {st['removed']} removed)")
+    print(f"Rows: {len(personas)} personas, {len(steps)} steps")
+    if not summ.empty:
+        print(summ.round(3).T.to_string())
+    print(f"✅ Export Saved: {out_dir}")
+
 def main(args):
+    if args.export:
+        return export_main(args)
     root = pathlib.Path(args.input)
-    items = gather_runs(root)
+    cache_dir = None if args.no_cache else pathlib.Path(args.cache_dir or root / ".report_cache")
+    work = cache_dir or pathlib.Path(tempfile.mkdtemp(prefix="report_"))
+    work.mkdir(parents=True, exist_ok=True)
+
+    items = gather_runs(root, cache_dir)
+    jobs = [(HEADER_HTML, {"total": len(items), "saved": sum(it["llm_saved"] for it in items)})]
+    if args.stats:
+        from condition_stats import compare_conditions
+        stats = compare_conditions(root, n_boot=args.bootstrap, n_perm=args.bootstrap, items=items,
+                                   export_dir=(cache_dir or work) / "export")
+        print(f"Stats: {len(stats['conditions'])} conditions in {stats.get('elapsed_s', 0)}s")
+        jobs.append((STATS_HTML, {"s": stats}))
+    jobs += [(CHUNK_HTML, {"start": start, "items": chunk}) for start, chunk in make_chunks(items, max(1, args.chunk_size))]
+
+    keys = [chunk_hash(t, ctx) for t, ctx in jobs]
+    html = [str(work / f"{k}.html") for k in keys]
+    pdf = [str(work / f"{k}.pdf") for k in keys]
+    need_html = [i for i, h in enumerate(html) if not pathlib.Path(h).exists()]
+    need_pdf = [i for i, p in enumerate(pdf) if not pathlib.Path(p).exists()] if PdfWriter else []
+
+    workers = max(1, args.workers or os.cpu_count() or 1)
+    if need_html:
+        with ProcessPoolExecutor(max_workers=min(workers, len(need_html))) as ex:
+            list(ex.map(render_chunk, [(jobs[i][0], jobs[i][1], html[i]) for i in need_html]))
 
-    html = Template(TEMPLATE_HTML).render(items=items)
-    tmp_html = tempfile.NamedTemporaryFile(delete=False, suffix=".html").name
-    with open(tmp_html, "w", encoding="utf-8") as f:
-        f.write(html)
+    if PdfWriter is not None:
+        if need_pdf:
+            with ThreadPoolExecutor(max_workers=min(workers, len(need_pdf))) as ex:
+                list(ex.map(lambda i: html_to_pdf(html[i], pdf[i]), need_pdf))
+        merge_pdfs(pdf, args.pdf)
+    else:
+        # no PDF merger: one wkhtmltopdf call over all chunk pages
+        subprocess.run(["wkhtmltopdf", "--quiet", *html, args.pdf], check=True)
 
-    subprocess.run(["wkhtmltopdf", tmp_html, args.pdf], check=True)
-    pathlib.Path(tmp_html).unlink(missing_ok=True)
+    if cache_dir:
+        live = set(keys)
+        for f in cache_dir.glob("*.*"):
+            if f.suffix in (".html", ".pdf") and f.stem not in live:
+                f.unlink(missing_ok=True)
+    else:
+        shutil.rmtree(work, ignore_errors=True)
+    print(f"Chunks: {len(jobs)} ({len(need_html)} rendered, {len(need_pdf)} converted, "
+          f"{len(jobs) - len(need_html)} cached)")
     print(f"✅ PDF Saved: {args.pdf}")
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--input", default="runs")
     ap.add_argument("--pdf",   default="consolidated_report.pdf")
+    ap.add_argument("--workers", type=int, default=0, help="Render/convert workers (default: CPU count)")
+    ap.add_argument("--chunk_size", type=int, default=25, help="Max personas per cached chunk")
+    ap.add_argument("--cache_dir", type=str, default=None, help="Chunk cache (default: <input>/.report_cache)")
+    ap.add_argument("--no_cache", action="store_true", help="Rebuild every chunk in a temp dir")
+    ap.add_argument("--stats", action="store_true",
+                    help="Add a condition comparison section (needs numpy/pandas; see condition_stats.py)")
+    ap.add_argument("--bootstrap", type=int, default=10000, help="Bootstrap resamples / permutations for --stats")
+    ap.add_argument("--export", type=str, default=None,
+                    help="Write personas/steps tables (Parquet or CSV) and per-condition summaries to this dir instead of the PDF")
     main(ap.parse_args())
@@ -0,0 +1,165 @@
+"""
+Compare usability outcomes across persona conditions (uniform vs diet vs diverse).
+
+Loads the per-persona table from compose_report's incremental export and computes, with NumPy/pandas:
+  - score means with bootstrap confidence intervals (resamples drawn as one index matrix per chunk)
+  - permutation tests on the mean score difference for every condition pair
+  - note-tag frequency contrasts (share of personas with each tag; permutation p-values for all tags at once)
+  - issue-category coverage of the "Minor Friction" bullets
+
+Usage:
+  python condition_stats.py --input runs --bootstrap 10000 --out condition_stats.json
+  python compose_report.py --input runs --stats          # adds the summary section to the PDF
+"""
+import argparse, itertools, json, pathlib, time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from compose_report import CONDITION_ORDER, export_runs, gather_runs
+from issue_text import categorize_bullet, extract_bullets
+
+# resample matrices are built in chunks of about this many cells to bound memory
+CHUNK_CELLS = 4_000_000
+
+def _chunks(total: int, width: int):
+    step = max(1, CHUNK_CELLS // max(1, width))
+    for s in range(0, total, step):
+        yield min(step, total - s)
+
+def bootstrap_means(x: np.ndarray, n_boot: int, rng: np.random.Generator) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    out = np.empty(n_boot)
+    i = 0
+    for k in _chunks(n_boot, len(x)):
+        out[i:i + k] = x[rng.integers(0, len(x), size=(k, len(x)))].mean(axis=1)
+        i += k
+    return out
+
+def bootstrap_ci(x, n_boot: int, rng: np.random.Generator, alpha: float = 0.05) -> Dict[str, float]:
+    x = np.asarray(x, dtype=float)
+    x = x[~np.isnan(x)]
+    if len(x) == 0:
+        return {"n": 0, "mean": None, "ci_lo": None, "ci_hi": None, "median": None}
+    means = bootstrap_means(x, n_boot, rng)
+    lo, hi = np.quantile(means, [alpha / 2, 1 - alpha / 2])
+    return {"n": int(len(x)), "mean": float(x.mean()), "ci_lo": float(lo), "ci_hi": float(hi),
+            "median": float(np.median(x))}
+
+def permutation_test(a, b, n_perm: int, rng: np.random.Generator) -> Dict[str, float]:
+    """Two-sided p-value for mean(a) - mean(b) under random relabeling."""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    pooled = np.concatenate([a, b])
+    na, n = len(a), len(pooled)
+    obs = a.mean() - b.mean()
+    total = pooled.sum()
+    hits = 0
+    for k in _chunks(n_perm, n):
+        perm = rng.permuted(np.tile(pooled, (k, 1)), axis=1)
+        sa = perm[:, :na].sum(axis=1)
+        diff = sa / na - (total - sa) / (n - na)
+        hits += int((np.abs(diff) >= abs(obs) - 1e-12).sum())
+    return {"diff": float(obs), "p": (hits + 1) / (n_perm + 1)}
+
+def tag_matrix(personas: pd.DataFrame) -> pd.DataFrame:
+    """Persona × note-tag presence (0/1)."""
+    tags = personas["note_tags"].fillna("").astype(str)
+    m = tags.str.get_dummies(sep=";")
+    return m.clip(upper=1)
+
+def tag_contrasts(personas: pd.DataFrame, n_perm: int, rng: np.random.Generator,
+                  top: int = 10) -> Dict[str, Any]:
+    """Share of personas per condition with each tag, and per-pair differences with permutation p-values."""
+    X = tag_matrix(personas)
+    cond = personas["condition"].fillna("").to_numpy()
+    if X.empty:
+        return {"share": {}, "pairs": []}
+    share = X.groupby(cond).mean()
+    pairs = []
+    for ca, cb in itertools.combinations([c for c in CONDITION_ORDER if c in share.index], 2):
+        mask = np.isin(cond, [ca, cb])
+        Y = X[mask].to_numpy(dtype=float)
+        is_a = (cond[mask] == ca)
+        na, n = int(is_a.sum()), len(is_a)
+        if na == 0 or na == n:
+            continue
+        obs = Y[is_a].mean(axis=0) - Y[~is_a].mean(axis=0)
+        tot = Y.sum(axis=0)
+        hits = np.zeros(Y.shape[1])
+        for k in _chunks(n_perm, n + Y.shape[1]):
+            labels = rng.permuted(np.tile(is_a, (k, 1)), axis=1).astype(float)
+            sa = labels @ Y                                   # (k, tags): tag counts in relabeled group a
+            diff = sa / na - (tot - sa) / (n - na)
+            hits += (np.abs(diff) >= np.abs(obs) - 1e-12).sum(axis=0)
+        p = (hits + 1) / (n_perm + 1)
+        order = np.argsort(-np.abs(obs))[:top]
+        pairs.append({"a": ca, "b": cb, "tags": [
+            {"tag": X.columns[j], "share_a": float(share.loc[ca].iloc[j]), "share_b": float(share.loc[cb].iloc[j]),
+             "diff": float(obs[j]), "p": float(p[j])} for j in order
+        ]})
+    return {"share": {c: {t: round(float(v), 4) for t, v in row.items() if v} for c, row in share.iterrows()},
+            "pairs": pairs}
+
+def category_coverage(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Issue categories (categorize_bullet on Minor Friction bullets) surfaced per condition."""
+    rows = []
+    for it in items:
+        for b in extract_bullets(it.get("analysis") or "", "## Minor Friction"):
+            rows.append((it["persona"].get("condition", ""), it["persona"].get("id", ""), categorize_bullet(b)))
+    if not rows:
+        return {}
+    df = pd.DataFrame(rows, columns=["condition", "persona_id", "category"])
+    all_cats = set(df["category"])
+    by_cond = df.groupby("condition")["category"].agg(lambda s: set(s))
+    personas_per = df.groupby("condition")["persona_id"].nunique()
+    share = (df.drop_duplicates(["condition", "persona_id", "category"])
+               .groupby(["condition", "category"]).size().div(personas_per, level=0).unstack(fill_value=0.0))
+    out = {}
+    for c, cats in by_cond.items():
+        others = set().union(*[v for k, v in by_cond.items() if k != c]) if len(by_cond) > 1 else set()
+        out[c] = {"categories": len(cats), "coverage": round(len(cats) / len(all_cats), 4),
+                  "unique": sorted(cats - others),
+                  "top": [(k, round(float(v), 3)) for k, v in share.loc[c].sort_values(ascending=False).head(5).items() if v]}
+    return out
+
+def compare_conditions(root: pathlib.Path, *, n_boot: int = 10000, n_perm: int = 10000, seed: int = 0,
+                       export_dir: Optional[pathlib.Path] = None, items: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    export_dir = export_dir or root / ".report_cache" / "export"
+    personas, _, _ = export_runs(root, export_dir)
+    rng = np.random.default_rng(seed)
+    res: Dict[str, Any] = {"n_boot": n_boot, "n_perm": n_perm, "seed": seed, "conditions": {}, "pairs": []}
+    if personas is None or personas.empty:
+        return res
+    personas = personas.assign(score=pd.to_numeric(personas["score"], errors="coerce"))
+    groups = {c: g["score"].dropna().to_numpy() for c, g in personas.groupby(personas["condition"].fillna(""))}
+    conds = [c for c in CONDITION_ORDER if c in groups] + [c for c in groups if c not in CONDITION_ORDER]
+    for c in conds:
+        res["conditions"][c] = bootstrap_ci(groups[c], n_boot, rng)
+    for ca, cb in itertools.combinations(conds, 2):
+        if len(groups[ca]) and len(groups[cb]):
+            res["pairs"].append({"a": ca, "b": cb, **permutation_test(groups[ca], groups[cb], n_perm, rng)})
+    res["tags"] = tag_contrasts(personas, n_perm, rng)
+    res["coverage"] = category_coverage(items if items is not None else gather_runs(root))
+    res["elapsed_s"] = round(time.perf_counter() - t0, 2)
+    return res
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", default="runs")
+    ap.add_argument("--out", default=None, help="Write the results as JSON")
+    ap.add_argument("--bootstrap", type=int, default=10000)
+    ap.add_argument("--permutations", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    res = compare_conditions(pathlib.Path(args.input), n_boot=args.bootstrap, n_perm=args.permutations, seed=args.seed)
+    for c, r in res["conditions"].items():
+        if r["n"]:
+            print(f"{c:>8}: n={r['n']:<5} mean={r['mean']:.2f}  95% CI [{r['ci_lo']:.2f}, {r['ci_hi']:.2f}]")
+    for pr in res["pairs"]:
+        print(f"{pr['a']} − {pr['b']}: Δ={pr['diff']:+.2f}  p={pr['p']:.4f}")
+    if args.out:
+        pathlib.Path(args.out).write_text(json.dumps(res, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✅ Stats Saved: {args.out}")
+    print(f"({res.get('elapsed_s', 0)}s)")
@@ -0,0 +1,192 @@
+"""
+Live progress dashboard for run_operators.py: a local HTTP server on the run's own event loop.
+
+  GET /         minimal HTML page (EventSource)
+  GET /events   Server-Sent Events: persona start/step/finish, llm, stats (every --dashboard_interval s)
+  GET /state    JSON snapshot
+
+Hooks only update a few counters; events are built and queued only while a client is connected,
+and the stats ticker idles when nobody is listening.
+
+Usage:
+  python run_operators.py --personas personas_diverse.json --output runs/diverse --dashboard_port 8765
+  open http://127.0.0.1:8765/
+"""
+import asyncio, json, time
+from typing import Dict, Any, List, Optional
+
+# LLM latency histogram upper bounds (seconds); the last bucket is open-ended
+LATENCY_BUCKETS = (0.5, 1, 2, 4, 8, 16, 32)
+CLIENT_QUEUE = 1000  # events buffered per client before the oldest are dropped
+
+PAGE_HTML = """<!doctype html><html><head><meta charset="utf-8"><title>ueats-llm run</title>
+<style>body{font-family:system-ui,sans-serif;margin:20px;font-size:14px}table{border-collapse:collapse}
+td,th{border:1px solid #ddd;padding:3px 8px;text-align:left}.bar{display:inline-block;background:#4a7;height:10px}
+#log{height:200px;overflow:auto;font:12px monospace;background:#f6f6f6;padding:6px}</style></head><body>
+<h2>Run progress</h2><div id="summary"></div><h3>LLM latency</h3><div id="hist"></div>
+<h3>Active personas</h3><table id="active"><tr><th>Persona</th><th>Step</th><th>Last action</th><th>Elapsed</th></tr></table>
+<h3>Events</h3><div id="log"></div>
+<script>
+const es = new EventSource("/events"), log = document.getElementById("log");
+function line(t){const d=document.createElement("div");d.textContent=t;log.prepend(d);while(log.childNodes.length>300)log.lastChild.remove();}
+["persona_start","persona_finish","llm_error"].forEach(k=>es.addEventListener(k,e=>line(k+" "+e.data)));
+es.addEventListener("stats",e=>{const s=JSON.parse(e.data),q=s.queue,l=s.llm;
+ document.getElementById("summary").innerHTML=`personas: ${q.done}/${q.total} done, ${q.running} running, ${q.waiting} waiting`+
+  ` &middot; browsers ${s.browsers.active}/${s.browsers.slots}`+
+  ` &middot; LLM ${l.calls} calls, ${l.errors} errors (${(100*l.error_rate).toFixed(1)}%), ${l.in_flight} in flight`+
+  ` &middot; persona errors ${s.errors}`;
+ const m=Math.max(1,...l.hist.map(b=>b[1]));
+ document.getElementById("hist").innerHTML=l.hist.map(b=>`<div>&le;${b[0]}s <span class="bar" style="width:${200*b[1]/m}px"></span> ${b[1]}</div>`).join("");
+ document.getElementById("active").innerHTML="<tr><th>Persona</th><th>Step</th><th>Last action</th><th>Elapsed</th></tr>"+
+  s.active.map(a=>`<tr><td>${a.pid}</td><td>${a.step}</td><td>${a.action}</td><td>${a.elapsed_s}s</td></tr>`).join("");});
+</script></body></html>"""
+
+class Dashboard:
+    def __init__(self, *, total: int = 0, slots: int = 1, interval: float = 1.0):
+        self.total, self.slots, self.interval = total, slots, interval
+        self.clients: List[asyncio.Queue] = []
+        self.waiting = 0
+        self.running: Dict[str, Dict[str, Any]] = {}
+        self.done = 0
+        self.errors = 0
+        self.browsers = 0
+        self.llm = {"calls": 0, "errors": 0, "in_flight": 0, "by_stage": {}}
+        self.hist = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.ticker: Optional[asyncio.Task] = None
+        self.handlers: set = set()
+        self.wake = asyncio.Event()
+
+    # ---------------- hooks (cheap when nobody listens) ----------------
+    def _emit(self, event: str, data: Dict[str, Any]):
+        if not self.clients:
+            return
+        msg = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+        for q in self.clients:
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(msg)
+
+    def persona_queued(self):
+        self.waiting += 1
+
+    def persona_start(self, pid: str):
+        self.waiting = max(0, self.waiting - 1)
+        self.running[pid] = {"step": 0, "action": "", "t0": time.monotonic()}
+        self._emit("persona_start", {"pid": pid})
+
+    def persona_finish(self, pid: str, *, ok: bool = True, score: Optional[float] = None):
+        st = self.running.pop(pid, None)
+        self.done += 1
+        self.errors += int(not ok)
+        self._emit("persona_finish", {"pid": pid, "ok": ok, "score": score,
+                                      "elapsed_s": round(time.monotonic() - st["t0"], 1) if st else None})
+
+    def persona_skipped(self, pid: str):
+        self.done += 1
+        self._emit("persona_finish", {"pid": pid, "ok": True, "skipped": True})
+
+    def step(self, pid: str, step: int, action: str):
+        st = self.running.get(pid)
+        if st is not None:
+            st["step"], st["action"] = step, action
+        self._emit("step", {"pid": pid, "step": step, "action": action})
+
+    def browser(self, delta: int):
+        self.browsers += delta
+
+    def llm_start(self):
+        self.llm["in_flight"] += 1
+
+    def llm_done(self, stage: str, seconds: float, ok: bool):
+        self.llm["in_flight"] -= 1
+        self.llm["calls"] += 1
+        self.llm["errors"] += int(not ok)
+        s = self.llm["by_stage"].setdefault(stage, [0, 0])
+        s[0] += 1; s[1] += int(not ok)
+        i = 0
+        while i < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[i]:
+            i += 1
+        self.hist[i] += 1
+        if not ok:
+            self._emit("llm_error", {"stage": stage, "seconds": round(seconds, 2)})
+
+    # ---------------- server ----------------
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        calls = self.llm["calls"]
+        return {
+            "queue": {"total": self.total, "waiting": self.waiting, "running": len(self.running), "done": self.done},
+            "errors": self.errors,
+            "browsers": {"active": self.browsers, "slots": self.slots},
+            "llm": {"calls": calls, "errors": self.llm["errors"], "in_flight": self.llm["in_flight"],
+                    "error_rate": round(self.llm["errors"] / calls, 4) if calls else 0.0,
+                    "by_stage": {k: {"calls": v[0], "errors": v[1]} for k, v in self.llm["by_stage"].items()},
+                    "hist": [[b, n] for b, n in zip(list(LATENCY_BUCKETS) + ["inf"], self.hist)]},
+            "active": [{"pid": pid, "step": st["step"], "action": st["action"],
+                        "elapsed_s": round(now - st["t0"], 1)} for pid, st in self.running.items()],
+        }
+
+    async def _tick(self):
+        while True:
+            if not self.clients:
+                self.wake.clear()
+                await self.wake.wait()
+            self._emit("stats", self.snapshot())
+            await asyncio.sleep(self.interval)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.handlers.add(asyncio.current_task())
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            path = head.split(b" ", 2)[1].decode("latin-1") if head.count(b" ") >= 2 else "/"
+            if path.startswith("/events"):
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                             b"Connection: keep-alive\r\n\r\n")
+                q: asyncio.Queue = asyncio.Queue(CLIENT_QUEUE)
+                self.clients.append(q)
+                self.wake.set()
+                try:
+                    q.put_nowait(f"event: stats\ndata: {json.dumps(self.snapshot())}\n\n".encode("utf-8"))
+                    while True:
+                        msg = await q.get()
+                        writer.write(msg or b"event: end\ndata: {}\n\n")
+                        await writer.drain()
+                        if msg is None:  # stop()
+                            break
+                finally:
+                    self.clients.remove(q)
+            else:
+                if path.startswith("/state"):
+                    body, ctype = json.dumps(self.snapshot(), indent=1).encode("utf-8"), "application/json"
+                elif path in ("/", "/index.html"):
+                    body, ctype = PAGE_HTML.encode("utf-8"), "text/html; charset=utf-8"
+                else:
+                    body, ctype = b"not found", "text/plain"
+                status = "404 Not Found" if ctype == "text/plain" else "200 OK"
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                             f"Connection: close\r\n\r\n".encode("latin-1") + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+            self.handlers.discard(asyncio.current_task())
+
+    async def start(self, host: str, port: int) -> "Dashboard":
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.ticker = asyncio.create_task(self._tick())
+        return self
+
+    async def stop(self):
+        if self.ticker is not None:
+            self.ticker.cancel()
+        if self.server is not None:
+            self.server.close()
+        # SSE handlers only return on the None sentinel
+        for q in list(self.clients):
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(None)
+        if self.handlers:
+            await asyncio.wait(list(self.handlers), timeout=2)
@@ -0,0 +1,83 @@
+"""
+Offline gazetteer for persona locations (gazetteer.tsv): lat/lon, timezone and locale per
+"City, XX" entry of EAST_COAST and WORLDWIDE in generate_personas.py. No network lookups.
+
+The table is read once into a dict on first use. `python gazetteer.py` checks that every
+persona location is covered.
+
+Usage:
+  python gazetteer.py                      # validate and print coverage
+  python gazetteer.py --lookup "Seoul, KR"
+"""
+import argparse, csv, json, pathlib
+from typing import Dict, Any, List, Optional, Iterable
+
+GAZETTEER_FILE = pathlib.Path(__file__).with_name("gazetteer.tsv")
+
+# US state codes that are also ISO country codes: "X, MA" may be Massachusetts or Morocco
+STATE_COUNTRY_CLASH = {"AL", "AR", "AZ", "CA", "CO", "DE", "GA", "ID", "IL", "IN", "KY", "LA", "MA", "MD", "ME",
+                       "MN", "MO", "MS", "MT", "NC", "NE", "PA", "SC", "SD", "TN", "VA"}
+
+_PLACES: Optional[Dict[str, Dict[str, Any]]] = None
+_BY_SUFFIX: Dict[str, Optional[Dict[str, Any]]] = {}  # None = suffix used by more than one country
+
+def places() -> Dict[str, Dict[str, Any]]:
+    """location → {"country","lat","lon","timezone","locale"}; loaded on first call."""
+    global _PLACES
+    if _PLACES is None:
+        table: Dict[str, Dict[str, Any]] = {}
+        with open(GAZETTEER_FILE, encoding="utf-8", newline="") as fh:
+            for row in csv.DictReader(fh, delimiter="\t"):
+                loc = row.pop("location")
+                row["lat"], row["lon"] = float(row["lat"]), float(row["lon"])
+                table[loc] = row
+                # first city per ", XX" suffix stands in for unknown cities with that suffix,
+                # unless the suffix is shared by rows of different countries
+                suffix = loc.rsplit(",", 1)[-1].strip()
+                prev = _BY_SUFFIX.setdefault(suffix, row)
+                if prev is not None and prev["country"] != row["country"]:
+                    _BY_SUFFIX[suffix] = None
+        _PLACES = table
+    return _PLACES
+
+def lookup(location: str) -> Optional[Dict[str, Any]]:
+    """Exact match, else the first known city sharing an unambiguous ", XX" suffix, else None."""
+    loc = (location or "").strip()
+    table = places()
+    if loc in table:
+        return table[loc]
+    suffix = loc.rsplit(",", 1)[-1].strip().upper() if "," in loc else ""
+    if not suffix or suffix in STATE_COUNTRY_CLASH:
+        return None
+    return _BY_SUFFIX.get(suffix)
+
+def context_options(location: str) -> Optional[Dict[str, Any]]:
+    """Playwright new_context kwargs (locale, timezone_id, geolocation) for a location."""
+    p = lookup(location)
+    if p is None:
+        return None
+    return {"locale": p["locale"], "timezone_id": p["timezone"],
+            "geolocation": {"latitude": p["lat"], "longitude": p["lon"]}}
+
+def missing(locations: Iterable[str]) -> List[str]:
+    table = places()
+    return [loc for loc in locations if loc not in table]
+
+def validate() -> int:
+    """Raise if an EAST_COAST / WORLDWIDE location has no row; returns the number checked."""
+    from generate_personas import EAST_COAST, WORLDWIDE  # lazy: pulls in the OpenAI client
+    locations = list(EAST_COAST) + list(WORLDWIDE)
+    gaps = missing(locations)
+    if gaps:
+        raise ValueError(f"gazetteer.tsv is missing persona locations: {gaps}")
+    return len(locations)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lookup", type=str, default=None)
+    args = ap.parse_args()
+    if args.lookup:
+        print(json.dumps(context_options(args.lookup), ensure_ascii=False, indent=2))
+    else:
+        n = validate()
+        print(f"✅ {len(places())} places; all {n} EAST_COAST + WORLDWIDE locations covered")
@@ -10,9 +10,14 @@ Usage:
   python generate_personas.py --condition diverse --count 7
   # Custom file name:
   python generate_personas.py --condition diet --count 7 --out personas_diet_custom.json
+  # Many personas: batched async goal requests (20 goals per call, 8 in flight, ≤120 calls/min)
+  python generate_personas.py --condition diverse --count 500 --batch_size 20 --concurrency 8 --rpm 120
+  # Goals are checked against any listed persona files, and with --goal_index against all earlier runs:
+  python generate_personas.py --condition diet --count 7 --exclude_from personas_uniform.json personas_diet.json
+  python generate_personas.py --condition diet --count 7 --goal_index goal_index.json
 """
-import argparse, json, os, random
-from typing import List, Dict, Set, Optional
+import argparse, asyncio, json, math, os, random, re, time, zlib
+from typing import List, Dict, Set, Optional, Callable, Awaitable, FrozenSet, Tuple, Iterable
 
 # ----------------------------- Config ---------------------------------
 EAST_COAST = [
@@ -83,6 +88,32 @@ STUDENT_INCOMES = [
     "freelance design (~$900/mo)","gig work (~$400/mo)","TA stipend (~$1,400/mo)"
 ]
 
+DIVERSE_INCOMES = [
+    "student stipend ($700/mo)","gig work (~$400/mo)","family support (~$1,000/mo)",
+    "part-time dev ($1,800/mo)","scholarship + TA ($1,400/mo)","freelance design (~$900/mo)"
+]
+
+# region → ", XX" suffixes (US states for EAST_COAST, country codes for WORLDWIDE)
+REGIONS_EAST_COAST = {
+    "New England": ["MA","CT","RI"], "Mid-Atlantic": ["NY","NJ","PA"], "Capital": ["MD","DC","VA"],
+    "Carolinas/Georgia": ["NC","SC","GA"], "Florida": ["FL"],
+}
+REGIONS_WORLDWIDE = {
+    "East Asia": ["KR","JP","TW","HK","MO","CN"], "Southeast Asia": ["SG","MY","ID","TH","VN","PH"],
+    "Oceania": ["AU","NZ"],
+    "Europe": ["UK","FR","DE","CH","AT","CZ","HU","PL","DK","SE","NO","FI","NL","BE","ES","IT","PT","GR"],
+    "Middle East": ["TR","AE","QA","KW","BH","OM","SA","JO","LB","IL"],
+    "Africa": ["EG","MA","TN","KE","UG","ET","TZ","NG","GH","ZA"],
+    "North America": ["CA","MX"], "South America": ["BR","AR","CL","PE","CO","EC","UY","PY","BO"],
+}
+
+def locations_by_region(locations: List[str], regions: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    suffix = {code: r for r, codes in regions.items() for code in codes}
+    out: Dict[str, List[str]] = {r: [] for r in regions}
+    for loc in locations:
+        out[suffix[loc.rsplit(",", 1)[-1].strip()]].append(loc)
+    return out
+
 DIETS_CYCLIC = [
     "vegan","vegetarian","pescatarian","halal","kosher",
     "gluten-free","lactose-free","low-sodium","nut-free",
@@ -231,29 +262,298 @@ def _normalize_goal(s: str) -> str:
     # 예산 숫자/모드까지 포함해 중복 방지 강도↑
     return " ".join(s.lower().strip().split())
 
-def _valid_goal(g: str) -> bool:
+def _valid_goal(g: str, access: str = "none") -> bool:
     if not g: return False
-    ws = g.split()
+    suffix = ACCESS_SUFFIX.get(access, "")  # appended verbatim, so it does not count towards the length
+    ws = (g[:-len(suffix)] if suffix and g.endswith(suffix) else g).split()
     if len(ws) < 5 or len(ws) > 16: return False
     if '"' in g or "'" in g: return False
     if any(bad in g.lower() for bad in ["http://","https://","emoji"]): return False
     return True
 
-def unique_goal(diet: str, location: str, income: str, access: str, used: Set[str]) -> str:
+LOCAL_GOAL_TRIES = 64
+
+def fresh_local_goal(diet: str, location: str, income: str, access: str, used: "Set[str] | GoalIndex") -> str:
+    """A local goal not in used (added to it); raises when LOCAL_GOAL_TRIES draws are all duplicates."""
+    for _ in range(LOCAL_GOAL_TRIES):
+        g = local_goal(diet, location, income, access)
+        key = _normalize_goal(g)
+        if _valid_goal(g, access) and key not in used:
+            used.add(key)
+            return g
+    raise RuntimeError(f"No unique goal for {diet}/{location} after {LOCAL_GOAL_TRIES} local draws "
+                       f"({len(used)} goals in use): lower --count, set OPENAI_API_KEY for LLM goals, "
+                       "or drop --goal_index/--exclude_from files")
+
+def unique_goal(diet: str, location: str, income: str, access: str, used: "Set[str] | GoalIndex") -> str:
     for _ in range(8):
         mode = _mode()
         budget = random.choice(BUDGET_BY_INCOME[_income_band(income)])
         g = llm_goal_one(diet, location, mode, budget, access)
         if not g:
             g = local_goal(diet, location, income, access)
-        if _valid_goal(g):
+        if _valid_goal(g, access):
             key = _normalize_goal(g)
             if key not in used:
                 used.add(key)
                 return g
-    g = local_goal(diet, location, income, access) + f" #{len(used)+1}"
-    used.add(_normalize_goal(g))
-    return g
+    return fresh_local_goal(diet, location, income, access, used)
+
+# ---------------------------- Goal index -------------------------------
+# Words every goal shares (and prices, dropped by the regex) say nothing about whether two goals differ.
+_GOAL_STOP = {"a","an","the","for","to","with","and","of","in","at","on","order","under"}
+
+def goal_shingles(goal: str) -> FrozenSet[str]:
+    toks = [t for t in re.sub(r"[^a-z\s\-]+", " ", goal.lower()).split() if t not in _GOAL_STOP]
+    return frozenset(toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])])
+
+def read_persona_goals(path: str) -> List[str]:
+    """Goals from a persona file: JSON array (generate_personas.py) or JSONL (synthesize_personas.py)."""
+    with open(path, encoding="utf-8") as fh:
+        rows = [json.loads(l) for l in fh if l.strip()] if path.endswith(".jsonl") else json.load(fh)
+    return [str(r.get("goal") or "") for r in rows if isinstance(r, dict) and r.get("goal")]
+
+class GoalIndex:
+    """
+    Near-duplicate goal index, persisted across generator runs (JSON). Two goals are duplicates when the
+    Jaccard similarity of their word uni+bigrams (prices and filler words ignored) is >= threshold.
+    Prefix filtering: each goal posts only its first len - ceil(t*len) + 1 shingles, rarest first; any pair
+    at or above t shares one of them, so a lookup verifies a few candidates instead of every goal. Rarity
+    is re-counted (and postings rebuilt) whenever the index doubles; shingles seen since count as rarest.
+    Drop-in for the `used` set of normalized goals: `key in index`, `index.add(key)`, `len(index)`.
+    """
+
+    def __init__(self, threshold: float = 0.8, path: Optional[str] = None):
+        self.threshold = min(1.0, max(0.05, threshold))
+        self.path = path
+        self.source = ""  # recorded with goals added by the generators (usually the output file)
+        self.goals: List[str] = []
+        self.sources: List[str] = []
+        self.shingles: List[FrozenSet[str]] = []
+        self.exact: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = {}
+        self.df: Dict[str, int] = {}
+        self.ranked_at = 0
+        self.loaded = 0
+        self.hits = 0
+        self.comparisons = 0
+
+    @classmethod
+    def load(cls, path: Optional[str], threshold: float = 0.8, replace: Optional[str] = None) -> "GoalIndex":
+        """replace: output file being regenerated; its old goals are dropped instead of blocking the new ones."""
+        idx = cls(threshold, path)
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            for row in data.get("goals") or []:
+                if replace and row.get("source") == replace:
+                    continue
+                idx.add(row.get("goal", ""), row.get("source", ""))
+        idx.loaded = len(idx)
+        return idx
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            return
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"goals": [{"goal": g, "source": s} for g, s in zip(self.goals, self.sources)]},
+                      f, ensure_ascii=False, indent=0)
+        os.replace(tmp, path)
+
+    def exclude_from(self, paths: Iterable[str]) -> int:
+        before = len(self)
+        for path in paths:
+            for g in read_persona_goals(path):
+                self.add(g, os.path.basename(path))
+        return len(self) - before
+
+    def _rank(self, s: str) -> Tuple[int, int]:
+        return self.df.get(s, 0), zlib.crc32(s.encode("utf-8"))
+
+    def _prefix(self, sh: FrozenSet[str]) -> List[str]:
+        order = sorted(sh, key=self._rank)
+        return order[:len(order) - math.ceil(self.threshold * len(order)) + 1]
+
+    def _rebuild(self):
+        df: Dict[str, int] = {}
+        for sh in self.shingles:
+            for s in sh:
+                df[s] = df.get(s, 0) + 1
+        self.df, self.postings, self.ranked_at = df, {}, len(self.goals)
+        for i, sh in enumerate(self.shingles):
+            for s in self._prefix(sh):
+                self.postings.setdefault(s, []).append(i)
+
+    def match(self, goal: str, first: bool = False) -> Optional[Tuple[str, float]]:
+        """Most similar (or, with first=True, any) indexed goal at or above the threshold, else None."""
+        key = _normalize_goal(goal)
+        if key in self.exact:
+            return self.goals[self.exact[key]], 1.0
+        sh = goal_shingles(goal)
+        if not sh:
+            return None
+        lo, hi = self.threshold * len(sh), len(sh) / self.threshold
+        best, best_sim, seen = None, 0.0, set()
+        for s in self._prefix(sh):
+            for i in self.postings.get(s, ()):
+                if i in seen:
+                    continue
+                seen.add(i)
+                other = self.shingles[i]
+                if not lo <= len(other) <= hi:
+                    continue
+                self.comparisons += 1
+                inter = len(sh & other)
+                sim = inter / (len(sh) + len(other) - inter)
+                if sim >= self.threshold and sim > best_sim:
+                    best, best_sim = i, sim
+                    if first:
+                        return self.goals[i], sim
+        return (self.goals[best], best_sim) if best is not None else None
+
+    def __contains__(self, goal: str) -> bool:
+        hit = self.match(goal, first=True) is not None
+        self.hits += hit
+        return hit
+
+    def add(self, goal: str, source: Optional[str] = None):
+        key = _normalize_goal(goal)
+        if not key or key in self.exact:
+            return
+        i = len(self.goals)
+        sh = goal_shingles(goal)
+        self.goals.append(goal); self.sources.append(self.source if source is None else source)
+        self.shingles.append(sh)
+        self.exact[key] = i
+        if len(self.goals) >= max(64, 2 * self.ranked_at):
+            self._rebuild()
+            return
+        for s in self._prefix(sh):
+            self.postings.setdefault(s, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.goals)
+
+# ----------------------- Batched goal generation ----------------------
+GOAL_BATCH_PROMPT = (
+    "Write ONE concrete food-ordering goal (8-12 words), imperative voice, for EACH numbered persona below.\n"
+    "Each goal must include a dish or cuisine, the persona's diet, mode and budget ('under $N'), and fit the location. "
+    "Start with 'Order'. No quotes, no emojis, no extra commentary. "
+    "Append the persona's accessibility suffix verbatim at the end if non-empty.\n"
+    "Return JSON only: {\"goals\": [{\"i\": <number>, \"goal\": \"...\"}, ...]}\n\n"
+)
+
+class RateLimiter:
+    """Spaces request starts so at most rpm start per minute (0 = unlimited)."""
+
+    def __init__(self, rpm: int = 0):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async_client = None  # AsyncOpenAI, created on first batched call
+
+async def llm_goal_batch(rows: List[Dict], *, model: str = "gpt-5-mini", temp: float = 0.6) -> Dict[int, str]:
+    """One chat call for many personas → {row index: goal}. Rows: i, diet, location, mode, budget, access."""
+    global async_client
+    if async_client is None:
+        from openai import AsyncOpenAI
+        async_client = AsyncOpenAI()
+    lines = [
+        f"{r['i']}. diet='{r['diet']}', mode='{r['mode']}', budget under ${r['budget']}, "
+        f"location='{r['location']}', suffix='{ACCESS_SUFFIX.get(r['access'], '')}'"
+        for r in rows
+    ]
+    try:
+        resp = await async_client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": GOAL_BATCH_PROMPT + "\n".join(lines)}],
+            temperature=temp,
+            response_format={"type": "json_object"},
+        )
+        raw = resp.choices[0].message.content or "{}"
+        try:
+            obj = json.loads(raw)
+        except Exception:
+            m = re.search(r"\{[\s\S]*\}", raw)
+            obj = json.loads(m.group(0)) if m else {}
+        out: Dict[int, str] = {}
+        for g in obj.get("goals") or []:
+            if isinstance(g, dict) and isinstance(g.get("i"), int):
+                out[g["i"]] = str(g.get("goal") or "").strip()
+        return out
+    except Exception:
+        return {}
+
+async def generate_goals_batched(personas: List[Dict], used: "Set[str] | GoalIndex", *,
+                                 batch_size: int = 20, concurrency: int = 8, rpm: int = 0, rounds: int = 2,
+                                 request: Optional[Callable[..., Awaitable[Dict[int, str]]]] = None) -> Dict[str, int]:
+    """
+    Fill persona["goal"] for every persona. Mode/budget are drawn up front in persona order; each round
+    sends the still-missing personas in batches concurrently; answers are accepted in persona order
+    (so --seed stays deterministic for the same model output) and the rest fall back to local_goal.
+    """
+    request = request or llm_goal_batch
+    rows = [{"i": i, "diet": p["diet"], "location": p["location"], "access": p["accessibility"],
+             "income": p["income"], "mode": _mode(),
+             "budget": random.choice(BUDGET_BY_INCOME[_income_band(p["income"])])}
+            for i, p in enumerate(personas)]
+    sem = asyncio.Semaphore(max(1, concurrency))
+    limiter = RateLimiter(rpm)
+    stats = {"calls": 0, "llm_goals": 0, "local_goals": 0, "rejected": 0}
+
+    async def _one(chunk):
+        async with sem:
+            await limiter.wait()
+            stats["calls"] += 1
+            return await request(chunk)
+
+    pending = rows
+    for _ in range(max(1, rounds)):
+        if not pending:
+            break
+        chunks = [pending[k:k + batch_size] for k in range(0, len(pending), batch_size)]
+        answers: Dict[int, str] = {}
+        for got in await asyncio.gather(*[_one(c) for c in chunks]):
+            answers.update(got)
+        still = []
+        for r in pending:
+            g = answers.get(r["i"], "")
+            key = _normalize_goal(g)
+            if _valid_goal(g, r["access"]) and key not in used:
+                used.add(key)
+                personas[r["i"]]["goal"] = g
+                stats["llm_goals"] += 1
+            else:
+                stats["rejected"] += int(bool(g))
+                still.append(r)
+        pending = still
+
+    for r in pending:
+        personas[r["i"]]["goal"] = fresh_local_goal(r["diet"], r["location"], r["income"], r["access"], used)
+        stats["local_goals"] += 1
+    return stats
+
+def assign_goals(personas: List[Dict], used: "Set[str] | GoalIndex", *, batch_size: int, concurrency: int,
+                 rpm: int, rounds: int) -> Dict[str, int]:
+    if USE_OPENAI and batch_size > 0:
+        return asyncio.run(generate_goals_batched(personas, used, batch_size=batch_size,
+                                                  concurrency=concurrency, rpm=rpm, rounds=rounds))
+    for p in personas:
+        p["goal"] = unique_goal(p["diet"], p["location"], p["income"], p["accessibility"], used)
+    return {"calls": 0, "llm_goals": 0, "local_goals": len(personas), "rejected": 0}
 
 # ---------------------------- Builders --------------------------------
 def make_id(prefix: str, n: int) -> str:
@@ -291,10 +591,7 @@ def build_diverse(n: int,
         "id": make_id("F", n),
         "condition": "diverse",
         "age": random.randint(18, 65),
-        "income": random.choice([
-            "student stipend ($700/mo)","gig work (~$400/mo)","family support (~$1,000/mo)",
-            "part-time dev ($1,800/mo)","scholarship + TA ($1,400/mo)","freelance design (~$900/mo)"
-        ]),
+        "income": random.choice(DIVERSE_INCOMES),
         "location": forced_location or random.choice(WORLDWIDE),
         "diet": forced_diet or random.choice(DIETS_DIVERSE),
         "accessibility": forced_access or random.choice(ACCESS_LIST_DIVERSE),
@@ -332,27 +629,43 @@ def main():
     ap.add_argument("--seed", type=int, default=None)
     ap.add_argument("--out", type=str, default=None,
                     help="출력 파일명 (기본: personas_<condition>.json)")
+    ap.add_argument("--batch_size", type=int, default=20,
+                    help="Goals per LLM call (0 = one call per persona, the old path)")
+    ap.add_argument("--concurrency", type=int, default=8, help="Batched goal requests in flight")
+    ap.add_argument("--rpm", type=int, default=0, help="Max goal requests per minute (0 = unlimited)")
+    ap.add_argument("--goal_rounds", type=int, default=2, help="Batched rounds before falling back to local goals")
+    ap.add_argument("--goal_index", type=str, default="",
+                    help="Persistent goal index shared across runs, e.g. goal_index.json (default: this run only)")
+    ap.add_argument("--dedup_threshold", type=float, default=0.8,
+                    help="Word uni+bigram Jaccard at which two goals count as duplicates")
+    ap.add_argument("--exclude_from", "--exclude-from", nargs="*", default=[],
+                    help="Persona files (.json/.jsonl) whose goals must not be repeated")
     args = ap.parse_args()
     if args.seed is not None:
         random.seed(args.seed)
 
-    used_goals: Set[str] = set()
+    out_path = args.out or f"personas_{args.condition}.json"
+    used_goals = GoalIndex.load(args.goal_index or None, args.dedup_threshold, replace=os.path.basename(out_path))
+    excluded = used_goals.exclude_from(args.exclude_from)
+    used_goals.source = os.path.basename(out_path)
     out: List[Dict] = []
+    # without batching, goals are drawn right after each persona, so a --seed gives the same file on every
+    # run (not the files of versions with other goal checks); batched goals come after all personas are built
+    batched = USE_OPENAI and args.batch_size > 0
+
+    def add(p: Dict):
+        if not batched:
+            p["goal"] = unique_goal(p["diet"], p["location"], p["income"], p["accessibility"], used_goals)
+        out.append(p)
 
     if args.condition == "uniform":
         for i in range(args.count):
-            p = build_uniform(i+1)
-            p["goal"] = unique_goal(p["diet"], p["location"], p["income"], p["accessibility"], used_goals)
-            out.append(p)
-        validate_uniform(out)
+            add(build_uniform(i+1))
 
     elif args.condition == "diet":
         for i in range(args.count):
             diet = DIETS_CYCLIC[i % len(DIETS_CYCLIC)]
-            p = build_diet_only(i+1, diet)
-            p["goal"] = unique_goal(p["diet"], p["location"], p["income"], p["accessibility"], used_goals)
-            out.append(p)
-        validate_diet(out)
+            add(build_diet_only(i+1, diet))
 
     else:  # diverse
         k = min(6, args.count)
@@ -366,16 +679,23 @@ def main():
             forced_loc  = loc_pool[i]  if i < len(loc_pool)  else random.choice(WORLDWIDE)
             forced_acc  = acc_pool[i]  if i < len(acc_pool)  else random.choice(ACCESS_LIST_DIVERSE)
 
-            p = build_diverse(i+1, forced_diet=forced_diet,
+            add(build_diverse(i+1, forced_diet=forced_diet,
                               forced_location=forced_loc,
-                              forced_access=forced_acc)
-            p["goal"] = unique_goal(p["diet"], p["location"], p["income"], p["accessibility"], used_goals)
-            out.append(p)
-        validate_diverse(out)
+                              forced_access=forced_acc))
+
+    if batched:
+        t0 = time.perf_counter()
+        st = assign_goals(out, used_goals, batch_size=args.batch_size, concurrency=args.concurrency,
+                          rpm=args.rpm, rounds=args.goal_rounds)
+        print(f"Goals: {st['llm_goals']} LLM, {st['local_goals']} local in {st['calls']} calls "
+              f"({time.perf_counter() - t0:.1f}s)")
+    {"uniform": validate_uniform, "diet": validate_diet, "diverse": validate_diverse}[args.condition](out)
+    print(f"Goal index: {used_goals.loaded} loaded, {excluded} excluded, {used_goals.hits} near-duplicates "
+          f"rejected ({used_goals.comparisons} comparisons)")
 
-    out_path = args.out or f"personas_{args.condition}.json"
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(out, f, ensure_ascii=False, indent=2)
+    used_goals.save()
     print(f"✅ Saved {out_path}")
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+"""
+Text helpers for issue bullets: normalization, section/bullet extraction, categories.
+Stdlib only, so offline tools (cluster_issues.py, condition_stats.py) can use them without importing
+run_operators.py (playwright, openai client).
+"""
+import re
+from typing import List
+
+_STOPWORDS = set("the a an to for of on in at by with and or but so that as is are was were be been being it this those these my your our their from into over under within before after between across".split())
+
+def _simple_stem(w: str) -> str:
+    w = w.lower()
+    for suf in ("ing","ed","ly","es","s"):
+        if w.endswith(suf) and len(w) > len(suf)+2:
+            w = w[: -len(suf)]
+    return w
+
+def normalize_line(s: str) -> str:
+    s = s.strip().lower()
+    s = re.sub(r"[^\w\s\-]+", "", s)
+    toks = [t for t in s.split() if t and t not in _STOPWORDS]
+    toks = [_simple_stem(t) for t in toks]
+    return " ".join(toks).strip()
+
+def extract_section(md: str, header: str) -> str:
+    lines = md.splitlines()
+    out, on = [], False
+    for ln in lines:
+        if ln.strip().startswith("## "):
+            on = (ln.strip() == header)
+            continue
+        if on: out.append(ln)
+    return "\n".join(out).strip()
+
+def extract_bullets(md: str, header: str) -> List[str]:
+    sec = extract_section(md, header)
+    out = []
+    for ln in sec.splitlines():
+        if ln.strip().startswith("- "):
+            out.append(ln.strip()[2:].strip())
+    return out
+
+def categorize_bullet(text: str) -> str:
+    t = normalize_line(text)
+    kw = [
+        ("too_many_taps", ["too many taps","longer than expected","confirm choices"]),
+        ("filter_discoverability", ["filter placement","find where to filter","controls felt buried"]),
+        ("label_ambiguity", ["generic","wording","didnt convey"]),
+        ("loading_feedback", ["loading","feedback","applied","updated","acknowledgment"]),
+        ("stall", ["stall","pause","retrying"]),
+        ("fee_transparency", ["fee","breakdown"]),
+        ("upsell_pressure", ["upsell","add-on","add on","crowded"]),
+        ("diet_badges", ["diet badge","vegan marker","vegetarian marker"]),
+        ("allergen_flags", ["allergen"]),
+        ("aria_accessibility", ["screen reader","aria","assistive"]),
+        ("contrast_low", ["contrast","color alone"]),
+        ("tap_target_small", ["tap target","mis-tap"]),
+        ("budget_visibility", ["budget","cap results","under my target"]),
+        ("price_sorting", ["sorting by price","cheapest"]),
+        ("info_density", ["dense","packed","many elements"]),
+        ("redundant_steps", ["repeat","repeated","same choice"]),
+        ("thumb_reach", ["thumb zone","near the top"])
+    ]
+    for cat, words in kw:
+        if any(w in t for w in words):
+            return cat
+    return "label_ambiguity"
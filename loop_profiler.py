@@ -0,0 +1,178 @@
+"""
+CPU profiling of the synchronous parts of analyze_and_save (run_operators.py --profile).
+
+The analysis coroutine is stepped by hand: each resume → next await is one synchronous section, i.e. the time
+the event loop (and every agent loop sharing it) was blocked by this persona. During those sections only:
+  - a cProfile.Profile per persona is enabled       → <output>/_profile/<pid>.prof (pstats / snakeviz)
+  - a sampler thread records the main-thread stack  → <output>/_profile/analysis.folded
+    (collapsed stacks: flamegraph.pl, speedscope, inferno)
+Sections above --profile_threshold_ms are printed and listed in _profile/summary.json, together with
+event-loop lag (how late a --profile_lag_interval_ms sleep wakes up) for the whole run.
+
+Usage:
+  python run_operators.py --personas personas_diverse.json --output runs/diverse --profile
+  flamegraph.pl runs/diverse/_profile/analysis.folded > analysis.svg
+  python -m pstats runs/diverse/_profile/F-01.prof
+"""
+import asyncio, cProfile, io, json, os, pathlib, pstats, sys, threading, time
+from typing import Dict, Any, List, Optional, Tuple
+
+def _where(coro) -> str:
+    """function:line of the await the coroutine is suspended at (or "return" once finished)."""
+    frame = getattr(coro, "cr_frame", None)
+    return f"{frame.f_code.co_name}:{frame.f_lineno}" if frame is not None else "return"
+
+def _percentile(xs: List[float], q: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+class _Sampler(threading.Thread):
+    """Samples the loop thread's stack while a section is active; idles otherwise."""
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True, name="loop-profiler-sampler")
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.active: Optional[str] = None  # persona id while a section runs
+        self.wake = threading.Event()
+        self.done = False
+        self.stacks: Dict[str, int] = {}
+
+    def run(self):
+        while not self.done:
+            if self.active is None:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            frame = sys._current_frames().get(self.target)
+            names = []
+            while frame is not None and frame.f_code is not _STEP_CODE:  # stacks start below LoopProfiler._step
+                names.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)})")
+                frame = frame.f_back
+            if frame is not None and names and self.active is not None:
+                key = ";".join(reversed(names))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            time.sleep(self.interval)
+
+class LoopProfiler:
+    def __init__(self, out_dir: pathlib.Path, *, threshold_ms: float = 50.0,
+                 lag_interval_ms: float = 50.0, sample_ms: float = 1.0):
+        self.out_dir = pathlib.Path(out_dir)
+        self.threshold = threshold_ms / 1000
+        self.lag_interval = lag_interval_ms / 1000
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.personas: Dict[str, Dict[str, Any]] = {}
+        self.flagged: List[Dict[str, Any]] = []
+        self.lags: List[float] = []
+        self.lag_events: List[Tuple[float, float]] = []
+        self.t0 = time.monotonic()
+        self.sampler = _Sampler(sample_ms / 1000)
+        self.lag_task: Optional[asyncio.Task] = None
+        self.switch = sys.getswitchinterval()
+
+    # ---------------- event-loop lag ----------------
+    async def _lag_loop(self):
+        while True:
+            t = time.monotonic()
+            await asyncio.sleep(self.lag_interval)
+            lag = time.monotonic() - t - self.lag_interval
+            self.lags.append(lag)
+            if lag > self.threshold:
+                self.lag_events.append((round(t - self.t0, 3), round(lag * 1000, 1)))
+
+    def start(self) -> "LoopProfiler":
+        sys.setswitchinterval(min(self.switch, self.sampler.interval))  # let the sampler get the GIL at its own rate
+        self.sampler.start()
+        self.lag_task = asyncio.create_task(self._lag_loop())
+        return self
+
+    # ---------------- sections ----------------
+    def _record(self, pid: str, start: str, end: str, seconds: float):
+        st = self.personas.setdefault(pid, {"sections": 0, "sync_ms": 0.0, "max_ms": 0.0})
+        st["sections"] += 1
+        st["sync_ms"] += seconds * 1000
+        st["max_ms"] = max(st["max_ms"], seconds * 1000)
+        if seconds > self.threshold:
+            self.flagged.append({"pid": pid, "ms": round(seconds * 1000, 1), "from": start, "to": end})
+            print(f"  {pid} blocked the event loop {seconds * 1000:.0f} ms ({start} → {end})")
+
+    def _step(self, pid: str, coro, prof: cProfile.Profile, method, arg):
+        start = _where(coro)
+        self.sampler.active = pid
+        self.sampler.wake.set()
+        t = time.perf_counter()
+        prof.enable()
+        try:
+            return method(arg)
+        finally:
+            prof.disable()
+            dt = time.perf_counter() - t
+            self.sampler.active = None
+            self._record(pid, start, _where(coro), dt)
+
+    async def wrap(self, pid: str, coro):
+        """Await coro, profiling each synchronous section under pid."""
+        return await _Profiled(self, pid, coro)
+
+    # ---------------- output ----------------
+    def stop(self) -> Dict[str, Any]:
+        if self.lag_task is not None:
+            self.lag_task.cancel()
+        self.sampler.done = True
+        self.sampler.wake.set()
+        sys.setswitchinterval(self.switch)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        for pid, prof in self.profiles.items():
+            prof.dump_stats(str(self.out_dir / (pid.replace("/", "__") + ".prof")))
+        folded = self.out_dir / "analysis.folded"
+        folded.write_text("".join(f"{k} {n}\n" for k, n in sorted(self.sampler.stacks.items())), encoding="utf-8")
+        top: List[Dict[str, Any]] = []
+        if self.profiles:
+            stats = pstats.Stats(*self.profiles.values(), stream=io.StringIO())
+            rows = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:15]  # by own time
+            top = [{"function": f"{os.path.basename(f)}:{ln}({fn})", "calls": nc,
+                    "own_ms": round(tt * 1000, 1), "cum_ms": round(ct * 1000, 1)}
+                   for (f, ln, fn), (cc, nc, tt, ct, _) in rows]
+        summary = {
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "personas": {k: {**v, "sync_ms": round(v["sync_ms"], 1), "max_ms": round(v["max_ms"], 1)}
+                         for k, v in self.personas.items()},
+            "flagged": sorted(self.flagged, key=lambda x: -x["ms"]),
+            "loop_lag": {"interval_ms": round(self.lag_interval * 1000, 1), "samples": len(self.lags),
+                         "p50_ms": round(_percentile(self.lags, 0.50) * 1000, 1),
+                         "p95_ms": round(_percentile(self.lags, 0.95) * 1000, 1),
+                         "p99_ms": round(_percentile(self.lags, 0.99) * 1000, 1),
+                         "max_ms": round(max(self.lags, default=0.0) * 1000, 1),
+                         "over_threshold": self.lag_events},
+            "top_functions": top,
+            "folded_samples": sum(self.sampler.stacks.values()),
+        }
+        (self.out_dir / "summary.json").write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+        return summary
+
+_STEP_CODE = LoopProfiler._step.__code__
+
+class _Profiled:
+    """Drives a coroutine step by step for LoopProfiler; yields pass through to the running Task unchanged."""
+
+    def __init__(self, profiler: LoopProfiler, pid: str, coro):
+        self.profiler, self.pid, self.coro = profiler, pid, coro
+
+    def __await__(self):
+        prof = self.profiler.profiles.setdefault(self.pid, cProfile.Profile())
+        method, arg = self.coro.send, None
+        while True:
+            try:
+                fut = self.profiler._step(self.pid, self.coro, prof, method, arg)
+            except StopIteration as e:
+                return e.value
+            try:
+                arg = yield fut
+                method = self.coro.send
+            except GeneratorExit:
+                self.coro.close()
+                raise
+            except BaseException as e:
+                method, arg = self.coro.throw, e
@@ -0,0 +1,209 @@
+"""
+Prometheus-compatible metrics for long run_operators.py cohorts (text exposition format 0.0.4, stdlib only).
+
+Exposed on a local /metrics endpoint (--metrics_port) and/or written atomically to a node_exporter
+textfile (--metrics_file, every --metrics_interval s and at exit).
+
+Label cardinality is bounded: every label value passes through an allow-list (anything else becomes
+"other"), and each metric keeps at most MAX_SERIES label sets.
+
+Usage:
+  python run_operators.py --personas personas_diverse.json --output runs/diverse --metrics_port 9464
+  python run_operators.py ... --metrics_file /var/lib/node_exporter/textfile/ueats.prom
+"""
+import asyncio, os, time
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+MAX_SERIES = 200
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+STEP_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+BYTES_BUCKETS = (16e3, 64e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6)
+SCORE_BUCKETS = (1, 2, 3, 4, 5)
+
+MODELS = ("gpt-5", "gpt-5-mini", "gpt-5-nano", "gpt-4o", "gpt-4o-mini")
+STAGES = ("agent", "tabs", "analysis", "rewrite", "suggestions")
+ACTIONS = ("click", "type", "wait", "wait_for", "wait_ms", "scroll", "note", "back", "explore", "stop")
+CONDITIONS = ("uniform", "diet", "diverse")
+OUTCOMES = ("reached_review", "max_steps", "stuck", "timeouts", "budget", "error", "other")
+DEDUP_KINDS = ("pairwise", "corpus")
+
+def bounded(value: Any, allowed: Iterable[str]) -> str:
+    v = str(value or "").lower()
+    return v if v in allowed else "other"
+
+def model_label(model: str) -> str:
+    """Longest known model name contained in the id (dated snapshots map to their family)."""
+    m = (model or "").lower()
+    keys = [k for k in MODELS if k in m]
+    return max(keys, key=len) if keys else "other"
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt_num(x: float) -> str:
+    return repr(float(x)) if isinstance(x, float) and not x.is_integer() else str(int(x))
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, values: Tuple[str, ...]) -> Tuple[str, ...]:
+        if values not in self.values and len(self.values) >= MAX_SERIES:
+            return ("other",) * len(self.labels)
+        return values
+
+    def inc(self, *values: str, n: float = 1):
+        k = self._key(values)
+        self.values[k] = self.values.get(k, 0) + n
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for k, v in sorted(self.values.items()):
+            out.append(f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_num(v)}")
+        return out
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LLM_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = buckets
+        self.series: Dict[Tuple[str, ...], List[float]] = {}  # per-bucket counts, then sum, count
+
+    def observe(self, value: float, *values: str):
+        if values not in self.series and len(self.series) >= MAX_SERIES:
+            values = ("other",) * len(self.labels)
+        s = self.series.get(values)
+        if s is None:
+            s = self.series[values] = [0] * (len(self.buckets) + 2)
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                s[i] += 1
+                break
+        s[-2] += value
+        s[-1] += 1
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        les = ['le="%s"' % _fmt_num(float(b)) for b in self.buckets]
+        inf = 'le="+Inf"'
+        for k, s in sorted(self.series.items()):
+            cum = 0
+            for le, n in zip(les, s):
+                cum += n
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, le)} {int(cum)}")
+            out.append(f"{self.name}_bucket{_fmt_labels(self.labels, k, inf)} {int(s[-1])}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, k)} {_fmt_num(round(s[-2], 6))}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, k)} {int(s[-1])}")
+        return out
+
+class Metrics:
+    """All run_operators metrics; hook methods take raw values and bound the labels themselves."""
+
+    def __init__(self):
+        p = "ueats_"
+        self.llm_calls = Counter(p + "llm_calls_total", "LLM chat calls.", ("model", "stage", "status"))
+        self.llm_tokens = Counter(p + "llm_tokens_total", "LLM tokens by kind (prompt includes cached).",
+                                  ("model", "stage", "kind"))
+        self.llm_latency = Histogram(p + "llm_latency_seconds", "LLM call latency.", ("stage",), LLM_BUCKETS)
+        self.step_latency = Histogram(p + "step_latency_seconds", "Agent action execution time.", ("action",), STEP_BUCKETS)
+        self.content_bytes = Histogram(p + "page_content_bytes", "Size of page.content() snapshots.", (), BYTES_BUCKETS)
+        self.browser_launches = Counter(p + "browser_launches_total", "Browser launches.", ("engine", "status"))
+        self.browser_crashes = Counter(p + "browser_crashes_total", "Sessions that ended in an exception.", ("engine",))
+        self.rewrites = Counter(p + "rewrite_retries_total", "Diversify rewrite attempts.", ("outcome",))
+        self.dedup = Counter(p + "dedup_comparisons_total", "Similarity comparisons in de-duplication.", ("kind",))
+        self.outcomes = Counter(p + "persona_outcomes_total", "Finished personas by condition and outcome.",
+                                ("condition", "outcome"))
+        self.scores = Histogram(p + "persona_score", "Final persona scores.", ("condition",), SCORE_BUCKETS)
+        self.started = time.time()
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.writer: Optional[asyncio.Task] = None
+
+    # ---------------- hooks ----------------
+    def llm(self, model: str, stage: str, seconds: float, ok: bool, usage: Optional[Dict[str, int]] = None):
+        m, st = model_label(model), bounded(stage, STAGES)
+        self.llm_calls.inc(m, st, "ok" if ok else "error")
+        self.llm_latency.observe(seconds, st)
+        for kind in ("prompt", "cached", "completion"):
+            n = (usage or {}).get(f"{kind}_tokens", 0)
+            if n:
+                self.llm_tokens.inc(m, st, kind, n=n)
+
+    def step(self, action: str, seconds: float):
+        self.step_latency.observe(seconds, bounded(action, ACTIONS))
+
+    def content(self, nbytes: int):
+        self.content_bytes.observe(nbytes)
+
+    def launch(self, engine: str, ok: bool):
+        self.browser_launches.inc(bounded(engine, ("webkit", "chromium", "firefox")), "ok" if ok else "error")
+
+    def crash(self, engine: str):
+        self.browser_crashes.inc(bounded(engine, ("webkit", "chromium", "firefox")))
+
+    def rewrite(self, passed: bool, n: int = 1):
+        self.rewrites.inc("passed" if passed else "failed", n=n)
+
+    def comparisons(self, kind: str, n: int = 1):
+        self.dedup.inc(bounded(kind, DEDUP_KINDS), n=n)
+
+    def outcome(self, condition: str, outcome: str, score: Optional[float] = None):
+        c = bounded(condition, CONDITIONS)
+        self.outcomes.inc(c, bounded(outcome, OUTCOMES))
+        if score is not None:
+            self.scores.observe(float(score), c)
+
+    # ---------------- exposition ----------------
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in (self.llm_calls, self.llm_tokens, self.llm_latency, self.step_latency, self.content_bytes,
+                  self.browser_launches, self.browser_crashes, self.rewrites, self.dedup, self.outcomes, self.scores):
+            lines += m.render()
+        lines += ["# HELP ueats_run_start_time_seconds Unix time the run started.",
+                  "# TYPE ueats_run_start_time_seconds gauge", f"ueats_run_start_time_seconds {int(self.started)}"]
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path: str):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)  # textfile collectors must never see a partial file
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            path = head.split(b" ", 2)[1] if head.count(b" ") >= 2 else b"/"
+            if path.startswith(b"/metrics"):
+                body, status = self.render().encode("utf-8"), "200 OK"
+            else:
+                body, status = b"see /metrics\n", "404 Not Found"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write_loop(self, path: str, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.write_file(path)
+
+    async def start(self, *, host: str = "127.0.0.1", port: int = 0,
+                    path: Optional[str] = None, interval: float = 15.0) -> "Metrics":
+        if port:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        if path:
+            self.writer = asyncio.create_task(self._write_loop(path, interval))
+        return self
+
+    async def stop(self, path: Optional[str] = None):
+        if self.writer is not None:
+            self.writer.cancel()
+        if path:
+            self.write_file(path)
+        if self.server is not None:
+            self.server.close()
@@ -7,10 +7,12 @@
 # - Dynamic axis suggestions (target 30/axis) + rewrite for variety
 # - GPT-5 param guard (no top_p, etc.), max_tokens→max_completion_tokens auto-map
 
-import argparse, asyncio, json, pathlib, random, re, time, difflib
+import argparse, asyncio, contextlib, contextvars, itertools, json, pathlib, random, re, sys, time, difflib
 from typing import Dict, Any, List, Optional, Tuple, Set
 from playwright.async_api import async_playwright, TimeoutError as PWTimeout
 from openai import AsyncOpenAI, BadRequestError
+from gazetteer import context_options as gazetteer_context
+from issue_text import normalize_line, extract_section, extract_bullets, categorize_bullet
 
 client = AsyncOpenAI()
 
@@ -99,7 +101,7 @@ async def chat_create_safe(model: str, messages,
                            temperature: float = 0.7, top_p: float = 1.0,
                            presence_penalty: float | None = None,
                            frequency_penalty: float | None = None,
-                           max_tokens: int = 400):
+                           max_tokens: int = 400, stage: str = "other"):
     params = {}
     caps = _assume_caps(model)
 
@@ -117,7 +119,20 @@ async def chat_create_safe(model: str, messages,
     _normalize_token_arg(model, params, max_tokens)
 
     async def _try(opts):
-        return await client.chat.completions.create(model=model, messages=messages, **opts)
+        if DASHBOARD is not None:
+            DASHBOARD.llm_start()
+        t0, ok = time.monotonic(), False
+        try:
+            resp = await client.chat.completions.create(model=model, messages=messages, **opts)
+            ok = True
+        finally:
+            if DASHBOARD is not None:
+                DASHBOARD.llm_done(stage, time.monotonic() - t0, ok)
+            if METRICS is not None:
+                METRICS.llm(model, stage, time.monotonic() - t0, ok, add_usage({}, resp) if ok else None)
+        if GOVERNOR is not None:
+            GOVERNOR.record(stage, model, resp)
+        return resp
 
     try:
         return await _try(params)
@@ -140,23 +155,167 @@ async def chat_create_safe(model: str, messages,
         _normalize_token_arg(model, params, max_tokens)
         return await _try(params)
 
-# ---------------- Similarity / normalization ----------------
-_STOPWORDS = set("the a an to for of on in at by with and or but so that as is are was were be been being it this those these my your our their from into over under within before after between across".split())
-
-def _simple_stem(w: str) -> str:
-    w = w.lower()
-    for suf in ("ing","ed","ly","es","s"):
-        if w.endswith(suf) and len(w) > len(suf)+2:
-            w = w[: -len(suf)]
-    return w
-
-def normalize_line(s: str) -> str:
-    s = s.strip().lower()
-    s = re.sub(r"[^\w\s\-]+", "", s)
-    toks = [t for t in s.split() if t and t not in _STOPWORDS]
-    toks = [_simple_stem(t) for t in toks]
-    return " ".join(toks).strip()
+def usage_tokens(resp) -> int:
+    try: return int(getattr(resp.usage, "total_tokens", 0) or 0)
+    except Exception: return 0
+
+def add_usage(acc: Dict[str, int], resp) -> Dict[str, int]:
+    """Accumulate prompt/cached/completion tokens from a chat response (missing fields count as 0)."""
+    u = getattr(resp, "usage", None)
+    details = getattr(u, "prompt_tokens_details", None)
+    acc["calls"] = acc.get("calls", 0) + 1
+    acc["prompt_tokens"] = acc.get("prompt_tokens", 0) + int(getattr(u, "prompt_tokens", 0) or 0)
+    acc["cached_tokens"] = acc.get("cached_tokens", 0) + int(getattr(details, "cached_tokens", 0) or 0)
+    acc["completion_tokens"] = acc.get("completion_tokens", 0) + int(getattr(u, "completion_tokens", 0) or 0)
+    return acc
+
+def cache_hit_rate(acc: Dict[str, int]) -> float:
+    return (acc.get("cached_tokens", 0) / acc["prompt_tokens"]) if acc.get("prompt_tokens") else 0.0
+
+# ---------------- Cost governor ----------------
+# $ per 1M tokens: (input, cached input, output); the longest key contained in the model name wins
+MODEL_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-5": (1.25, 0.125, 10.0), "gpt-5-mini": (0.25, 0.025, 2.0), "gpt-5-nano": (0.05, 0.005, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.0), "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+STAGES = ("agent", "tabs", "analysis", "rewrite", "suggestions")
+current_persona: contextvars.ContextVar[str] = contextvars.ContextVar("current_persona", default="")
+
+class CostGovernor:
+    """
+    Run-level budgets: tokens, dollars, wall minutes, browser-minutes, plus tokens/dollars per stage.
+    chat_create_safe records every response (per stage, and per persona via current_persona).
+    Callers check pressure(stage) before spending: at >= soft they degrade (shorter agent history,
+    one rewrite, pool-based suggestions); at >= 1.0 they skip the LLM (agent stops, analysis uses
+    the template path).
+    """
+
+    def __init__(self, *, tokens: int = 0, usd: float = 0.0, wall_min: float = 0.0, browser_min: float = 0.0,
+                 stages: Optional[Dict[str, Dict[str, float]]] = None, soft: float = 0.8,
+                 prices: Optional[Dict[str, Tuple[float, float, float]]] = None):
+        self.limits = {"tokens": tokens, "usd": usd, "wall_min": wall_min, "browser_min": browser_min}
+        self.stage_limits = {k: dict(v) for k, v in (stages or {}).items()}
+        self.soft = soft
+        self.prices = {**MODEL_PRICES, **{k: tuple(v) for k, v in (prices or {}).items()}}
+        self.t0 = time.monotonic()
+        self.browser_s = 0.0
+        self.open_browsers: Dict[int, float] = {}  # slot → start, counted by pressure() while the session runs
+        self._slots = itertools.count()
+        self.inflight: Dict[str, int] = {}
+        self.total: Dict[str, float] = {}
+        self.by_stage: Dict[str, Dict[str, float]] = {}
+        self.by_persona: Dict[str, Dict[str, Any]] = {}
+        self.degraded: Dict[str, int] = {}
+
+    def price(self, model: str) -> Tuple[float, float, float]:
+        m = model.lower()
+        keys = [k for k in self.prices if k in m]
+        return self.prices[max(keys, key=len)] if keys else (0.0, 0.0, 0.0)
+
+    def _persona(self) -> Dict[str, Any]:
+        return self.by_persona.setdefault(current_persona.get() or "-", {"stages": {}, "browser_s": 0.0, "degraded": {}})
+
+    def record(self, stage: str, model: str, resp):
+        acc = add_usage({}, resp)
+        p_in, p_cached, p_out = self.price(model)
+        uncached = max(0, acc["prompt_tokens"] - acc["cached_tokens"])
+        acc["tokens"] = acc["prompt_tokens"] + acc["completion_tokens"]
+        acc["usd"] = (uncached * p_in + acc["cached_tokens"] * p_cached + acc["completion_tokens"] * p_out) / 1e6
+        for bucket in (self.total, self.by_stage.setdefault(stage, {}), self._persona()["stages"].setdefault(stage, {})):
+            for k, v in acc.items():
+                bucket[k] = bucket.get(k, 0) + v
+
+    def add_browser(self, seconds: float):
+        self.browser_s += seconds
+        self._persona()["browser_s"] += seconds
+
+    def browser_open(self) -> int:
+        slot = next(self._slots)
+        self.open_browsers[slot] = time.monotonic()
+        return slot
+
+    def browser_close(self, slot: int):
+        self.add_browser(time.monotonic() - self.open_browsers.pop(slot))
+
+    def browser_seconds(self) -> float:
+        now = time.monotonic()
+        return self.browser_s + sum(now - t for t in self.open_browsers.values())
+
+    def calls_left(self, stage: str) -> Optional[int]:
+        """
+        Average-cost calls of stage that still fit the token/$ limits, less calls in flight (None = no limit).
+        Before the first call there is no average, so 1. Never 0 while headroom remains: concurrent
+        personas can overshoot by one call each, as the agent stage does.
+        """
+        used, sl = self.by_stage.get(stage, {}), self.stage_limits.get(stage, {})
+        calls = used.get("calls", 0)
+        per_tokens = used.get("tokens", 0) / calls if calls else 0
+        per_usd = used.get("usd", 0.0) / calls if calls else 0.0
+        axes = [(self.limits["tokens"], self.total.get("tokens", 0), per_tokens),
+                (self.limits["usd"], self.total.get("usd", 0.0), per_usd),
+                (sl.get("tokens"), used.get("tokens", 0), per_tokens),
+                (sl.get("usd"), used.get("usd", 0.0), per_usd)]
+        if not any(lim for lim, _, _ in axes):
+            return None
+        if not calls:
+            return 1
+        left = min((int(max(0, lim - spent) // per) for lim, spent, per in axes if lim and per > 0), default=None)
+        if left is None:
+            return None
+        return 0 if left == 0 else max(1, left - self.inflight.get(stage, 0))
+
+    @contextlib.contextmanager
+    def reserve(self, stage: str, calls: int):
+        """Counts calls in flight, so concurrent personas do not all plan on the same headroom."""
+        self.inflight[stage] = self.inflight.get(stage, 0) + calls
+        try:
+            yield
+        finally:
+            self.inflight[stage] -= calls
+
+    def pressure(self, stage: Optional[str] = None) -> float:
+        lim, frac = self.limits, []
+        if lim["tokens"]: frac.append(self.total.get("tokens", 0) / lim["tokens"])
+        if lim["usd"]: frac.append(self.total.get("usd", 0.0) / lim["usd"])
+        if lim["wall_min"]: frac.append((time.monotonic() - self.t0) / 60 / lim["wall_min"])
+        if lim["browser_min"]: frac.append(self.browser_seconds() / 60 / lim["browser_min"])
+        sl, used = self.stage_limits.get(stage or "", {}), self.by_stage.get(stage or "", {})
+        if sl.get("tokens"): frac.append(used.get("tokens", 0) / sl["tokens"])
+        if sl.get("usd"): frac.append(used.get("usd", 0.0) / sl["usd"])
+        return max(frac, default=0.0)
+
+    def soft_hit(self, stage: str) -> bool:
+        return self.pressure(stage) >= self.soft
+
+    def exhausted(self, stage: str) -> bool:
+        return self.pressure(stage) >= 1.0
+
+    def note(self, stage: str, action: str):
+        key = f"{stage}:{action}"
+        self.degraded[key] = self.degraded.get(key, 0) + 1
+        d = self._persona()["degraded"]
+        d[key] = d.get(key, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        def rnd(b: Dict[str, float]) -> Dict[str, Any]:
+            return {k: (round(v, 6) if k == "usd" else int(v)) for k, v in b.items()}
+        return {
+            "limits": self.limits, "stage_limits": self.stage_limits, "soft": self.soft,
+            "wall_min": round((time.monotonic() - self.t0) / 60, 2), "browser_min": round(self.browser_s / 60, 2),
+            "total": rnd(self.total), "by_stage": {k: rnd(v) for k, v in self.by_stage.items()},
+            "by_persona": {pid: {"stages": {k: rnd(v) for k, v in d["stages"].items()},
+                                 "usd": round(sum(v.get("usd", 0.0) for v in d["stages"].values()), 6),
+                                 "browser_min": round(d["browser_s"] / 60, 2), "degraded": d["degraded"]}
+                           for pid, d in self.by_persona.items()},
+            "degraded": self.degraded,
+        }
+
+GOVERNOR: Optional[CostGovernor] = None  # set in main(); None = no tracking
+DASHBOARD = None  # dashboard.Dashboard when --dashboard_port is set
+METRICS = None    # metrics.Metrics when --metrics_port / --metrics_file is set
+PROFILER = None   # loop_profiler.LoopProfiler when --profile is set
 
+# ---------------- Similarity / normalization ----------------
 def char_sim_ratio(a: str, b: str) -> float:
     return difflib.SequenceMatcher(a=a.lower(), b=b.lower()).ratio()
 
@@ -174,6 +333,8 @@ def jaccard(a: Set, b: Set) -> float:
     return inter / union if union else 0.0
 
 def combined_similar(a: str, b: str, *, n: int = 4, j_thresh: float = 0.70, c_thresh: float = 0.82) -> bool:
+    if METRICS is not None:
+        METRICS.comparisons("pairwise")
     tj = jaccard(ngrams(tokens(a), n=n), ngrams(tokens(b), n=n))
     cr = char_sim_ratio(a, b)
     return (tj >= j_thresh) or (cr >= c_thresh)
@@ -186,35 +347,113 @@ def sim_against_corpus(text: str, corpus_texts: List[str], n: int = 4) -> float:
         if s > best: best = s
     return best
 
+class CorpusIndex:
+    """
+    Incremental n-gram index over a growing corpus list (same score as sim_against_corpus).
+    sync() only tokenizes texts appended since the last call; scoring walks an
+    inverted index instead of re-tokenizing every report.
+    """
+
+    def __init__(self, n: int = 4):
+        self.n = n
+        self.sizes: List[int] = []
+        self.postings: Dict[Tuple[str, ...], List[int]] = {}
+
+    def sync(self, corpus_texts: List[str]) -> "CorpusIndex":
+        for text in corpus_texts[len(self.sizes):]:
+            doc = len(self.sizes)
+            grams = ngrams(tokens(text), n=self.n)
+            self.sizes.append(len(grams))
+            for g in grams:
+                self.postings.setdefault(g, []).append(doc)
+        return self
+
+    def best_sim(self, text: str) -> float:
+        if METRICS is not None:
+            METRICS.comparisons("corpus", len(self.sizes))
+        t = ngrams(tokens(text), n=self.n)
+        if not self.sizes: return 0.0
+        if not t: return 1.0 if 0 in self.sizes else 0.0
+        inter: Dict[int, int] = {}
+        for g in t:
+            for doc in self.postings.get(g, ()):
+                inter[doc] = inter.get(doc, 0) + 1
+        best = 0.0
+        for doc, k in inter.items():
+            s = k / (len(t) + self.sizes[doc] - k)
+            if s > best: best = s
+        return best
+
 # ---------------- Small helpers ----------------
 def digest_dom(html: str, max_chars: int) -> str:
     return (html or "")[:max_chars]
 
+def estimate_tokens(text: str) -> int:
+    # ~4 chars/token for English + markup; good enough for budgeting without a tokenizer
+    return len(text or "") // 4 + 1
+
+_DOM_NOISE = re.compile(r"<script\b[\s\S]*?</script>|<style\b[\s\S]*?</style>|<svg\b[\s\S]*?</svg>|<!--[\s\S]*?-->", re.I)
+
+def compact_dom(html: str) -> str:
+    return re.sub(r"\s{2,}", " ", _DOM_NOISE.sub("", html or ""))
+
+def fit_prompt_budget(history: List[Dict[str, Any]], html: str, *, fixed_tokens: int, budget: int,
+                      use_history: bool, history_k: int, dom_chars: int) -> Tuple[str, str, bool, bool]:
+    """
+    Volatile suffix (history digest, DOM digest) under a hard prompt budget.
+    Order of trimming: drop markup noise, shrink history to k=2, cut the DOM tail, then shrink history to
+    nothing. Returns (history, dom, trimmed, over); over=True only when the fixed prefix alone exceeds budget.
+    """
+    hist = digest_history(history, history_k) if use_history else "None"
+    if not budget:
+        return hist, digest_dom(html, dom_chars), False, False
+    dom = digest_dom(compact_dom(html), dom_chars)
+    k = history_k
+    while use_history and k > 2 and fixed_tokens + estimate_tokens(hist) + estimate_tokens(dom) > budget:
+        k -= 1
+        hist = digest_history(history, k)
+    trimmed = k != history_k
+    room = budget - fixed_tokens - estimate_tokens(hist)
+    if estimate_tokens(dom) > room:
+        dom = dom[:max(0, room - 1) * 4]
+        trimmed = True
+    while use_history and k > 0 and fixed_tokens + estimate_tokens(hist) + estimate_tokens(dom) > budget:
+        k -= 1
+        hist = digest_history(history, k)
+        trimmed = True
+    return hist, dom, trimmed, fixed_tokens + estimate_tokens(hist) + estimate_tokens(dom) > budget
+
 def digest_persona(p: Dict[str, Any]) -> str:
     return (f"{p.get('age','?')}yo, {p.get('location','?')}, "
             f"{p.get('income','?')}; diet={p.get('diet','none')}, "
             f"accessibility={p.get('accessibility','none')}; goal={p.get('goal','n/a')}")
 
+def slim_entry(h: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if 'action' in h:
+        a = h['action']
+        if a in ('click','type'):
+            return {"step": h.get("step"), "action": a, "selector": (h.get("selector") or "")[:80]}
+        elif a in ('wait','wait_ms'):
+            return {"step": h.get("step"), "action": a}
+        elif a == 'wait_for':
+            return {"step": h.get("step"), "action": a, "state": h.get("state")}
+        elif a == 'explore':
+            return {"step": h.get("step"), "action": a, "tabs": len(h.get("selectors") or [])}
+        elif a == "note":
+            return {"step": h.get("step"), "note": f"{h.get('tag')}::{(h.get('detail') or '')[:80]}"}
+    elif 'error' in h:
+        return {"step": h.get("step"), "error": (h.get("error") or "")[:80]}
+    elif 'warn' in h:
+        return {"step": h.get("step"), "warn": (h.get("warn") or "")[:80]}
+    elif 'info' in h:
+        return {"step": h.get("step"), "info": (h.get("info") or "")[:80]}
+    return None
+
 def digest_history(hist: List[Dict[str, Any]], k: int) -> str:
     if not hist or k <= 0: return "None"
-    slim = []
-    for h in hist[-k:]:
-        if 'action' in h:
-            a = h['action']
-            if a in ('click','type'):
-                slim.append({"step": h.get("step"), "action": a, "selector": (h.get("selector") or "")[:80]})
-            elif a in ('wait','wait_ms'):
-                slim.append({"step": h.get("step"), "action": a})
-            elif a == 'wait_for':
-                slim.append({"step": h.get("step"), "action": a, "state": h.get("state")})
-            elif a == "note":
-                slim.append({"step": h.get("step"), "note": f"{h.get('tag')}::{(h.get('detail') or '')[:80]}"})
-        elif 'error' in h:
-            slim.append({"step": h.get("step"), "error": (h.get("error") or "")[:80]})
-        elif 'warn' in h:
-            slim.append({"step": h.get("step"), "warn": (h.get("warn") or "")[:80]})
-        elif 'info' in h:
-            slim.append({"step": h.get("step"), "info": (h.get("info") or "")[:80]})
+    if isinstance(hist, History):
+        return hist.digest(k)
+    slim = [x for x in (slim_entry(h) for h in hist[-k:]) if x is not None]
     return json.dumps(slim, ensure_ascii=False)
 
 def sha_seed(text: str) -> int:
@@ -234,10 +473,122 @@ def enforce_spacing_exact_one(md: str) -> str:
     md = re.sub(r"(\n## Minor Friction\n(?:.*?))\n\n+(## Suggested Improvements)", r"\1\n\n\2", md, flags=re.S)
     return md.strip() + "\n"
 
+# ---------------- History records ----------------
+_INTERN_KEYS = ("action", "selector", "state", "tag")
+
+class StepRecord:
+    """One history entry with interned action/selector/state/tag; round-trips to the original dict."""
+    __slots__ = ("keys", "step", "action", "selector", "text", "ms", "state", "tag", "detail",
+                 "error", "warn", "info", "extra")
+    _FIELDS = frozenset(__slots__) - {"keys", "extra"}
+    _KEYSETS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    def __init__(self, d: Dict[str, Any]):
+        keys = tuple(d.keys())
+        self.keys = StepRecord._KEYSETS.setdefault(keys, keys)
+        self.extra = None
+        for name in StepRecord._FIELDS:
+            setattr(self, name, None)
+        for k, v in d.items():
+            if k in StepRecord._FIELDS:
+                if k in _INTERN_KEYS and isinstance(v, str): v = sys.intern(v)
+                setattr(self, k, v)
+            else:
+                if self.extra is None: self.extra = {}
+                self.extra[k] = v
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: (getattr(self, k) if k in StepRecord._FIELDS else self.extra[k]) for k in self.keys}
+
+class History:
+    """
+    Append-only agent history of StepRecords. The digest entry for each step is encoded once
+    at append time, so digest(k) only joins the last k entries instead of re-filtering dicts.
+    """
+
+    def __init__(self, items: Optional[List[Dict[str, Any]]] = None):
+        self.records: List[StepRecord] = []
+        self.slim: List[Optional[str]] = []
+        self.signals = SignalTracker()
+        self.main = 0  # entries of the main session (side-tab entries, tagged "tab", have their own --tab_steps cap)
+        for h in items or []:
+            self.append(h)
+
+    def append(self, h: Dict[str, Any]):
+        self.records.append(StepRecord(h))
+        self.signals.update(h)
+        self.main += "tab" not in h
+        se = slim_entry(h)
+        self.slim.append(json.dumps(se, ensure_ascii=False) if se is not None else None)
+
+    def extend(self, items):
+        for h in items: self.append(h)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __bool__(self) -> bool:
+        return bool(self.records)
+
+    def __iter__(self):
+        return (r.to_dict() for r in self.records)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [r.to_dict() for r in self.records[i]]
+        return self.records[i].to_dict()
+
+    def digest(self, k: int) -> str:
+        if not self.records or k <= 0: return "None"
+        return "[" + ", ".join(x for x in self.slim[-k:] if x is not None) + "]"
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [r.to_dict() for r in self.records]
+
+def summarize_history(history: List[Dict[str, Any]], keep_recent: int = 20) -> List[Dict[str, Any]]:
+    """
+    Compress all but the last keep_recent steps for the analysis prompt: action counts per span,
+    warn/error counts, and every note/error kept verbatim-short with its step (the report cites them).
+    """
+    hist = history.to_list() if isinstance(history, History) else list(history)
+    steps = sorted({h.get("step") for h in hist if isinstance(h.get("step"), int)})
+    if keep_recent <= 0 or len(steps) <= keep_recent:
+        return hist
+    cut = steps[-keep_recent]
+    old = [h for h in hist if not isinstance(h.get("step"), int) or h["step"] < cut]
+    recent = [h for h in hist if isinstance(h.get("step"), int) and h["step"] >= cut]
+    counts: Dict[str, int] = {}
+    warns: Dict[str, int] = {}
+    keep: List[Dict[str, Any]] = []
+    for h in old:
+        if "action" in h:
+            counts[h["action"]] = counts.get(h["action"], 0) + 1
+            if h["action"] == "note":
+                keep.append({"step": h.get("step"), "action": "note", "tag": h.get("tag"),
+                             "detail": (h.get("detail") or "")[:80]})
+        elif "error" in h:
+            keep.append({"step": h.get("step"), "error": (h.get("error") or "")[:80]})
+        elif "warn" in h:
+            kind = (h.get("warn") or "").split(" ")[0]
+            warns[kind] = warns.get(kind, 0) + 1
+        elif h.get("info") in ("stop_precheckout", "max-steps-reached"):
+            keep.append(h)
+    first = min((h["step"] for h in old if isinstance(h.get("step"), int)), default=0)
+    summary = {"summary": f"steps {first}-{cut - 1}",
+               "actions": counts, "warns": warns}
+    return [summary] + keep + recent
+
 # ---------------- Persona / signals ----------------
 ALLERGEN_KEYWORDS = ["gluten-free","nut-free","soy-free","lactose-free","shellfish-free","egg-free","low-sodium"]
 STRICT_DIET = ["vegan","vegetarian","pescatarian","halal","kosher"]
 
+def load_personas(path: str) -> List[Dict[str, Any]]:
+    """JSON array (generate_personas.py) or JSONL, one persona per line (synthesize_personas.py)."""
+    with open(path, encoding="utf-8") as fh:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in fh if line.strip()]
+        return json.load(fh)
+
 def persona_profile(p: Dict[str, Any]) -> Dict[str, Any]:
     diet = (p.get("diet") or "").strip().lower()
     acc  = (p.get("accessibility") or "").strip().lower()
@@ -254,31 +605,77 @@ def persona_profile(p: Dict[str, Any]) -> Dict[str, Any]:
         "acc_is_colorblind": ("colorblind" in acc),
     }
 
-def collect_signals(history: List[Dict[str, Any]]) -> Dict[str, Any]:
-    errors = [h for h in history if "error" in h]
-    warns  = [h for h in history if "warn" in h]
-    timeouts = [h for h in warns if "timeout" in h.get("warn", "")]
-    steps = sum(1 for h in history if "action" in h)
-    waits = [h for h in history if h.get("action") in ("wait","wait_ms")]
-    long_waits = sum(1 for w in waits if int(w.get("ms", 0)) >= 1500)
-
-    notes = [h for h in history if h.get("action") == "note"]
-    severe_tags = {"diet_mismatch","allergen_missing","filter_missing","aria_missing","contrast_low","tiny_tap_target"}
-    severe_notes = [n for n in notes if (n.get("tag") in severe_tags)]
-    budget_met = any(n.get("tag") == "budget_met" for n in notes)
-    budget_over = any(n.get("tag") == "budget_over" for n in notes)
-    milestones = {n.get("tag") for n in notes if str(n.get("tag","")).startswith("milestone_")}
+SEVERE_TAGS = {"diet_mismatch","allergen_missing","filter_missing","aria_missing","contrast_low","tiny_tap_target"}
+
+class SignalTracker:
+    """Running collect_signals counters, updated once per appended history entry."""
+    __slots__ = ("errors", "warns", "timeouts", "steps", "long_waits", "notes_severe",
+                 "budget_met", "budget_over", "milestones", "prechk_stop", "consecutive_timeouts", "stuck_stop")
+
+    def __init__(self):
+        self.errors = self.warns = self.timeouts = self.steps = self.long_waits = self.notes_severe = 0
+        self.budget_met = self.budget_over = self.prechk_stop = self.stuck_stop = False
+        self.milestones: Set[str] = set()
+        self.consecutive_timeouts = 0
+
+    def update(self, h: Dict[str, Any]):
+        if "tab" in h:  # side-tab findings are reported, but are not the main session failing
+            return
+        if "error" in h: self.errors += 1
+        if "warn" in h:
+            self.warns += 1
+            if "timeout" in h.get("warn", ""):
+                self.timeouts += 1; self.consecutive_timeouts += 1
+            else:
+                self.consecutive_timeouts = 0
+        if "action" in h:
+            self.steps += 1
+            self.consecutive_timeouts = 0
+        a = h.get("action")
+        if a in ("wait","wait_ms") and int(h.get("ms", 0)) >= 1500:
+            self.long_waits += 1
+        elif a == "note":
+            tag = h.get("tag")
+            if tag in SEVERE_TAGS: self.notes_severe += 1
+            if tag == "budget_met": self.budget_met = True
+            if tag == "budget_over": self.budget_over = True
+            if str(tag or "").startswith("milestone_"): self.milestones.add(tag)
+        if h.get("info") == "stop_precheckout":
+            self.prechk_stop = True
+        elif str(h.get("info") or "").startswith("stop_stuck"):
+            self.stuck_stop = True
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "errors": self.errors, "warns": self.warns, "timeouts": self.timeouts,
+            "steps": self.steps, "long_waits": self.long_waits,
+            "notes_severe": self.notes_severe,
+            "budget_met": self.budget_met, "budget_over": self.budget_over,
+            "m_item": ("milestone_item_added" in self.milestones),
+            "m_cart": ("milestone_cart_open" in self.milestones),
+            "m_review": ("milestone_review" in self.milestones),
+            "prechk_stop": self.prechk_stop,
+            "stuck_stop": self.stuck_stop,
+        }
+
+RUN_OUTCOMES = {"stop_precheckout": "reached_review", "max-steps-reached": "max_steps",
+                "stop_stuck": "stuck", "stop_timeouts": "timeouts", "stop_budget": "budget"}
+
+def run_outcome(history: List[Dict[str, Any]]) -> str:
+    """How the agent loop ended, from its last stop marker."""
+    for h in reversed(history):
+        info = str(h.get("info") or "").split(" ")[0]
+        if info in RUN_OUTCOMES:
+            return RUN_OUTCOMES[info]
+    return "other"
 
-    return {
-        "errors": len(errors), "warns": len(warns), "timeouts": len(timeouts),
-        "steps": steps, "long_waits": long_waits,
-        "notes_severe": len(severe_notes),
-        "budget_met": budget_met, "budget_over": budget_over,
-        "m_item": ("milestone_item_added" in milestones),
-        "m_cart": ("milestone_cart_open" in milestones),
-        "m_review": ("milestone_review" in milestones),
-        "prechk_stop": any(h.get("info") == "stop_precheckout" for h in history),
-    }
+def collect_signals(history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if isinstance(history, History):
+        return history.signals.result()
+    tracker = SignalTracker()
+    for h in history:
+        tracker.update(h)
+    return tracker.result()
 
 def score_from_signals(sig: Dict[str, Any], rng: random.Random, weights: Optional[Dict[str, float]] = None) -> int:
     reached = sig["m_review"] or sig.get("prechk_stop")
@@ -574,114 +971,785 @@ async def exists_quick(page, sel: str) -> bool:
     except Exception:
         return False
 
+async def prohibited_target(page, sel: str) -> bool:
+    """PROHIBITED_CLICK_PAT against the selector and the text of the element it matches."""
+    if PROHIBITED_CLICK_PAT.search(sel or ""):
+        return True
+    try:
+        label = await page.locator(sel).first.inner_text(timeout=1000)
+    except Exception:
+        return False
+    return bool(PROHIBITED_CLICK_PAT.search(label or ""))
+
+# ---------------- Selector repair ----------------
+try:
+    from rapidfuzz import process as _rf_process, fuzz as _rf_fuzz
+except ImportError:  # optional; difflib fallback
+    _rf_process = _rf_fuzz = None
+
+_SNAP_TEXT = re.compile(r"<(button|a|label|h[1-6]|span|li)\b[^>]*>\s*([^<>]{2,80}?)\s*<", re.I)
+_SNAP_ARIA = re.compile(r"<(button|a|input|div|span)\b[^>]*aria-label=\"([^\"]{2,80})\"", re.I)
+
+def selector_name(sel: str) -> Optional[str]:
+    """Human-readable target name in a model selector (has-text / text= / aria-label / bare text)."""
+    for pat in (r":has-text\((['\"])(.+?)\1\)", r"^text=(['\"]?)(.+?)\1$", r"aria-label\*?=(['\"])(.+?)\1"):
+        m = re.search(pat, sel or "")
+        if m: return m.group(2).strip()
+    if sel and not re.search(r"[\[\]#.>:=]", sel):
+        return sel.strip()
+    return None
+
+class SelectorResolver:
+    """
+    Per-session cheap repairs for selectors the model got slightly wrong, tried before
+    reporting selector_missing: cached repair → role+name → case-insensitive text →
+    nearest has-text candidate from the current snapshot (rapidfuzz, difflib fallback).
+    """
+
+    def __init__(self, page, *, fuzzy_cutoff: int = 85):
+        self.page = page
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.cache: Dict[str, str] = {}
+        self._html = ""
+        self._snap_key = None
+        self._cands: List[Tuple[str, str]] = []
+        self.stats: Dict[str, int] = {"attempts": 0, "cache": 0, "role": 0, "text_ci": 0, "fuzzy": 0, "misses": 0}
+
+    def set_snapshot(self, html: str):
+        self._html = html or ""
+
+    def _candidates(self) -> List[Tuple[str, str]]:
+        key = hash(self._html)
+        if key != self._snap_key:
+            import html as _html
+            seen: Set[str] = set(); out: List[Tuple[str, str]] = []
+            for tag, txt in _SNAP_ARIA.findall(self._html) + _SNAP_TEXT.findall(self._html):
+                t = _html.unescape(txt).strip()
+                if t and t.lower() not in seen:
+                    seen.add(t.lower()); out.append((tag.lower(), t))
+            self._snap_key, self._cands = key, out
+        return self._cands
+
+    def _nearest(self, name: str) -> Optional[Tuple[str, str]]:
+        cands = self._candidates()
+        texts = [t for _, t in cands]
+        if not texts: return None
+        if _rf_process is not None:
+            hit = _rf_process.extractOne(name, texts, scorer=_rf_fuzz.WRatio, score_cutoff=self.fuzzy_cutoff)
+            return cands[hit[2]] if hit else None
+        best = difflib.get_close_matches(name, texts, n=1, cutoff=self.fuzzy_cutoff / 100.0)
+        return cands[texts.index(best[0])] if best else None
+
+    async def repair(self, sel: str) -> Optional[Tuple[str, str]]:
+        """Returns (working selector, method) or None."""
+        self.stats["attempts"] += 1
+        cached = self.cache.get(sel)
+        if cached and await exists_quick(self.page, cached):
+            self.stats["cache"] += 1; return cached, "cache"
+        name = selector_name(sel)
+        if name:
+            # anchored, case-insensitive: "Continue" must not land on "Continue to checkout"
+            rx = "/^\\s*" + re.escape(name).replace("/", "\\/") + "\\s*$/i"
+            roles = ["button"] if re.match(r"button(?![\w-])", sel) else \
+                ["link"] if re.match(r"a(?![\w-])", sel) else ["button", "link"]
+            tries = [(f"role={r}[name={rx}]", "role") for r in roles] + [(f"text={rx}", "text_ci")]
+            near = self._nearest(name)
+            if near:
+                tag, txt = near
+                t = txt.replace('"', '\\"')
+                tries.append((f'{tag}:text-is("{t}")' if tag in ("button", "a") else f'text="{t}"', "fuzzy"))
+            for cand, method in tries:
+                if await exists_quick(self.page, cand):
+                    self.cache[sel] = cand
+                    self.stats[method] += 1
+                    return cand, method
+        self.stats["misses"] += 1
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        hits = sum(self.stats[k] for k in ("cache", "role", "text_ci", "fuzzy"))
+        return {**self.stats, "hits": hits, "hit_rate": round(hits / self.stats["attempts"], 3) if self.stats["attempts"] else 0.0,
+                "llm_calls_avoided": hits}
+
+WAIT_STATES = {"attached", "detached", "visible", "hidden"}
+
 async def soft_wait_for(page, sel: str, state: str = "visible", ms: int = 1200) -> bool:
-    end = time.time() + max(200, ms) / 1000.0
-    interval = 0.15
+    # Playwright-native wait: resolves on the first matching DOM change, no polling round trips
     try:
-        loc = page.locator(sel)
-        while time.time() < end:
-            cnt = await loc.count()
-            if cnt > 0:
-                if state == "visible":
-                    try:
-                        if await loc.first.is_visible(): return True
-                    except Exception:
-                        pass
-                elif state == "attached" and cnt > 0: return True
-                elif state in {"hidden","detached"} and cnt == 0: return True
-                else: return True
-            await page.wait_for_timeout(int(interval * 1000))
+        await page.locator(sel).first.wait_for(state=state if state in WAIT_STATES else "visible",
+                                               timeout=max(200, ms))
+        return True
     except Exception:
-        pass
-    return False
+        return False
 
-async def act_with_llm(page, persona: Dict[str, Any], *, agent_model: str, agent_temp: float,
-                       dom_chars: int, use_history: bool, history_k: int,
-                       max_steps: int) -> Dict[str, Any]:
-    history: List[Dict[str, Any]] = []
-    step = 0
-    while True:
-        dom = (await page.content())
-        dom_digest = digest_dom(dom, dom_chars)
-        persona_line = digest_persona(persona)
-        hist_digest = digest_history(history, history_k) if use_history else "None"
+DOM_QUIET_JS = """
+([quiet, timeout]) => new Promise(resolve => {
+  const start = performance.now(); let last = start;
+  const obs = new MutationObserver(() => { last = performance.now(); });
+  obs.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+  const tick = () => {
+    const now = performance.now();
+    if (now - last >= quiet || now - start >= timeout) { obs.disconnect(); resolve(now - start); }
+    else setTimeout(tick, Math.min(quiet, 50));
+  };
+  setTimeout(tick, Math.min(quiet, timeout));
+})
+"""
 
-        messages = [
-            {"role": "system", "content": COMPACT_SYSTEM},
-            {"role": "user", "content":
-                "DOM (digest):\n" + dom_digest +
-                "\n\nPersona:\n" + persona_line +
-                "\n\nRecent History (digest):\n" + hist_digest +
-                "\n\nTASK (choose exactly ONE):\n"
-                "- Decide the next minimal action towards pre-checkout, following rules.\n"
-                "- Output ONLY the JSON object with required fields.\n"
-            }
-        ]
+class PageWaiter:
+    """
+    Settle-aware waits for one page: in-flight request tracking (page events, no round trips)
+    plus an in-page MutationObserver quiescence check. Each wait records requested vs actual ms.
+    """
+
+    def __init__(self, page, *, quiet_ms: int = 250):
+        self.page = page
+        self.quiet_ms = quiet_ms
+        self.inflight = 0
+        self.last_net = time.monotonic()
+        self.stats: List[Dict[str, Any]] = []
+        try:
+            page.on("request", self._on_request)
+            page.on("requestfinished", self._on_done)
+            page.on("requestfailed", self._on_done)
+        except Exception:
+            pass
+
+    def _on_request(self, _req):
+        self.inflight += 1; self.last_net = time.monotonic()
 
+    def _on_done(self, _req):
+        self.inflight = max(0, self.inflight - 1); self.last_net = time.monotonic()
+
+    async def _network_idle(self, deadline: float):
+        quiet = self.quiet_ms / 1000.0
+        while time.monotonic() < deadline:
+            if self.inflight == 0 and time.monotonic() - self.last_net >= quiet:
+                return
+            await asyncio.sleep(0.05)
+
+    async def _dom_quiet(self, timeout_ms: int):
         try:
-            resp = await chat_create_safe(
-                agent_model, messages, want_json=True,
-                temperature=agent_temp, max_tokens=220
-            )
-            raw = resp.choices[0].message.content
-            cmd = json.loads(raw)
-        except Exception as e:
-            try:
-                m = re.search(r"\{[\s\S]*\}", raw if 'raw' in locals() else "")
-                cmd = json.loads(m.group(0)) if m else {}
-            except Exception:
-                history.append({"error": f"parse-fail: {repr(e)}"}); break
+            await self.page.evaluate(DOM_QUIET_JS, [self.quiet_ms, timeout_ms])
+        except Exception:
+            await asyncio.sleep(timeout_ms / 1000.0)
 
-        act = cmd.get("action"); sel = (cmd.get("selector") or "").strip()
-        txt = cmd.get("text", ""); ms = int(cmd.get("ms", 800))
-        state = (cmd.get("state") or "visible").lower()
-        step += 1
+    def _record(self, kind: str, requested: int, t0: float, ok: bool = True):
+        actual = int((time.monotonic() - t0) * 1000)
+        self.stats.append({"kind": kind, "requested_ms": requested, "actual_ms": actual,
+                           "saved_ms": max(0, requested - actual), "ok": ok})
 
+    async def settle(self, ms: int):
+        """Replaces a fixed sleep: returns once network and DOM are quiet, at most after `ms`."""
+        t0 = time.monotonic()
+        timeout_ms = max(0, ms)
         try:
-            if act == "click":
-                if PROHIBITED_CLICK_PAT.search(sel) or PROHIBITED_CLICK_PAT.search(txt or ""):
-                    history.append({"error": f"blocked_click @ {sel or txt}", "step": step}); break
-                if not await exists_quick(page, sel):
-                    history.append({"warn": f"selector_missing {sel}", "step": step})
-                else:
-                    await page.click(sel, timeout=4000)
-
-            elif act == "type":
-                if not await exists_quick(page, sel):
-                    history.append({"warn": f"selector_missing {sel}", "step": step})
-                else:
-                    await page.fill(sel, txt, timeout=4000)
-
-            elif act in ("wait","wait_ms"):
-                if ms == 500: ms = random.choice([350, 700])
-                await page.wait_for_timeout(ms)
-
-            elif act == "wait_for":
-                ok = await soft_wait_for(page, sel, state=state, ms=min(ms, 1500))
-                history.append({"info": f"soft_wait_{'ok' if ok else 'miss'}", "selector": sel, "state": state, "ms": ms, "step": step})
-
-            elif act == "note":
-                pass
+            await asyncio.wait_for(
+                asyncio.gather(self._network_idle(t0 + timeout_ms / 1000.0), self._dom_quiet(timeout_ms)),
+                timeout=timeout_ms / 1000.0 + 0.1,
+            )
+        except asyncio.TimeoutError:
+            pass
+        self._record("settle", ms, t0)
+
+    async def wait_for(self, sel: str, state: str, ms: int) -> bool:
+        t0 = time.monotonic()
+        ok = await soft_wait_for(self.page, sel, state=state, ms=ms)
+        self._record("wait_for", ms, t0, ok)
+        return ok
+
+    def summary(self) -> Dict[str, Any]:
+        req = sum(w["requested_ms"] for w in self.stats)
+        act = sum(w["actual_ms"] for w in self.stats)
+        return {"waits": len(self.stats), "requested_ms": req, "actual_ms": act,
+                "saved_ms": sum(w["saved_ms"] for w in self.stats),
+                "misses": sum(1 for w in self.stats if not w["ok"])}
+
+PLAN_ADDENDUM = """
+PLAN MODE: instead of one action you MAY return a short ordered plan (≤{plan_max} actions):
+{{"plan":[{{<action object>, "guard":{{"if_exists":"<css|text>","if_url":"<substring>"}}, "expect_nav":<bool>}}, ...]}}
+- Each step uses the same action schema and rules as above; guard is optional.
+- Set expect_nav=true on a step that navigates; otherwise an URL change aborts the rest of the plan.
+- Only plan steps whose targets are already visible in the DOM or will appear after earlier steps.
+""".strip()
+
+async def execute_action(page, cmd: Dict[str, Any], step: int, history: List[Dict[str, Any]],
+                         waiter: Optional[PageWaiter] = None,
+                         resolver: Optional[SelectorResolver] = None) -> str:
+    """
+    Run ONE agent command and append its history records.
+    Returns "ok", "miss" (selector/wait target not found) or "stop" (session must end).
+    """
+    act = cmd.get("action"); sel = (cmd.get("selector") or "").strip()
+    txt = cmd.get("text", ""); ms = int(cmd.get("ms", 800))
+    state = (cmd.get("state") or "visible").lower()
+    status = "ok"
+
+    if act in ("click", "type") and resolver is not None and sel and not PROHIBITED_CLICK_PAT.search(sel) \
+            and not await exists_quick(page, sel):
+        fixed = await resolver.repair(sel)
+        if fixed and not await prohibited_target(page, fixed[0]):
+            cmd["repaired_from"] = sel; cmd["repair"] = fixed[1]
+            cmd["selector"] = sel = fixed[0]
 
+    try:
+        if act == "click":
+            if PROHIBITED_CLICK_PAT.search(sel) or PROHIBITED_CLICK_PAT.search(txt or ""):
+                history.append({"error": f"blocked_click @ {sel or txt}", "step": step}); return "stop"
+            if not await exists_quick(page, sel):
+                history.append({"warn": f"selector_missing {sel}", "step": step}); status = "miss"
             else:
-                history.append({"error": f"unknown action {act}", "step": step}); break
+                await page.click(sel, timeout=4000)
 
-            cmd["step"] = step
-            history.append(cmd)
+        elif act == "type":
+            if not await exists_quick(page, sel):
+                history.append({"warn": f"selector_missing {sel}", "step": step}); status = "miss"
+            else:
+                await page.fill(sel, txt, timeout=4000)
 
-        except PWTimeout:
-            history.append({"warn": f"timeout @ {sel}", "step": step})
-        except Exception as e:
-            history.append({"error": f"action-fail @ {sel}: {repr(e)}", "step": step})
+        elif act in ("wait","wait_ms"):
+            if ms == 500: ms = random.choice([350, 700])
+            if waiter is not None: await waiter.settle(ms)
+            else: await page.wait_for_timeout(ms)
+
+        elif act == "wait_for":
+            if waiter is not None: ok = await waiter.wait_for(sel, state, min(ms, 1500))
+            else: ok = await soft_wait_for(page, sel, state=state, ms=min(ms, 1500))
+            history.append({"info": f"soft_wait_{'ok' if ok else 'miss'}", "selector": sel, "state": state, "ms": ms, "step": step})
+            if not ok: status = "miss"
+
+        elif act == "note":
+            pass
+
+        else:
+            history.append({"error": f"unknown action {act}", "step": step}); return "stop"
+
+        cmd["step"] = step
+        history.append(cmd)
+
+    except PWTimeout:
+        history.append({"warn": f"timeout @ {sel}", "step": step}); status = "miss"
+    except Exception as e:
+        history.append({"error": f"action-fail @ {sel}: {repr(e)}", "step": step}); status = "miss"
+    return status
+
+async def plan_guard_failure(page, cmd: Dict[str, Any], expected_url: str) -> Optional[str]:
+    if page.url != expected_url:
+        return "url_changed"
+    guard = cmd.get("guard") if isinstance(cmd.get("guard"), dict) else {}
+    if guard.get("if_url") and str(guard["if_url"]) not in page.url:
+        return "guard_url"
+    if guard.get("if_exists") and not await exists_quick(page, str(guard["if_exists"])):
+        return "guard_missing"
+    return None
+
+def plan_commands(obj: Dict[str, Any], plan_max: int) -> List[Dict[str, Any]]:
+    plan = obj.get("plan") if isinstance(obj, dict) else None
+    if isinstance(plan, list):
+        cmds = [c for c in plan if isinstance(c, dict) and c.get("action")]
+        return cmds[:max(1, plan_max)]
+    return [obj]
+
+# ---------------- Macro cache ----------------
+MACRO_ACTIONS = ("click", "type", "wait_for", "wait_ms", "wait")
+
+def url_pattern(url: str) -> str:
+    u = re.sub(r"^https?://", "", (url or "").split("?")[0].split("#")[0]).rstrip("/")
+    u = re.sub(r"/[0-9a-f]{8}-[0-9a-f\-]{27,}", "/:id", u, flags=re.I)
+    return re.sub(r"/\d+", "/:n", u)
+
+def snapshot_hash(dom_digest: str) -> str:
+    import hashlib as _h
+    skel = re.findall(r"<([a-z0-9]+)|(?:data-testid|aria-label|role)=\"([^\"]{0,40})\"", (dom_digest or "").lower())
+    return _h.sha1("|".join(a or b for a, b in skel).encode("utf-8")).hexdigest()[:12]
+
+def page_fingerprint(url: str, dom_digest: str) -> Dict[str, str]:
+    return {"url": url_pattern(url), "snap": snapshot_hash(dom_digest)}
+
+def macro_key(fp: Dict[str, str], persona: Dict[str, Any]) -> str:
+    prof = persona_profile(persona)
+    return "|".join([fp.get("url", ""), fp.get("snap", ""), prof["diet"] or "none", prof["access"] or "none"])
+
+def history_prefix(history: List[Dict[str, Any]], max_len: int) -> List[Dict[str, Any]]:
+    """Leading run of successful actions (notes skipped), cut at the first warn/error/miss."""
+    out: List[Dict[str, Any]] = []
+    for h in history:
+        if "error" in h or "warn" in h or "tab" in h or h.get("info") == "soft_wait_miss":
+            break
+        a = h.get("action")
+        if a in MACRO_ACTIONS:
+            out.append({k: h[k] for k in ("action","selector","text","ms","state") if k in h})
+            if len(out) >= max_len: break
+    return out
 
+class MacroCache:
+    """
+    Recurring navigation prefixes mined from runs/*/issues.json.
+    Keyed by page fingerprint (URL pattern + snapshot hash) and persona diet/access;
+    replayed only when support/total >= min_conf. A selector miss disables the macro.
+    """
+
+    def __init__(self, path: Optional[pathlib.Path] = None, *, min_conf: float = 0.6, min_support: int = 2):
+        self.path = path
+        self.min_conf = min_conf
+        self.min_support = min_support
+        self.macros: Dict[str, Dict[str, Any]] = {}
+        self.disabled: Set[str] = set()
+
+    @classmethod
+    def load(cls, path, **kw) -> "MacroCache":
+        mc = cls(pathlib.Path(path), **kw)
+        if mc.path.exists():
+            try:
+                data = json.loads(mc.path.read_text(encoding="utf-8"))
+                mc.macros = dict(data.get("macros") or {})
+                mc.disabled = set(data.get("disabled") or [])
+            except Exception:
+                pass
+        return mc
+
+    @staticmethod
+    def _sig(key: str, steps: List[Dict[str, Any]]) -> str:
+        return key + "#" + json.dumps(steps, sort_keys=True)
+
+    def mine(self, roots: List[pathlib.Path], max_len: int = 8) -> int:
+        totals: Dict[str, int] = {}
+        counts: Dict[str, Dict[str, int]] = {}
+        for root in roots:
+            if not root.exists(): continue
+            for f in root.rglob("issues.json"):
+                try: data = json.loads(f.read_text(encoding="utf-8"))
+                except Exception: continue
+                run = data.get("run") or {}
+                fp = run.get("start_fp")
+                if not fp: continue
+                key = macro_key(fp, data.get("persona") or {})
+                totals[key] = totals.get(key, 0) + 1
+                sig = data.get("signals") or collect_signals(run.get("history", []))
+                if not (sig.get("m_item") or sig.get("m_cart") or sig.get("prechk_stop")):
+                    continue
+                prefix = history_prefix(run.get("history", []), max_len)
+                for n in range(1, len(prefix) + 1):
+                    p = json.dumps(prefix[:n], sort_keys=True)
+                    counts.setdefault(key, {})[p] = counts.get(key, {}).get(p, 0) + 1
+        self.macros = {}
+        for key, by_prefix in counts.items():
+            best = None
+            for p, c in by_prefix.items():
+                steps = json.loads(p)
+                if c < self.min_support or c / totals[key] < self.min_conf: continue
+                if self._sig(key, steps) in self.disabled: continue
+                if best is None or len(steps) > len(best[0]):
+                    best = (steps, c)
+            if best:
+                self.macros[key] = {"steps": best[0], "support": best[1], "total": totals[key]}
+        return len(self.macros)
+
+    def lookup(self, fp: Dict[str, str], persona: Dict[str, Any]) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        key = macro_key(fp, persona)
+        m = self.macros.get(key)
+        if not m or m["support"] / max(1, m["total"]) < self.min_conf:
+            return None
+        return key, [dict(s) for s in m["steps"]]
+
+    def invalidate(self, key: str):
+        m = self.macros.pop(key, None)
+        if m: self.disabled.add(self._sig(key, m["steps"]))
+        self.save()
+
+    def save(self):
+        if not self.path: return
+        self.path.write_text(json.dumps({"macros": self.macros, "disabled": sorted(self.disabled)},
+                                        ensure_ascii=False, indent=2), encoding="utf-8")
+
+async def replay_macro(page, persona: Dict[str, Any], macro_cache: MacroCache, dom_digest: str,
+                       history: List[Dict[str, Any]], waiter: Optional[PageWaiter] = None) -> Dict[str, Any]:
+    """Replay a cached prefix in Playwright before the model takes over. Returns replay stats."""
+    hit = macro_cache.lookup(page_fingerprint(page.url, dom_digest), persona)
+    if not hit:
+        return {"replayed": 0, "llm_calls_saved": 0, "steps": 0, "done": False}
+    key, steps = hit
+    replayed = 0; step = 0; done = False
+    for c in steps:
+        c["via"] = "macro"
+        if c.get("action") in ("click", "type") and not await exists_quick(page, c.get("selector") or ""):
+            # selector drifted: hand over to the model without logging a model-side miss
+            history.append({"info": "macro_invalidated", "step": step})
+            macro_cache.invalidate(key)
+            break
+        step += 1
+        status = await execute_action(page, c, step, history, waiter)
+        if status != "ok":
+            history.append({"info": "macro_invalidated", "step": step})
+            macro_cache.invalidate(key)
+            done = status == "stop"
+            break
+        replayed += 1
         content_lc = (await page.content()).lower()
-        stop = any(m in content_lc for m in GLOBAL_STOP_MARKERS)
-        if stop:
+        if any(m in content_lc for m in GLOBAL_STOP_MARKERS):
             history.append({"info": "stop_precheckout", "step": step})
+            done = True; break
+    return {"key": key, "replayed": replayed, "llm_calls_saved": replayed, "steps": step, "done": done}
+
+# ---------------- Multi-tab exploration ----------------
+TABS_ADDENDUM = """
+MULTI-TAB: to compare candidate restaurants/items against my diet and budget, you MAY emit
+{{"action":"explore","selectors":["<link css|text>", ...]}} with up to {max_tabs} listing links visible in the DOM.
+Each opens in its own tab, is evaluated in parallel, and the findings come back as tab-tagged history.
+""".strip()
+
+TAB_SYSTEM = """
+You are evaluating ONE candidate listing in a side tab of an Uber Eats (iPhone) session. Output STRICT JSON only:
+{"action":"click|wait_ms|wait_for|note|done","selector":"<css|text>","ms":<opt>,"state":"<opt>","tag":"<opt>","detail":"<opt>"}
+- Do NOT add to cart, NEVER click Place order / Pay / Checkout.
+- Emit notes as in the main session (budget_met, budget_over, diet_mismatch, allergen_missing, label_ambiguous, ...).
+- Finish with {"action":"done","detail":"<one-line verdict vs my diet and budget>"}.
+""".strip()
+
+TAB_ACTIONS = ("click", "wait_ms", "wait", "wait_for", "note")
+# side tabs share the session's cookies/cart: anything that could change the cart is refused
+TAB_CART_PAT = re.compile(r"(add[\s_-]*(to[\s_-]*)?(cart|order|bag|basket)|add[\s_-]*item|\bcart\b|\bbasket\b|"
+                          r"quantity|\bqty\b|increment|decrement|remove[\s_-]*item|^\s*(\+|add)\s*$)", re.I)
+
+async def tab_click_blocked(tab, sel: str) -> bool:
+    """Cart-mutating or prohibited click, judged by selector and by the matched element's text."""
+    if PROHIBITED_CLICK_PAT.search(sel) or TAB_CART_PAT.search(sel):
+        return True
+    try:
+        label = await tab.locator(sel).first.inner_text(timeout=1000)
+    except Exception:
+        return False  # missing element: execute_action logs selector_missing
+    return bool(PROHIBITED_CLICK_PAT.search(label) or TAB_CART_PAT.search(label.strip()))
+
+async def evaluate_tab(context, url: str, persona: Dict[str, Any], *, agent_model: str, agent_temp: float,
+                       dom_chars: int, tab_steps: int, goto_timeout_ms: int = 20000) -> Dict[str, Any]:
+    tab = await context.new_page()
+    hist: List[Dict[str, Any]] = []
+    usage: Dict[str, int] = {}
+    verdict = ""
+    try:
+        await tab.goto(url, wait_until="domcontentloaded", timeout=goto_timeout_ms)
+        waiter = PageWaiter(tab)
+        stable_user = "Persona:\n" + digest_persona(persona)
+        for s in range(1, tab_steps + 1):
+            dom_digest = digest_dom(compact_dom(await tab.content()), dom_chars)
+            resp = await chat_create_safe(agent_model, [
+                {"role": "system", "content": TAB_SYSTEM},
+                {"role": "user", "content": stable_user},
+                {"role": "user", "content": "Tab history (digest):\n" + digest_history(hist, 4) +
+                                            "\n\nDOM (digest):\n" + dom_digest},
+            ], want_json=True, temperature=agent_temp, max_tokens=220, stage="tabs")
+            add_usage(usage, resp)
+            try: cmd = json.loads(resp.choices[0].message.content or "{}")
+            except Exception: break
+            if cmd.get("action") == "done":
+                verdict = str(cmd.get("detail") or "")[:160]; break
+            if cmd.get("action") not in TAB_ACTIONS:
+                hist.append({"warn": f"tab_action_blocked {cmd.get('action')}", "step": s}); break
+            if cmd.get("action") == "click" and await tab_click_blocked(tab, str(cmd.get("selector") or "")):
+                hist.append({"error": f"tab_cart_blocked @ {cmd.get('selector')}", "step": s}); break
+            if await execute_action(tab, cmd, s, hist, waiter) == "stop":
+                break
+    finally:
+        await tab.close()
+    return {"history": hist, "verdict": verdict, "usage": usage}
+
+async def explore_tabs(page, cmd: Dict[str, Any], persona: Dict[str, Any], *, step: int,
+                       history: List[Dict[str, Any]], tokens_acc: Dict[str, int],
+                       agent_model: str, agent_temp: float, dom_chars: int,
+                       max_tabs: int, tab_steps: int) -> Tuple[int, int]:
+    """
+    Open up to max_tabs listing links in the same context, evaluate them concurrently and merge
+    their histories back in tab order with fresh step numbers (each entry tagged with "tab").
+    Returns (new step counter, LLM calls spent).
+    """
+    from urllib.parse import urljoin
+    sels = [x for x in (cmd.get("selectors") or []) if isinstance(x, str) and x.strip()][:max_tabs]
+    targets: List[Tuple[str, str]] = []
+    for sel in sels:
+        if PROHIBITED_CLICK_PAT.search(sel): continue
+        try: href = await page.locator(sel).first.get_attribute("href", timeout=1500)
+        except Exception: href = None
+        if href: targets.append((sel, urljoin(page.url, href)))
+    step += 1
+    if not targets:
+        history.append({"warn": "explore_no_links " + ", ".join(sels)[:80], "step": step})
+        return step, 0
+    cmd["step"] = step
+    history.append(cmd)
+
+    results = await asyncio.gather(*[
+        evaluate_tab(page.context, url, persona, agent_model=agent_model, agent_temp=agent_temp,
+                     dom_chars=dom_chars, tab_steps=tab_steps)
+        for _, url in targets
+    ], return_exceptions=True)
+
+    calls = 0
+    for tab_no, ((sel, url), res) in enumerate(zip(targets, results), 1):
+        if isinstance(res, BaseException):
+            history.append({"warn": f"tab_failed {sel}: {res!r}"[:120], "step": step, "tab": tab_no})
+            continue
+        for k in ("calls", "prompt_tokens", "cached_tokens", "completion_tokens"):
+            tokens_acc[k] = tokens_acc.get(k, 0) + res["usage"].get(k, 0)
+        calls += res["usage"].get("calls", 0)
+        remap: Dict[Any, int] = {}
+        for h in res["history"]:
+            old = h.get("step")
+            if old not in remap:
+                step += 1; remap[old] = step
+            h["step"] = remap[old]; h["tab"] = tab_no
+            history.append(h)
+        history.append({"info": f"tab_verdict {res['verdict'] or 'n/a'}"[:160], "url": url, "step": step, "tab": tab_no})
+    return step, calls
+
+# ---------------- Checkpoints ----------------
+CHECKPOINT_FILE = "_checkpoint.json"
+CHECKPOINT_STATE = "_checkpoint_state.json"
+
+def load_checkpoint(sess: Optional[pathlib.Path]) -> Optional[Dict[str, Any]]:
+    if not sess: return None
+    f = sess / CHECKPOINT_FILE
+    if not f.exists(): return None
+    try:
+        ck = json.loads(f.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    state = sess / CHECKPOINT_STATE
+    ck["storage_state"] = str(state) if state.exists() else None
+    return ck
+
+def clear_checkpoint(sess: pathlib.Path):
+    for name in (CHECKPOINT_FILE, CHECKPOINT_STATE):
+        (sess / name).unlink(missing_ok=True)
+
+async def write_checkpoint(page, sess: pathlib.Path, data: Dict[str, Any]) -> float:
+    """history/url/counters + context storage state; tmp+rename so a crash never leaves half a file. Returns ms spent."""
+    t0 = time.perf_counter()
+    sess.mkdir(parents=True, exist_ok=True)
+    try:
+        state = await page.context.storage_state()
+        tmp = sess / (CHECKPOINT_STATE + ".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8"); tmp.replace(sess / CHECKPOINT_STATE)
+    except Exception:
+        pass
+    tmp = sess / (CHECKPOINT_FILE + ".tmp")
+    tmp.write_text(json.dumps({**data, "url": page.url}, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(sess / CHECKPOINT_FILE)
+    return (time.perf_counter() - t0) * 1000.0
+
+# ---------------- Stuck detection ----------------
+class StuckPolicy:
+    """
+    Ends sessions that stopped making progress: the same click/type repeated, consecutive
+    selector misses/timeouts, or an unchanged DOM across steps. 0 disables a check.
+    """
+
+    def __init__(self, repeat: int = 0, misses: int = 0, no_change: int = 0):
+        self.repeat, self.misses, self.no_change = repeat, misses, no_change
+        self.reset()
+
+    def reset(self):
+        """Forget counters; called at the start of every session (matrix variants share one policy)."""
+        self._last_key = None; self._repeat_n = 0
+        self._miss_n = 0
+        self._last_dom = None; self._same_n = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.repeat or self.misses or self.no_change)
+
+    def observe(self, cmd: Dict[str, Any], status: str, dom: str) -> Optional[str]:
+        act = cmd.get("action")
+        if act in ("click", "type"):
+            key = (act, (cmd.get("selector") or "").strip(), cmd.get("text") or "")
+            self._repeat_n = self._repeat_n + 1 if key == self._last_key else 1
+            self._last_key = key
+        self._miss_n = self._miss_n + 1 if status == "miss" else 0
+        if act != "note":
+            h = hash(dom)
+            self._same_n = self._same_n + 1 if h == self._last_dom else 0
+            self._last_dom = h
+        if self.repeat and self._repeat_n >= self.repeat:
+            return "repeated_action"
+        if self.misses and self._miss_n >= self.misses:
+            return "selector_misses"
+        if self.no_change and self._same_n >= self.no_change:
+            return "no_dom_change"
+        return None
+
+async def act_with_llm(page, persona: Dict[str, Any], *, agent_model: str, agent_temp: float,
+                       dom_chars: int, use_history: bool, history_k: int,
+                       max_steps: int, plan_mode: bool = False, plan_max: int = 4,
+                       macro_cache: Optional[MacroCache] = None,
+                       prompt_budget: int = 0, multi_tab: int = 0, tab_steps: int = 4,
+                       checkpoint_dir: Optional[pathlib.Path] = None, checkpoint_every: int = 0,
+                       resume: Optional[Dict[str, Any]] = None, max_timeouts: int = 0,
+                       stuck: Optional[StuckPolicy] = None, repair_selectors: bool = False,
+                       plan_cache: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    history = History()
+    t_start = time.monotonic()
+    time_to_stop = None
+    step = 0
+    llm_calls = 0
+    waiter = PageWaiter(page)
+    resolver = SelectorResolver(page) if repair_selectors else None
+    if stuck is not None:
+        stuck.reset()
+    dom0 = digest_dom(await page.content(), dom_chars)
+    start_fp = page_fingerprint(page.url, dom0)
+    macro = {"replayed": 0, "llm_calls_saved": 0, "steps": 0, "done": False}
+    ckpt = {"writes": 0, "ms": 0.0, "resumed_at_step": None}
+    prior_elapsed = 0.0
+    if resume:
+        history = History(resume.get("history") or [])
+        llm_calls = int(resume.get("llm_calls", 0))
+        start_fp = resume.get("start_fp") or start_fp
+        macro = {**(resume.get("macro") or macro), "steps": int(resume.get("step", 0)), "done": False}
+        prior_elapsed = float(resume.get("elapsed_s", 0.0))
+        ckpt["resumed_at_step"] = int(resume.get("step", 0))
+        history.append({"info": "resumed_from_checkpoint", "step": ckpt["resumed_at_step"]})
+    elif macro_cache is not None:
+        macro = await replay_macro(page, persona, macro_cache, dom0, history, waiter)
+    step = macro.pop("steps")
+    last_ckpt_step = step
+    stuck_stop = None
+    system = COMPACT_SYSTEM + ("\n\n" + PLAN_ADDENDUM.format(plan_max=plan_max) if plan_mode else "")
+    if multi_tab > 1:
+        system += "\n\n" + TABS_ADDENDUM.format(max_tabs=multi_tab)
+    task = ("\n\nTASK (choose exactly ONE):\n"
+            "- Decide the next minimal action towards pre-checkout, following rules.\n"
+            "- Output ONLY the JSON object with required fields.\n") if not plan_mode else (
+            f"\n\nTASK (plan up to {plan_max} actions):\n"
+            "- Decide the next actions towards pre-checkout, following rules.\n"
+            "- Output ONLY the JSON object: a single action or {\"plan\":[...]}.\n")
+    # stable prefix (system + persona + task rules) first, volatile suffix (history, then DOM) last.
+    # Provider prefix caching starts at 1024 tokens and the compact prefix is ~400, so expect
+    # cached_tokens near 0 unless the system prompt / addenda grow past that.
+    stable_user = "Persona:\n" + digest_persona(persona) + task
+    fixed_tokens = estimate_tokens(system) + estimate_tokens(stable_user) + 16
+    tokens_acc: Dict[str, int] = dict((resume or {}).get("tokens") or {"trimmed_steps": 0})
+    done = macro.pop("done", False)
+    plan_reused = 0
+    budget_stop = False
+    while not done:
+        if GOVERNOR is not None and GOVERNOR.exhausted("agent"):
+            GOVERNOR.note("agent", "stopped")
+            history.append({"info": "stop_budget", "step": step})
+            budget_stop = True
             break
-        if len(history) >= max_steps:
-            history.append({"info": "max-steps-reached", "step": step}); break
-    return {"history": history}
+        if GOVERNOR is not None and history_k > 2 and GOVERNOR.soft_hit("agent"):
+            history_k = 2; GOVERNOR.note("agent", "short_history")
+        dom = (await page.content())
+        if METRICS is not None:
+            METRICS.content(len(dom))
+        if resolver is not None: resolver.set_snapshot(dom)
+        hist_digest, dom_digest, trimmed, over = fit_prompt_budget(
+            history, dom, fixed_tokens=fixed_tokens, budget=prompt_budget,
+            use_history=use_history, history_k=history_k, dom_chars=dom_chars
+        )
+        tokens_acc["trimmed_steps"] += int(trimmed)
+        if over:
+            tokens_acc["over_budget_steps"] = tokens_acc.get("over_budget_steps", 0) + 1
+
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": stable_user},
+            {"role": "user", "content":
+                "Recent History (digest):\n" + hist_digest +
+                "\n\nDOM (digest):\n" + dom_digest
+            }
+        ]
+
+        # matrix variants share answers for the same page state at the same step
+        plan_key = f"{url_pattern(page.url)}|{snapshot_hash(dom_digest)}|{step}" if plan_cache is not None else None
+        if plan_key in (plan_cache or {}):
+            cmd = json.loads(plan_cache[plan_key])
+            plan_reused += 1
+        else:
+            try:
+                llm_calls += 1
+                resp = await chat_create_safe(
+                    agent_model, messages, want_json=True,
+                    temperature=agent_temp, max_tokens=220 if not plan_mode else 160 + 120 * plan_max,
+                    stage="agent"
+                )
+                add_usage(tokens_acc, resp)
+                raw = resp.choices[0].message.content
+                cmd = json.loads(raw)
+            except Exception as e:
+                try:
+                    m = re.search(r"\{[\s\S]*\}", raw if 'raw' in locals() else "")
+                    cmd = json.loads(m.group(0)) if m else {}
+                except Exception:
+                    history.append({"error": f"parse-fail: {repr(e)}"}); break
+            if plan_key and cmd:
+                plan_cache[plan_key] = json.dumps(cmd)
+
+        cmds = plan_commands(cmd, plan_max) if plan_mode else [cmd]
+        expected_url = page.url
+        for i, c in enumerate(cmds):
+            if i > 0:
+                reason = await plan_guard_failure(page, c, expected_url)
+                if reason:
+                    history.append({"info": f"plan_abort {reason}", "step": step}); break
+            if c.get("action") == "explore" and multi_tab > 1:
+                step, calls = await explore_tabs(
+                    page, c, persona, step=step, history=history, tokens_acc=tokens_acc,
+                    agent_model=agent_model, agent_temp=agent_temp, dom_chars=dom_chars,
+                    max_tabs=multi_tab, tab_steps=tab_steps
+                )
+                llm_calls += calls
+                status = "ok"
+            else:
+                step += 1
+                t_act = time.monotonic()
+                status = await execute_action(page, c, step, history, waiter, resolver)
+                if METRICS is not None:
+                    METRICS.step(str(c.get("action", "")), time.monotonic() - t_act)
+            if DASHBOARD is not None:
+                DASHBOARD.step(current_persona.get(), step, str(c.get("action", "")))
+            if status == "stop":
+                done = True; break
+
+            content_lc = (await page.content()).lower()
+            stop = any(m in content_lc for m in GLOBAL_STOP_MARKERS)
+            if stop:
+                history.append({"info": "stop_precheckout", "step": step})
+                time_to_stop = round(prior_elapsed + time.monotonic() - t_start, 2)
+                done = True; break
+            if history.main >= max_steps:
+                history.append({"info": "max-steps-reached", "step": step})
+                done = True; break
+            if max_timeouts and history.signals.consecutive_timeouts >= max_timeouts:
+                history.append({"info": "stop_timeouts", "step": step})
+                done = True; break
+            reason = stuck.observe(c, status, content_lc) if stuck is not None and stuck.enabled else None
+            if reason:
+                history.append({"info": f"stop_stuck {reason}", "step": step})
+                per_call = (tokens_acc.get("prompt_tokens", 0) + tokens_acc.get("completion_tokens", 0)) // max(1, tokens_acc.get("calls", 0))
+                saved = max(0, max_steps - history.main)
+                stuck_stop = {"reason": reason, "step": step, "steps_saved": saved, "tokens_saved_est": saved * per_call}
+                done = True; break
+            if status == "miss" and i < len(cmds) - 1:
+                history.append({"info": "plan_abort selector_missing", "step": step}); break
+            if c.get("expect_nav"):
+                expected_url = page.url
+        if not done and checkpoint_dir and checkpoint_every > 0 and step - last_ckpt_step >= checkpoint_every:
+            ckpt["ms"] += await write_checkpoint(page, checkpoint_dir, {
+                "history": history.to_list(), "step": step, "llm_calls": llm_calls, "start_fp": start_fp,
+                "macro": macro, "tokens": tokens_acc,
+                "elapsed_s": round(prior_elapsed + time.monotonic() - t_start, 2),
+            })
+            ckpt["writes"] += 1
+            last_ckpt_step = step
+    tokens_acc["cache_hit_rate"] = round(cache_hit_rate(tokens_acc), 4)
+    return {"history": history.to_list(), "llm_calls": llm_calls, "start_fp": start_fp, "macro": macro,
+            "tokens": tokens_acc, "waits": waiter.summary(),
+            "elapsed_s": round(prior_elapsed + time.monotonic() - t_start, 2), "time_to_stop_s": time_to_stop,
+            "checkpoint": {**ckpt, "ms": round(ckpt["ms"], 1)},
+            "signals": history.signals.result(), "stuck": stuck_stop,
+            "selector_repair": resolver.summary() if resolver is not None else None,
+            "plan_reused": plan_reused, "budget_stop": budget_stop}
 
 # ---------------- Suggestion machinery ----------------
 async def generate_axis_suggestions(persona: Dict[str, Any], axis: str, *,
@@ -713,7 +1781,8 @@ async def generate_axis_suggestions(persona: Dict[str, Any], axis: str, *,
             [{"role":"system","content":sys},{"role":"user","content":usr}],
             want_json=True,
             temperature=temp,
-            max_tokens=700
+            max_tokens=700,
+            stage="suggestions"
         )
         obj = json.loads(resp.choices[0].message.content or "{}")
         cand = obj.get("suggestions") or []
@@ -733,24 +1802,6 @@ async def generate_axis_suggestions(persona: Dict[str, Any], axis: str, *,
     except Exception:
         return []
 
-def extract_section(md: str, header: str) -> str:
-    lines = md.splitlines()
-    out, on = [], False
-    for ln in lines:
-        if ln.strip().startswith("## "):
-            on = (ln.strip() == header)
-            continue
-        if on: out.append(ln)
-    return "\n".join(out).strip()
-
-def extract_bullets(md: str, header: str) -> List[str]:
-    sec = extract_section(md, header)
-    out = []
-    for ln in sec.splitlines():
-        if ln.strip().startswith("- "):
-            out.append(ln.strip()[2:].strip())
-    return out
-
 def replace_section(md: str, header: str, new_body_lines: List[str]) -> str:
     lines = md.splitlines()
     res = []
@@ -774,32 +1825,6 @@ def unique_lines(lines: List[str]) -> List[str]:
             out.append(s)
     return out
 
-def categorize_bullet(text: str) -> str:
-    t = normalize_line(text)
-    kw = [
-        ("too_many_taps", ["too many taps","longer than expected","confirm choices"]),
-        ("filter_discoverability", ["filter placement","find where to filter","controls felt buried"]),
-        ("label_ambiguity", ["generic","wording","didnt convey"]),
-        ("loading_feedback", ["loading","feedback","applied","updated","acknowledgment"]),
-        ("stall", ["stall","pause","retrying"]),
-        ("fee_transparency", ["fee","breakdown"]),
-        ("upsell_pressure", ["upsell","add-on","add on","crowded"]),
-        ("diet_badges", ["diet badge","vegan marker","vegetarian marker"]),
-        ("allergen_flags", ["allergen"]),
-        ("aria_accessibility", ["screen reader","aria","assistive"]),
-        ("contrast_low", ["contrast","color alone"]),
-        ("tap_target_small", ["tap target","mis-tap"]),
-        ("budget_visibility", ["budget","cap results","under my target"]),
-        ("price_sorting", ["sorting by price","cheapest"]),
-        ("info_density", ["dense","packed","many elements"]),
-        ("redundant_steps", ["repeat","repeated","same choice"]),
-        ("thumb_reach", ["thumb zone","near the top"])
-    ]
-    for cat, words in kw:
-        if any(w in t for w in words):
-            return cat
-    return "label_ambiguity"
-
 def suggest_from_minor(minor_bullets: List[str], rng: random.Random, k: int = 2) -> List[str]:
     cats = []
     for b in minor_bullets:
@@ -848,8 +1873,89 @@ def persona_toned_positive(sig: Dict[str, Any], prof: Dict[str, Any]) -> List[st
         out.append("I reached the review step with only a few detours.")
     return [x for x in out if x]
 
+# ---------------- Suggestion bank ----------------
+class SuggestionBank:
+    """
+    Persistent, pre-warmed axis suggestions (built by build_suggestion_bank.py).
+    File: {"axes": {axis: [{"text","norm","category","used"}, ...]}}
+    Unused entries live in an insertion-ordered dict per axis → O(1) take. take() reserves an entry the
+    moment it is drawn, so concurrent personas never pick the same one.
+    """
+
+    def __init__(self, path: Optional[pathlib.Path] = None):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.unused: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.by_norm: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (axis, norm) → entry
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path) -> "SuggestionBank":
+        bank = cls(pathlib.Path(path))
+        if bank.path.exists():
+            try: data = json.loads(bank.path.read_text(encoding="utf-8"))
+            except Exception: data = {}
+            for ax, items in (data.get("axes") or {}).items():
+                for it in items or []:
+                    bank.add(ax, str(it.get("text", "")), used=bool(it.get("used")), category=it.get("category"))
+        bank.dirty = False
+        return bank
+
+    def add(self, axis: str, text: str, *, used: bool = False, category: Optional[str] = None) -> bool:
+        ax = (axis or "").strip().lower(); text = (text or "").strip()
+        nrm = normalize_line(text)
+        if not ax or not nrm or (ax, nrm) in self.by_norm:
+            return False
+        ent = {"text": text, "norm": nrm, "category": category or categorize_bullet(text), "used": used}
+        self.entries.setdefault(ax, {})[nrm] = ent
+        pool = self.unused.setdefault(ax, {})
+        if not used: pool[nrm] = ent
+        self.by_norm[(ax, nrm)] = ent
+        self.dirty = True
+        return True
+
+    def add_unique(self, axis: str, text: str) -> bool:
+        ax = (axis or "").strip().lower()
+        if any(combined_similar(text, e["text"]) for e in self.entries.get(ax, {}).values()):
+            return False
+        return self.add(ax, text)
+
+    def unused_texts(self, axis: str) -> List[str]:
+        return [e["text"] for e in self.unused.get(axis, {}).values()]
+
+    def exhausted(self, axis: str) -> bool:
+        return not self.unused.get(axis)
+
+    def take(self, axis: str, text: str) -> bool:
+        """Reserve text for the caller. False only if it is a bank entry of axis that is already taken."""
+        key = ((axis or "").strip().lower(), normalize_line(text))
+        ent = self.by_norm.get(key)
+        if ent is None:
+            return True  # not from the bank
+        if self.unused.get(key[0], {}).pop(key[1], None) is None:
+            return False
+        ent["used"] = True
+        self.dirty = True
+        return True
+
+    def reset_used(self):
+        for ax, ents in self.entries.items():
+            for nrm, e in ents.items(): e["used"] = False
+            self.unused[ax] = dict(ents)
+        self.dirty = True
+
+    def counts(self) -> Dict[str, Tuple[int, int]]:
+        return {ax: (len(ents), len(self.unused.get(ax, {}))) for ax, ents in sorted(self.entries.items())}
+
+    def save(self):
+        if not self.path or not self.dirty: return
+        data = {"axes": {ax: list(ents.values()) for ax, ents in sorted(self.entries.items())}}
+        self.path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        self.dirty = False
+
 async def rewrite_markdown_to_avoid(rewrite_model: str, rewrite_temp: float,
-                                    persona: Dict[str, Any], md: str, forbid: List[str]) -> str:
+                                    persona: Dict[str, Any], md: str, forbid: List[str],
+                                    usage: Optional[Dict[str, int]] = None) -> str:
     forbid_list = "\n".join(f"- {p}" for p in forbid[:80])
     messages = [
         {"role": "system", "content": REWRITE_SYSTEM},
@@ -859,8 +1965,12 @@ async def rewrite_markdown_to_avoid(rewrite_model: str, rewrite_temp: float,
         rewrite_model, messages,
         want_json=False,
         temperature=rewrite_temp,
-        max_tokens=420
+        max_tokens=420,
+        stage="rewrite"
     )
+    if usage is not None:
+        usage["tokens"] = usage.get("tokens", 0) + usage_tokens(resp)
+        usage["calls"] = usage.get("calls", 0) + 1
     return resp.choices[0].message.content.strip()
 
 async def choose_suggestions(persona: dict,
@@ -874,15 +1984,19 @@ async def choose_suggestions(persona: dict,
                              forbid_phrases: Set[str],
                              corpus_phrases: Set[str],
                              ngram_n: int = 4,
-                             thresh: float = 0.70) -> List[str]:
+                             thresh: float = 0.70,
+                             bank: Optional[SuggestionBank] = None) -> List[str]:
     order = candidate_axes(persona) + ["generic"]
     rng = rng_for_persona(persona)
     picked: List[str] = []
 
     async def axis_pool(ax: str) -> List[str]:
         base = list(SUGGESTIONS_AXIS.get(ax, [])) + list(external_axis.get(ax, []))
+        banked = bank.unused_texts(ax) if bank is not None else []
+        banked_set = set(banked)
         cleaned: List[str] = []
-        for s in base:
+        from_bank = 0
+        for s in base + banked:
             s = s.strip()
             if not s: continue
             nrm = normalize_line(s)
@@ -891,9 +2005,12 @@ async def choose_suggestions(persona: dict,
             if any(combined_similar(s, t) for t in cleaned):
                 continue
             cleaned.append(s)
+            if s in banked_set: from_bank += 1
 
-        if len(cleaned) < suggestions_per_axis:
-            need_more = suggestions_per_axis - len(cleaned)
+        # with a bank, live generation only runs once the axis is exhausted
+        live = (bank is None and len(cleaned) < suggestions_per_axis) or (bank is not None and from_bank == 0)
+        if live:
+            need_more = max(1, suggestions_per_axis - len(cleaned))
             dyn = await generate_axis_suggestions(
                 persona, ax, model=suggestions_model, temp=suggestions_temp,
                 need=need_more*3,
@@ -902,6 +2019,8 @@ async def choose_suggestions(persona: dict,
                 ngram_n=4, thresh=0.70
             )
             for s in dyn:
+                if bank is not None:
+                    bank.add_unique(ax, s)
                 if any(combined_similar(s, t) for t in cleaned):
                     continue
                 cleaned.append(s)
@@ -910,6 +2029,11 @@ async def choose_suggestions(persona: dict,
         rng.shuffle(cleaned)
         return cleaned
 
+    def _done() -> List[str]:
+        if bank is not None:
+            bank.save()
+        return picked[:need]
+
     for ax in order:
         pool = await axis_pool(ax)
         for s in pool:
@@ -917,9 +2041,12 @@ async def choose_suggestions(persona: dict,
                 continue
             if any(combined_similar(s, u) for u in picked):
                 continue
+            # reserve now: other personas may draw from this axis while we await the next one
+            if bank is not None and not bank.take(ax, s):
+                continue
             picked.append(s)
             if len(picked) >= need:
-                return picked
+                return _done()
 
     while len(picked) < need:
         g = "Offer a clearer, mobile-first control for my constraint with concise labeling."
@@ -927,7 +2054,7 @@ async def choose_suggestions(persona: dict,
             picked.append(g)
         else:
             picked.append(g + " Include brief examples on the first tap.")
-    return picked[:need]
+    return _done()
 
 # ---------------- Analysis & write ----------------
 async def analyze_and_save(
@@ -944,18 +2071,26 @@ async def analyze_and_save(
     used_suggestions_global: Set[str],
     suggestions_axis_external: Dict[str, List[str]],
     suggestions_model: str, suggestions_temp: float, suggestions_per_axis: int,
-    cooldown_max_per_phrase: int, cooldown_max_per_category: int
+    cooldown_max_per_phrase: int, cooldown_max_per_category: int,
+    suggestion_bank: Optional[SuggestionBank] = None,
+    corpus_index: Optional[CorpusIndex] = None,
+    rewrite_parallel: int = 0, rewrite_token_budget: int = 0,
+    history_keep_recent: int = 0
 ):
     try:
+        if GOVERNOR is not None and GOVERNOR.exhausted("analysis"):
+            GOVERNOR.note("analysis", "template")
+            raise RuntimeError("analysis budget exhausted")
         analysis_resp = await chat_create_safe(
             analysis_model,
             [
                 {"role": "system", "content": ANALYSIS_SYSTEM},
-                {"role": "user",   "content": json.dumps({"persona": persona, **run}, ensure_ascii=False)}
+                {"role": "user",   "content": json.dumps({"persona": persona, "history": summarize_history(run.get("history", []), history_keep_recent)}, ensure_ascii=False)}
             ],
             want_json=True,
             temperature=analysis_temp,
-            max_tokens=420
+            max_tokens=420,
+            stage="analysis"
         )
         aobj = json.loads(analysis_resp.choices[0].message.content)
     except Exception:
@@ -966,7 +2101,8 @@ async def analyze_and_save(
                          f"({persona.get('income','?')}; {persona.get('diet','none')}/{persona.get('accessibility','none')}); "
                          f"goal: {persona.get('goal','n/a')}")
 
-    sig = collect_signals(run.get("history", []))
+    # live signals from the agent loop; rescan only for runs produced without them
+    sig = run.pop("signals", None) or collect_signals(run.get("history", []))
     rng = rng_for_persona(persona)
     prof = persona_profile(persona)
 
@@ -1014,25 +2150,90 @@ async def analyze_and_save(
             + "".join(f"- {x}\n" for x in imps)
         )
 
-    def too_similar(md_text: str) -> bool:
-        sim = sim_against_corpus(md_text, corpus_texts, n=ngram_n) if corpus_texts else 0.0
+    if corpus_index is None or corpus_index.n != ngram_n:
+        corpus_index = CorpusIndex(ngram_n)
+    corpus_index.sync(corpus_texts)
+
+    def similarity(md_text: str) -> Tuple[float, int]:
+        sim = corpus_index.best_sim(md_text) if corpus_texts else 0.0
         overlap = 0
         for h in ["## What Worked Well","## Minor Friction","## Suggested Improvements"]:
             for b in extract_bullets(md_text, h):
                 nb = normalize_line(b)
                 if nb in corpus_phrases or nb in forbid_phrases:
                     overlap += 1
-        return sim >= diversify_threshold or overlap >= 2
+        return sim, overlap
+
+    def passes(score: Tuple[float, int]) -> bool:
+        return score[0] < diversify_threshold and score[1] < 2
 
+    t0 = time.time()
+    score0 = similarity(md)
+    usage: Dict[str, int] = {"tokens": 0, "calls": 0}
+    attempts: List[Dict[str, Any]] = []
     tries = 0
-    while too_similar(md) and tries < diversify_retries and rewrite_model:
-        forbid = list((corpus_phrases | forbid_phrases))[:80]
-        md2 = await rewrite_markdown_to_avoid(
-            rewrite_model, rewrite_temp, persona, md, forbid
-        )
-        if md2 and not too_similar(md2):
-            md = md2; break
-        tries += 1
+    forbid = list((corpus_phrases | forbid_phrases))[:80]
+    if GOVERNOR is not None and rewrite_model and not passes(score0):
+        if GOVERNOR.exhausted("rewrite"):
+            diversify_retries = 0; GOVERNOR.note("rewrite", "skipped")
+        elif GOVERNOR.soft_hit("rewrite") and diversify_retries > 1:
+            diversify_retries = 1; GOVERNOR.note("rewrite", "reduced")
+    if rewrite_parallel > 1:
+        # speculative: k concurrent candidates per round, keep the least similar that passes
+        avg_cost = 0
+        while not passes(score0) and tries < diversify_retries and rewrite_model:
+            k = min(rewrite_parallel, diversify_retries - tries)
+            if GOVERNOR is not None:
+                left = GOVERNOR.calls_left("rewrite")
+                if GOVERNOR.exhausted("rewrite") or left == 0:
+                    GOVERNOR.note("rewrite", "stopped"); break
+                if left is not None and left < k:
+                    k = left; GOVERNOR.note("rewrite", "fewer_candidates")
+            if rewrite_token_budget:  # one probe call until a rewrite's cost is known
+                k = min(k, (rewrite_token_budget - usage["tokens"]) // avg_cost if avg_cost else 1)
+            if k <= 0 or (rewrite_token_budget and usage["tokens"] >= rewrite_token_budget):
+                break
+            with (GOVERNOR.reserve("rewrite", k) if GOVERNOR is not None else contextlib.nullcontext()):
+                outs = await asyncio.gather(*[
+                    rewrite_markdown_to_avoid(rewrite_model, rewrite_temp, persona, md, forbid, usage=usage)
+                    for _ in range(k)
+                ], return_exceptions=True)
+            tries += k
+            avg_cost = max(1, usage["tokens"] // usage["calls"]) if usage.get("calls") else 0
+            best = None
+            for md2 in outs:
+                if isinstance(md2, BaseException) or not md2:
+                    attempts.append({"ok": False}); continue
+                sc = similarity(md2)
+                attempts.append({"ok": True, "sim": round(sc[0], 4), "overlap": sc[1], "passed": passes(sc)})
+                if passes(sc) and (best is None or sc < best[0]):
+                    best = (sc, md2)
+            if best:
+                md = best[1]; break
+    else:
+        while not passes(score0) and tries < diversify_retries and rewrite_model:
+            if rewrite_token_budget and usage["tokens"] >= rewrite_token_budget:
+                break
+            if GOVERNOR is not None and GOVERNOR.exhausted("rewrite"):
+                break
+            md2 = await rewrite_markdown_to_avoid(
+                rewrite_model, rewrite_temp, persona, md, forbid, usage=usage
+            )
+            sc = similarity(md2) if md2 else None
+            attempts.append({"ok": bool(md2), **({"sim": round(sc[0], 4), "overlap": sc[1], "passed": passes(sc)} if sc else {})})
+            if md2 and passes(sc):
+                md = md2; break
+            tries += 1
+    diversify_log = {
+        "mode": "speculative" if rewrite_parallel > 1 else "sequential",
+        "initial_sim": round(score0[0], 4), "initial_overlap": score0[1],
+        "attempts": attempts, "rewrites": usage["calls"], "tokens": usage["tokens"],
+        "passed": any(a.get("passed") for a in attempts),
+        "elapsed_s": round(time.time() - t0, 3),
+    }
+    if METRICS is not None:
+        for a in attempts:
+            METRICS.rewrite(bool(a.get("passed")))
 
     # ---------- Intra-section de-dup & global uniqueness ----------
     used_good_global  = _load_used_set(root, "_used_good.json")
@@ -1081,6 +2282,15 @@ async def analyze_and_save(
 
     # 보충 필요 시 축 기반 선택
     need_more = max(0, min_unique_sugg - len(final_imps))
+    if need_more > 0 and GOVERNOR is not None and GOVERNOR.soft_hit("suggestions"):
+        GOVERNOR.note("suggestions", "pool")
+        pool = suggest_from_minor(minors, rng, k=need_more + 3)
+        for x in [x for x in pool if not any(combined_similar(x, u) for u in used_sugg_global)][:need_more]:
+            final_imps.append(x)
+            used_sugg_global.add(x)
+            bump_count(used_sugg_counts, normalize_line(x))
+            bump_count(used_sugg_catcnt, categorize_bullet(x))
+        need_more = 0
     if need_more > 0:
         more = await choose_suggestions(
             persona, used_sugg_global, need_more,
@@ -1089,7 +2299,8 @@ async def analyze_and_save(
             suggestions_temp=suggestions_temp,
             suggestions_per_axis=suggestions_per_axis,
             forbid_phrases=forbid_phrases, corpus_phrases=corpus_phrases,
-            ngram_n=ngram_n, thresh=diversify_threshold
+            ngram_n=ngram_n, thresh=diversify_threshold,
+            bank=suggestion_bank
         )
         for s in more:
             final_imps.append(s)
@@ -1122,7 +2333,8 @@ async def analyze_and_save(
             "analysis": md,
             "score": float(f"{score_int:.1f}"),
             "description": desc,
-            "signals": sig
+            "signals": sig,
+            "diversify": diversify_log
         }, f, ensure_ascii=False, indent=2)
 
     corpus_texts.append(md)
@@ -1135,6 +2347,8 @@ async def analyze_and_save(
     _save_used_set(root, "_used_sugg.json", used_sugg_global)
     _save_used_counts(root, "_used_sugg_counts.json", used_sugg_counts)
     _save_used_counts(root, "_used_sugg_cat_counts.json", used_sugg_catcnt)
+    if METRICS is not None:
+        METRICS.outcome(persona.get("condition"), run_outcome(run.get("history") or []), score_int)
 
 # ---------------- Baseline / corpus ----------------
 def load_baseline_issue(baseline_dir: pathlib.Path, pid: str) -> Optional[Dict[str, Any]]:
@@ -1181,40 +2395,93 @@ def prime_corpus_from_dir(root: pathlib.Path) -> Tuple[List[str], Set[str]]:
             continue
     return texts, phrases
 
+# ---------------- Browser contexts ----------------
+DEFAULT_DEVICE = "iPhone 15"
+DEFAULT_GEO = {"locale": "en-US", "timezone_id": "America/New_York",
+               "geolocation": {"latitude": 40.7128, "longitude": -74.0060}}
+DEFAULT_CITY = "New York"  # DEFAULT_GEO's place, for variant ids
+START_URL = "https://www.ubereats.com"
+
+def persona_geo(persona: Dict[str, Any]) -> Dict[str, Any]:
+    """locale / timezone_id / geolocation for persona.location from the offline gazetteer (default: New York)."""
+    return gazetteer_context(persona.get("location") or "") or {
+        **DEFAULT_GEO, "geolocation": dict(DEFAULT_GEO["geolocation"])
+    }
+
+def device_profile(play, name: str) -> Dict[str, Any]:
+    try:
+        device = dict(play.devices[name])
+    except KeyError:
+        device = {
+            "viewport": {"width": 393, "height": 852},
+            "user_agent": ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) "
+                           "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 "
+                           "Mobile/15E148 Safari/604.1"),
+            "isMobile": True, "hasTouch": True,
+        }
+    device.pop("default_browser_type", None)
+    return device
+
+async def open_session(browser, device: Dict[str, Any], geo: Dict[str, Any], url: str,
+                       goto_timeout_ms: int, storage_state: Optional[Dict[str, Any]] = None):
+    """New context + page on url with the cookie banner dismissed. Returns (context, page)."""
+    extra = {"storage_state": storage_state} if storage_state else {}
+    context = await browser.new_context(**device, **geo, permissions=["geolocation"], **extra)
+    try:
+        page = await context.new_page()
+        await page.goto(url, wait_until="domcontentloaded", timeout=goto_timeout_ms)
+        try: await page.wait_for_load_state("networkidle", timeout=3000)
+        except Exception: pass
+        for sel in ["button:has-text('Accept')","button:has-text('Agree')","button[aria-label*='accept']"]:
+            try:
+                if await page.locator(sel).count() > 0:
+                    await page.click(sel, timeout=1000); break
+            except Exception: pass
+        return context, page
+    except Exception:
+        await context.close(); raise
+
+def matrix_variants(persona: Dict[str, Any], devices: List[str], geos: List[str]) -> List[Dict[str, Any]]:
+    """Device × geo ("persona" | "default") variants; identical contexts are collapsed."""
+    out, seen = [], set()
+    for dev in devices:
+        for mode in geos:
+            geo = persona_geo(persona) if mode == "persona" else {**DEFAULT_GEO, "geolocation": dict(DEFAULT_GEO["geolocation"])}
+            ll = geo.get("geolocation") or {}
+            key = (dev, geo["locale"], geo["timezone_id"], round(ll.get("latitude", 0.0), 3), round(ll.get("longitude", 0.0), 3))
+            if key in seen: continue
+            seen.add(key)
+            city = DEFAULT_CITY if geo == DEFAULT_GEO else (persona.get("location") or "").split(",")[0]
+            vid = "__".join(re.sub(r"[^a-z0-9]+", "-", x.lower()).strip("-") for x in (dev, geo["locale"], city))
+            out.append({"id": vid, "device": dev, "geo_mode": mode, "geo": geo})
+    return out
+
 # ---------------- Runner ----------------
 async def run_one(play, persona: Dict[str, Any], *,
                   engine: str, headful: bool,
                   agent_model: str, agent_temp: float,
                   dom_chars: int, use_history: bool, history_k: int,
-                  max_steps: int, goto_timeout_ms: int, retry_goto: int) -> Dict[str, Any]:
+                  max_steps: int, goto_timeout_ms: int, retry_goto: int,
+                  plan_mode: bool = False, plan_max: int = 4,
+                  macro_cache: Optional[MacroCache] = None,
+                  prompt_budget: int = 0, multi_tab: int = 0, tab_steps: int = 4,
+                  checkpoint_dir: Optional[pathlib.Path] = None, checkpoint_every: int = 0,
+                  max_timeouts: int = 0, stuck: Optional[StuckPolicy] = None,
+                  repair_selectors: bool = False) -> Dict[str, Any]:
+    resume = load_checkpoint(checkpoint_dir) if checkpoint_every > 0 else None
+    start_url = (resume or {}).get("url") or START_URL
 
     async def _start(browser_type, goto_timeout_ms):
-        browser = await browser_type.launch(headless=not headful)
         try:
-            try:
-                device = play.devices["iPhone 15"]
-            except KeyError:
-                device = {
-                    "viewport": {"width": 393, "height": 852},
-                    "user_agent": ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) "
-                                   "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 "
-                                   "Mobile/15E148 Safari/604.1"),
-                    "isMobile": True, "hasTouch": True,
-                }
-            context = await browser.new_context(
-                **device, locale="en-US", timezone_id="America/New_York",
-                geolocation={"latitude": 40.7128, "longitude": -74.0060},
-                permissions=["geolocation"],
+            browser = await browser_type.launch(headless=not headful)
+        finally:
+            if METRICS is not None:
+                METRICS.launch(getattr(browser_type, "name", engine), "browser" in locals())
+        try:
+            context, page = await open_session(
+                browser, device_profile(play, DEFAULT_DEVICE), persona_geo(persona), start_url, goto_timeout_ms,
+                storage_state=(resume or {}).get("storage_state"),
             )
-            page = await context.new_page()
-            await page.goto("https://www.ubereats.com", wait_until="domcontentloaded", timeout=goto_timeout_ms)
-            try: await page.wait_for_load_state("networkidle", timeout=3000)
-            except Exception: pass
-            for sel in ["button:has-text('Accept')","button:has-text('Agree')","button[aria-label*='accept']"]:
-                try:
-                    if await page.locator(sel).count() > 0:
-                        await page.click(sel, timeout=1000); break
-                except Exception: pass
             return page, context, browser
         except Exception:
             await browser.close(); raise
@@ -1236,14 +2503,75 @@ async def run_one(play, persona: Dict[str, Any], *,
             page, persona,
             agent_model=agent_model, agent_temp=agent_temp,
             dom_chars=dom_chars, use_history=use_history, history_k=history_k,
-            max_steps=max_steps
+            max_steps=max_steps, plan_mode=plan_mode, plan_max=plan_max,
+            macro_cache=macro_cache, prompt_budget=prompt_budget,
+            multi_tab=multi_tab, tab_steps=tab_steps,
+            checkpoint_dir=checkpoint_dir, checkpoint_every=checkpoint_every, resume=resume,
+            max_timeouts=max_timeouts, stuck=stuck, repair_selectors=repair_selectors
         )
+    except Exception:
+        if METRICS is not None:
+            METRICS.crash(getattr(browser_type, "name", engine))
+        raise
     finally:
         await browser.close()
     return result
 
+async def run_matrix(play, persona: Dict[str, Any], variants: List[Dict[str, Any]], *,
+                     engine: str, headful: bool, goto_timeout_ms: int, retry_goto: int,
+                     **agent_kw) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    One persona across device/geo variants: a single browser launch, a fresh context per variant,
+    run in order so later variants reuse earlier agent answers where the page state matches.
+    """
+    browser_type = getattr(play, engine)
+    browser, last_exc = None, None
+    for _ in range(retry_goto + 1):
+        try:
+            browser = await browser_type.launch(headless=not headful)
+            if METRICS is not None:
+                METRICS.launch(getattr(browser_type, "name", engine), True)
+            break
+        except Exception as e:
+            if METRICS is not None:
+                METRICS.launch(getattr(browser_type, "name", engine), False)
+            last_exc = e
+            browser_type = play.chromium
+    if browser is None:
+        raise last_exc
+
+    plan_cache: Dict[str, str] = {}
+    out = []
+    try:
+        for v in variants:
+            context = None
+            try:
+                for attempt in range(retry_goto + 1):
+                    try:
+                        context, page = await open_session(
+                            browser, device_profile(play, v["device"]), v["geo"], START_URL, goto_timeout_ms
+                        )
+                        break
+                    except Exception:
+                        if attempt >= retry_goto: raise
+                result = await act_with_llm(page, persona, plan_cache=plan_cache, **agent_kw)
+            except Exception as e:
+                if METRICS is not None and context is not None:
+                    METRICS.crash(getattr(browser_type, "name", engine))
+                print(f"  {persona.get('id')}/{v['id']} failed: {e!r}")
+                continue
+            finally:
+                if context is not None:
+                    await context.close()
+            result["variant"] = {"id": v["id"], "device": v["device"], "geo_mode": v["geo_mode"], **v["geo"]}
+            out.append((v, result))
+    finally:
+        await browser.close()
+    return out
+
 async def main(args):
-    personas = json.load(open(args.personas, encoding="utf-8"))
+    global GOVERNOR, DASHBOARD, METRICS, PROFILER
+    personas = load_personas(args.personas)
     root     = pathlib.Path(args.output); root.mkdir(parents=True, exist_ok=True)
     baseline_dir = pathlib.Path(args.baseline_dir) if args.baseline_dir else None
 
@@ -1285,34 +2613,156 @@ async def main(args):
             return {}
 
     suggestions_axis_external = load_suggestions_file(args.suggestions_file)
+    suggestion_bank = SuggestionBank.load(args.suggestion_bank) if args.suggestion_bank else None
+    corpus_index = CorpusIndex(args.ngram_n)
+    macro_cache = None
+    if args.macro_cache:
+        macro_cache = MacroCache.load(args.macro_cache, min_conf=args.macro_min_conf, min_support=args.macro_min_support)
+        mined = macro_cache.mine([pathlib.Path(d) for d in args.macro_runs.split(",") if d.strip()])
+        macro_cache.save()
+        print(f"Macro cache: {mined} macros from {args.macro_runs}")
+    if suggestion_bank is not None:
+        left = sum(u for _, u in suggestion_bank.counts().values())
+        print(f"Suggestion bank: {args.suggestion_bank} ({left} unused)")
     used_suggestions_global: Set[str] = _load_used_set(root, "_used_suggestions.json")
 
+    GOVERNOR = CostGovernor(
+        tokens=args.budget_tokens, usd=args.budget_usd, wall_min=args.budget_wall_min,
+        browser_min=args.budget_browser_min, soft=args.budget_soft,
+        stages=json.loads(args.stage_budgets) if args.stage_budgets else None,
+        prices=json.loads(args.model_prices) if args.model_prices else None,
+    )
     sem = asyncio.Semaphore(max(1, args.concurrency))
+    if args.dashboard_port:
+        from dashboard import Dashboard
+        DASHBOARD = await Dashboard(total=len(personas), slots=max(1, args.concurrency),
+                                    interval=args.dashboard_interval).start(args.dashboard_host, args.dashboard_port)
+        print(f"Dashboard: http://{args.dashboard_host}:{args.dashboard_port}/")
+    if args.metrics_port or args.metrics_file:
+        from metrics import Metrics
+        METRICS = await Metrics().start(host=args.metrics_host, port=args.metrics_port,
+                                        path=args.metrics_file, interval=args.metrics_interval)
+        if args.metrics_port:
+            print(f"Metrics: http://{args.metrics_host}:{args.metrics_port}/metrics")
+    if args.profile:
+        from loop_profiler import LoopProfiler
+        PROFILER = LoopProfiler(root / "_profile", threshold_ms=args.profile_threshold_ms,
+                                lag_interval_ms=args.profile_lag_interval_ms).start()
+    agent_tokens: Dict[str, Any] = {}
+    stuck_totals: Dict[str, Any] = {"sessions": 0, "steps_saved": 0, "tokens_saved_est": 0, "by_reason": {}}
 
     async with async_playwright() as p:
+        matrix_devices = [d.strip() for d in (args.matrix_devices or "").split(",") if d.strip()]
+        matrix_geos = [g.strip() for g in args.matrix_geo.split(",") if g.strip()] or ["default"]
+
         async def run_one_persona(persona, idx):
             pid  = persona.get("id") or f"P-{idx:02}"
             sess = root / pid
-            if (sess / "issues.json").exists() and not args.overwrite:
+            variants = matrix_variants(persona, matrix_devices, matrix_geos) if matrix_devices else []
+            done_files = [sess / v["id"] / "issues.json" for v in variants] or [sess / "issues.json"]
+            if all(f.exists() for f in done_files) and not args.overwrite:
                 print(f"{pid} ✔︎ Skip")
-                try:
-                    md = (sess / "issues.md").read_text(encoding="utf-8")
-                    corpus_texts.append(md)
-                    for h in ["## What Worked Well","## Minor Friction","## Suggested Improvements"]:
-                        for b in extract_bullets(md, h):
-                            corpus_phrases.add(normalize_line(b))
-                except Exception: pass
+                for f in done_files:
+                    try:
+                        md = f.with_name("issues.md").read_text(encoding="utf-8")
+                        corpus_texts.append(md)
+                        for h in ["## What Worked Well","## Minor Friction","## Suggested Improvements"]:
+                            for b in extract_bullets(md, h):
+                                corpus_phrases.add(normalize_line(b))
+                    except Exception: pass
+                if DASHBOARD is not None:
+                    DASHBOARD.persona_skipped(pid)
                 return
-            print(f"▶ {pid}")
-            async with sem:
-                result = await run_one(
-                    p, persona,
-                    engine=args.engine, headful=args.headful,
-                    agent_model=args.agent_model, agent_temp=args.agent_temp,
-                    dom_chars=args.dom_chars, use_history=args.use_history, history_k=args.history_k,
-                    max_steps=args.max_steps, goto_timeout_ms=args.goto_timeout_ms, retry_goto=args.retry_goto
-                )
-            await analyze_and_save(
+            current_persona.set(pid)
+            if GOVERNOR.exhausted("agent"):
+                GOVERNOR.note("agent", "persona_skipped")
+                print(f"{pid} ✖ Skip (budget exhausted)")
+                if DASHBOARD is not None:
+                    DASHBOARD.persona_skipped(pid)
+                return
+            agent_kw = dict(
+                agent_model=args.agent_model, agent_temp=args.agent_temp,
+                dom_chars=args.dom_chars, use_history=args.use_history, history_k=args.history_k,
+                max_steps=args.max_steps, plan_mode=args.plan_mode, plan_max=args.plan_max,
+                macro_cache=macro_cache, prompt_budget=args.prompt_budget,
+                multi_tab=args.multi_tab, tab_steps=args.tab_steps,
+                max_timeouts=args.max_timeouts,
+                stuck=StuckPolicy(args.stuck_repeat, args.stuck_misses, args.stuck_no_change),
+                repair_selectors=args.repair_selectors
+            )
+            if DASHBOARD is not None:
+                DASHBOARD.persona_queued()
+            if variants:
+                print(f"▶ {pid} matrix: " + ", ".join(v["id"] for v in variants))
+                async with sem, browser_slot(pid, persona.get("condition")):
+                    runs = await run_matrix(
+                        p, persona, variants,
+                        engine=args.engine, headful=args.headful,
+                        goto_timeout_ms=args.goto_timeout_ms, retry_goto=args.retry_goto, **agent_kw
+                    )
+                runs = [(f"{pid}/{v['id']}", result) for v, result in runs]
+            else:
+                print(f"▶ {pid}" + (" (resume from checkpoint)" if args.checkpoint_every > 0 and (sess / CHECKPOINT_FILE).exists() else ""))
+                async with sem, browser_slot(pid, persona.get("condition")):
+                    result = await run_one(
+                        p, persona,
+                        engine=args.engine, headful=args.headful,
+                        goto_timeout_ms=args.goto_timeout_ms, retry_goto=args.retry_goto,
+                        checkpoint_dir=sess, checkpoint_every=args.checkpoint_every, **agent_kw
+                    )
+                runs = [(pid, result)]
+
+            for rid, result in runs:
+                await report_run(persona, rid, result)
+            if not variants:
+                clear_checkpoint(sess)
+            if DASHBOARD is not None:
+                scores = [json.loads((root / rid / "issues.json").read_text(encoding="utf-8")).get("score") for rid, _ in runs]
+                DASHBOARD.persona_finish(pid, score=scores[0] if len(scores) == 1 else None)
+
+        @contextlib.asynccontextmanager
+        async def browser_slot(pid, condition=None):
+            """Browser-minutes for the governor; start / pool usage / failures for the dashboard."""
+            slot = GOVERNOR.browser_open()
+            if DASHBOARD is not None:
+                DASHBOARD.persona_start(pid); DASHBOARD.browser(1)
+            try:
+                yield
+            except BaseException:
+                if DASHBOARD is not None:
+                    DASHBOARD.persona_finish(pid, ok=False)
+                if METRICS is not None:
+                    METRICS.outcome(condition, "error")
+                raise
+            finally:
+                GOVERNOR.browser_close(slot)
+                if DASHBOARD is not None:
+                    DASHBOARD.browser(-1)
+
+        async def report_run(persona, pid, result):
+            sess = root / pid
+            if result.get("plan_reused"):
+                print(f"  {pid} reused {result['plan_reused']} agent answers from earlier variants")
+            rep = result.get("selector_repair")
+            if rep and rep["attempts"]:
+                print(f"  {pid} selector repair {rep['hits']}/{rep['attempts']} "
+                      f"(~{rep['llm_calls_avoided']} LLM calls avoided)")
+            if result.get("budget_stop"):
+                print(f"  {pid} stopped at budget")
+            if result.get("stuck"):
+                st = result["stuck"]
+                stuck_totals["sessions"] += 1
+                stuck_totals["steps_saved"] += st["steps_saved"]
+                stuck_totals["tokens_saved_est"] += st["tokens_saved_est"]
+                stuck_totals["by_reason"][st["reason"]] = stuck_totals["by_reason"].get(st["reason"], 0) + 1
+                print(f"  {pid} stopped stuck ({st['reason']}) at step {st['step']}")
+            tok = result.get("tokens") or {}
+            for k in ("calls", "prompt_tokens", "cached_tokens", "completion_tokens"):
+                agent_tokens[k] = agent_tokens.get(k, 0) + int(tok.get(k, 0))
+            waits = result.get("waits") or {}
+            print(f"  {pid} agent prompt cache hit {100 * cache_hit_rate(tok):.0f}% over {tok.get('calls', 0)} calls; "
+                  f"waits saved {waits.get('saved_ms', 0) / 1000:.1f}s of {waits.get('requested_ms', 0) / 1000:.1f}s")
+            analysis = analyze_and_save(
                 root, persona, result, pid,
                 analysis_model=args.analysis_model, analysis_temp=args.analysis_temp,
                 corpus_texts=corpus_texts, corpus_phrases=corpus_phrases, forbid_phrases=forbid_from_file,
@@ -1329,8 +2779,14 @@ async def main(args):
                 suggestions_temp=args.suggestions_temp,
                 suggestions_per_axis=args.suggestions_per_axis,
                 cooldown_max_per_phrase=args.cooldown_max_per_phrase,
-                cooldown_max_per_category=args.cooldown_max_per_category
+                cooldown_max_per_category=args.cooldown_max_per_category,
+                suggestion_bank=suggestion_bank,
+                corpus_index=corpus_index,
+                rewrite_parallel=args.rewrite_parallel,
+                rewrite_token_budget=args.rewrite_token_budget,
+                history_keep_recent=args.history_keep_recent
             )
+            await (PROFILER.wrap(pid, analysis) if PROFILER is not None else analysis)
 
             # persist global suggestion set for resume-ability
             _save_used_set(root, "_used_suggestions.json", used_suggestions_global)
@@ -1346,9 +2802,34 @@ async def main(args):
         for s in range(0, len(tasks), chunk):
             await asyncio.gather(*tasks[s:s+chunk])
 
+    if stuck_totals["sessions"]:
+        (root / "_stuck_summary.json").write_text(json.dumps(stuck_totals, indent=2), encoding="utf-8")
+        print(f"Stuck stops: {stuck_totals['sessions']} sessions, ~{stuck_totals['steps_saved']} steps "
+              f"and ~{stuck_totals['tokens_saved_est']} agent tokens saved {stuck_totals['by_reason']}")
+    if DASHBOARD is not None:
+        await DASHBOARD.stop()
+    if METRICS is not None:
+        await METRICS.stop(args.metrics_file)
+    if PROFILER is not None:
+        prof = PROFILER.stop()
+        lag = prof["loop_lag"]
+        print(f"Profile: {len(prof['flagged'])} analysis sections over {prof['threshold_ms']} ms; loop lag "
+              f"p95 {lag['p95_ms']} ms, max {lag['max_ms']} ms → {root / '_profile'}")
+    cost = GOVERNOR.summary()
+    (root / "_cost.json").write_text(json.dumps(cost, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Cost: ${cost['total'].get('usd', 0):.4f}, {cost['total'].get('tokens', 0)} tokens, "
+          f"{cost['browser_min']} browser-min, {cost['wall_min']} min wall; by stage "
+          + ", ".join(f"{k} ${v.get('usd', 0):.4f}" for k, v in cost["by_stage"].items())
+          + (f"; degraded {cost['degraded']}" if cost["degraded"] else ""))
+    if agent_tokens.get("calls"):
+        agent_tokens["cache_hit_rate"] = round(cache_hit_rate(agent_tokens), 4)
+        (root / "_agent_tokens.json").write_text(json.dumps(agent_tokens, indent=2), encoding="utf-8")
+        print(f"Agent prompt tokens: {agent_tokens['prompt_tokens']} "
+              f"(cached {agent_tokens['cached_tokens']}, hit rate {100 * agent_tokens['cache_hit_rate']:.1f}%)")
+
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
-    ap.add_argument("--personas", required=True)
+    ap.add_argument("--personas", required=True, help="JSON array or .jsonl")
     ap.add_argument("--output",   required=True)
 
     ap.add_argument("--engine", choices=["webkit","chromium","firefox"], default="webkit")
@@ -1363,9 +2844,37 @@ if __name__ == "__main__":
     ap.add_argument("--rewrite_temp", type=float, default=1.20)
 
     ap.add_argument("--use_history", action="store_true")
+    ap.add_argument("--history_keep_recent", type=int, default=0,
+                    help="Send only the last N steps verbatim to the analysis model; older steps are summarized (0 = all).")
     ap.add_argument("--history_k", type=int, default=6)
     ap.add_argument("--dom_chars", type=int, default=3500)
+    ap.add_argument("--prompt_budget", type=int, default=0,
+                    help="Hard per-step agent prompt budget in estimated tokens; trims history then DOM (0 = off).")
     ap.add_argument("--max_steps", type=int, default=MAX_STEPS_DEFAULT)
+    ap.add_argument("--max_timeouts", type=int, default=0,
+                    help="End the session after N consecutive action timeouts (0 = off).")
+    ap.add_argument("--matrix_devices", type=str, default=None,
+                    help="Comma-separated Playwright device names, e.g. 'iPhone 15,Pixel 7'; runs each persona per variant")
+    ap.add_argument("--matrix_geo", type=str, default="persona,default",
+                    help="Geo variants for --matrix_devices: persona (from persona.location) and/or default (New York)")
+    ap.add_argument("--repair_selectors", action="store_true",
+                    help="Try cached/role/case-insensitive/fuzzy repairs before logging selector_missing.")
+    ap.add_argument("--stuck_repeat", type=int, default=0, help="Stop after the same click/type N times in a row (0 = off).")
+    ap.add_argument("--stuck_misses", type=int, default=0, help="Stop after N consecutive selector misses/timeouts (0 = off).")
+    ap.add_argument("--stuck_no_change", type=int, default=0, help="Stop after N steps without a DOM change (0 = off).")
+    ap.add_argument("--plan_mode", action="store_true",
+                    help="Let the agent return a short guarded multi-action plan per LLM call.")
+    ap.add_argument("--plan_max", type=int, default=4)
+    ap.add_argument("--checkpoint_every", type=int, default=0,
+                    help="Checkpoint history/URL/storage state every N agent steps and resume from it after a crash (0 = off).")
+    ap.add_argument("--multi_tab", type=int, default=0,
+                    help="Allow an 'explore' action that evaluates up to N listings in parallel tabs (0/1 = off).")
+    ap.add_argument("--tab_steps", type=int, default=4, help="Max LLM steps per explored tab.")
+    ap.add_argument("--macro_cache", type=str, default=None,
+                    help="Macro cache JSON; re-mined at startup from --macro_runs and replayed before the model acts.")
+    ap.add_argument("--macro_runs", type=str, default="runs", help="Comma-separated run roots to mine macros from.")
+    ap.add_argument("--macro_min_conf", type=float, default=0.6)
+    ap.add_argument("--macro_min_support", type=int, default=2)
 
     ap.add_argument("--stop_markers", type=str, default="your cart,review order,review your order,cart subtotal,summary")
     ap.add_argument("--goto_timeout_ms", type=int, default=120000)
@@ -1378,6 +2887,10 @@ if __name__ == "__main__":
     ap.add_argument("--diversify_threshold", type=float, default=0.72)
     ap.add_argument("--diversify_retries", type=int, default=6)
     ap.add_argument("--ngram_n", type=int, default=4)
+    ap.add_argument("--rewrite_parallel", type=int, default=0,
+                    help="Speculative mode: issue K rewrite candidates concurrently and keep the least similar that passes.")
+    ap.add_argument("--rewrite_token_budget", type=int, default=0,
+                    help="Per-persona token cap for diversify rewrites (0 = unlimited).")
 
     ap.add_argument("--unique_minor_global", action="store_true")
     ap.add_argument("--min_unique_minor", type=int, default=3)
@@ -1391,6 +2904,31 @@ if __name__ == "__main__":
     ap.add_argument("--humanize", action="store_true")
 
     ap.add_argument("--concurrency", type=int, default=2)
+    ap.add_argument("--dashboard_port", type=int, default=0,
+                    help="Serve live progress (HTML + Server-Sent Events) on this local port (0 = off)")
+    ap.add_argument("--dashboard_host", type=str, default="127.0.0.1")
+    ap.add_argument("--dashboard_interval", type=float, default=1.0, help="Seconds between stats events")
+    ap.add_argument("--metrics_port", type=int, default=0,
+                    help="Serve Prometheus metrics on http://<metrics_host>:<port>/metrics (0 = off)")
+    ap.add_argument("--metrics_host", type=str, default="127.0.0.1")
+    ap.add_argument("--metrics_file", type=str, default=None,
+                    help="Also write metrics to this node_exporter textfile (atomic, every --metrics_interval s)")
+    ap.add_argument("--metrics_interval", type=float, default=15.0)
+    ap.add_argument("--profile", action="store_true",
+                    help="Profile the synchronous parts of analysis per persona and event-loop lag (<output>/_profile/)")
+    ap.add_argument("--profile_threshold_ms", type=float, default=50.0,
+                    help="Flag sync sections / loop lag above this many ms")
+    ap.add_argument("--profile_lag_interval_ms", type=float, default=50.0)
+    ap.add_argument("--budget_tokens", type=int, default=0, help="Run-wide LLM token budget (0 = none)")
+    ap.add_argument("--budget_usd", type=float, default=0.0, help="Run-wide dollar budget, priced by --model_prices")
+    ap.add_argument("--budget_wall_min", type=float, default=0.0, help="Run-wide wall-clock minutes")
+    ap.add_argument("--budget_browser_min", type=float, default=0.0, help="Summed browser-session minutes")
+    ap.add_argument("--stage_budgets", type=str, default=None,
+                    help='Per-stage limits, e.g. {"rewrite":{"tokens":200000},"analysis":{"usd":2}}')
+    ap.add_argument("--budget_soft", type=float, default=0.8,
+                    help="Budget fraction at which stages degrade (shorter history, 1 rewrite, pool suggestions)")
+    ap.add_argument("--model_prices", type=str, default=None,
+                    help='Override $/1M tokens, e.g. {"gpt-5-mini":[0.25,0.025,2.0]} (input, cached, output)')
     ap.add_argument("--seed", type=int, default=None)
 
     # axis suggestions
@@ -1399,6 +2937,8 @@ if __name__ == "__main__":
     ap.add_argument("--suggestions_model", type=str, default="gpt-5-mini")
     ap.add_argument("--suggestions_per_axis", type=int, default=30)
     ap.add_argument("--suggestions_temp", type=float, default=1.20)
+    ap.add_argument("--suggestion_bank", type=str, default=None,
+                    help="Pre-warmed bank from build_suggestion_bank.py; live generation only when an axis is exhausted.")
 
     # cooldowns
     ap.add_argument("--cooldown_max_per_phrase", type=int, default=1,
@@ -0,0 +1,237 @@
+"""
+Large-scale persona synthesis with a covering-array design.
+
+Factors: age band × income band × region × diet × accessibility (levels per condition follow
+generate_personas.py). A greedy (AETG-style) t-wise covering array is built once; personas are
+streamed by cycling its rows (shuffled per cycle, levels rotated per cycle), with concrete age/income/city
+drawn inside each level. Income bands are monthly amounts (INCOME_BANDS). Every full cycle covers all t-way
+level combinations, and after every L cycles a factor with L levels has equal counts per level; time and
+memory grow linearly with --count.
+
+Output is JSONL (one persona per line) plus <out>.coverage.json.
+
+Usage:
+  python synthesize_personas.py --condition diverse --count 100000 --strength 2 --out personas_diverse.jsonl
+  python synthesize_personas.py --condition diet --count 500 --strength 3 --seed 7
+"""
+import argparse, itertools, json, os, random, re, time
+from typing import Dict, Any, List, Tuple, Iterator
+
+import generate_personas as gp
+
+AGE_BANDS = {
+    "uniform": [(19, 21), (22, 24)],
+    "diet": [(19, 22), (23, 26), (27, 30)],
+    "diverse": [(18, 24), (25, 34), (35, 49), (50, 65)],
+}
+# monthly income bands (USD, upper bound exclusive); every band holds incomes in both lists
+INCOME_BANDS = [("<$600/mo", 0, 600), ("$600-999/mo", 600, 1000), ("$1,000+/mo", 1000, float("inf"))]
+WEEKS_PER_MONTH = 4.33
+ID_PREFIX = {"uniform": "U", "diet": "D", "diverse": "F"}
+VALIDATORS = {"uniform": gp.validate_uniform, "diet": gp.validate_diet, "diverse": gp.validate_diverse}
+
+def monthly_income(income: str) -> float:
+    """USD/month from "$900/mo", "$200/week" or "$18/h, 6h/wk"."""
+    amount = float(re.search(r"\$([\d,]+)", income).group(1).replace(",", ""))
+    hours = re.search(r"(\d+)\s*h/wk", income)
+    if "/h" in income and hours:
+        return amount * int(hours.group(1)) * WEEKS_PER_MONTH
+    if "/week" in income or "/wk" in income:
+        return amount * WEEKS_PER_MONTH
+    return amount
+
+def income_band(income: str) -> str:
+    m = monthly_income(income)
+    return next(name for name, lo, hi in INCOME_BANDS if lo <= m < hi)
+
+def design_factors(condition: str) -> Dict[str, Dict[str, Any]]:
+    """factor → {level name: payload}; payloads are what a persona draws from inside that level."""
+    incomes = gp.DIVERSE_INCOMES if condition == "diverse" else gp.STUDENT_INCOMES
+    bands: Dict[str, List[str]] = {name: [] for name, _, _ in INCOME_BANDS}
+    for inc in incomes:
+        bands[income_band(inc)].append(inc)
+    bands = {name: v for name, v in bands.items() if v}
+    if condition == "diverse":
+        regions = gp.locations_by_region(gp.WORLDWIDE, gp.REGIONS_WORLDWIDE)
+    else:
+        regions = gp.locations_by_region(gp.EAST_COAST, gp.REGIONS_EAST_COAST)
+    return {
+        "age": {f"{lo}-{hi}": (lo, hi) for lo, hi in AGE_BANDS[condition]},
+        "income": bands,
+        "region": regions,
+        "diet": {d: d for d in ({"uniform": ["none"], "diet": gp.DIETS_CYCLIC}.get(condition) or gp.DIETS_DIVERSE)},
+        "accessibility": {a: a for a in (gp.ACCESS_LIST_DIVERSE if condition == "diverse" else ["none"])},
+    }
+
+def covering_array(levels: List[int], t: int, rng: random.Random, candidates: int = 8) -> List[Tuple[int, ...]]:
+    """Greedy t-wise covering array: each row starts from an uncovered tuple and fills the other factors level by level."""
+    k = len(levels)
+    t = max(1, min(t, k))
+    combos = list(itertools.combinations(range(k), t))
+    uncovered = {c: set(itertools.product(*[range(levels[f]) for f in c])) for c in combos}
+    by_factor = {f: [c for c in combos if f in c] for f in range(k)}
+    remaining = sum(len(v) for v in uncovered.values())
+
+    def gain(row, f, lvl) -> int:
+        n = 0
+        for c in by_factor[f]:
+            if all(row[g] is not None or g == f for g in c):
+                if tuple(lvl if g == f else row[g] for g in c) in uncovered[c]:
+                    n += 1
+        return n
+
+    rows: List[Tuple[int, ...]] = []
+    used = [[0] * n for n in levels]  # ties go to the least-used level, so level counts stay even
+    while remaining:
+        c0 = max(combos, key=lambda c: len(uncovered[c]))
+        best, best_cov = None, -1
+        for seed_tup in itertools.islice(iter(uncovered[c0]), candidates):
+            row: List[Any] = [None] * k
+            for f, lvl in zip(c0, seed_tup):
+                row[f] = lvl
+            rest = [f for f in range(k) if row[f] is None]
+            rng.shuffle(rest)
+            for f in rest:
+                scores = [gain(row, f, lvl) for lvl in range(levels[f])]
+                tied = [lvl for lvl, sc in enumerate(scores) if sc == max(scores)]
+                fewest = min(used[f][lvl] for lvl in tied)
+                row[f] = rng.choice([lvl for lvl in tied if used[f][lvl] == fewest])
+            cov = sum(1 for c in combos if tuple(row[g] for g in c) in uncovered[c])
+            if cov > best_cov:
+                best, best_cov = tuple(row), cov
+        for c in combos:
+            tup = tuple(best[g] for g in c)
+            if tup in uncovered[c]:
+                uncovered[c].discard(tup); remaining -= 1
+        rows.append(best)
+        for f, lvl in enumerate(best):
+            used[f][lvl] += 1
+    return rows
+
+class CoverageTracker:
+    """t-way level combinations and per-level counts seen in the emitted personas."""
+
+    def __init__(self, levels: List[int], t: int):
+        self.t = max(1, min(t, len(levels)))
+        self.combos = list(itertools.combinations(range(len(levels)), self.t))
+        self.total = sum(len(list(itertools.product(*[range(levels[f]) for f in c]))) for c in self.combos)
+        self.seen = {c: set() for c in self.combos}
+        self.counts = [[0] * n for n in levels]
+
+    def add(self, row: Tuple[int, ...]):
+        for c in self.combos:
+            self.seen[c].add(tuple(row[g] for g in c))
+        for f, lvl in enumerate(row):
+            self.counts[f][lvl] += 1
+
+    def report(self, names: List[str], level_names: List[List[str]]) -> Dict[str, Any]:
+        covered = sum(len(v) for v in self.seen.values())
+        return {
+            "strength": self.t, "tuples_total": self.total, "tuples_covered": covered,
+            "coverage": round(covered / self.total, 6) if self.total else 1.0,
+            "levels": {n: dict(zip(level_names[i], self.counts[i])) for i, n in enumerate(names)},
+        }
+
+def stream_personas(condition: str, count: int, *, t: int, seed: int,
+                    tracker_out: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    factors = design_factors(condition)
+    names = list(factors)
+    level_names = [list(factors[n]) for n in names]
+    ca = covering_array([len(ln) for ln in level_names], t, rng)
+    tracker = CoverageTracker([len(ln) for ln in level_names], t)
+    tracker_out.update({"rows": len(ca), "tracker": tracker, "names": names, "level_names": level_names})
+    n = cycle = 0
+    while n < count:
+        order = list(range(len(ca)))
+        if n:
+            rng.shuffle(order)  # first cycle keeps greedy order: most new combinations first
+        for r in order:
+            if n >= count:
+                break
+            # relabelling a factor's levels keeps the array covering; rotating them per cycle evens out the counts
+            row = tuple((lvl + cycle) % len(level_names[f]) for f, lvl in enumerate(ca[r]))
+            lv = {name: level_names[f][row[f]] for f, name in enumerate(names)}
+            lo, hi = factors["age"][lv["age"]]
+            n += 1
+            tracker.add(row)
+            yield {
+                "id": gp.make_id(ID_PREFIX[condition], n),
+                "condition": condition,
+                "age": rng.randint(lo, hi),
+                "income": rng.choice(factors["income"][lv["income"]]),
+                "location": rng.choice(factors["region"][lv["region"]]),
+                "diet": lv["diet"],
+                "accessibility": lv["accessibility"],
+                "goal": "",
+            }
+        cycle += 1
+
+def main(args):
+    random.seed(args.seed)  # local_goal draws from the module RNG
+    out_path = args.out or f"personas_{args.condition}.jsonl"
+    source = os.path.basename(out_path)
+    used = (gp.GoalIndex.load(args.goal_index, args.dedup_threshold, replace=source)
+            if args.goal_index or args.exclude_from else set())
+    if args.exclude_from:
+        used.exclude_from(args.exclude_from)
+    if isinstance(used, gp.GoalIndex):
+        used.source = source
+    meta: Dict[str, Any] = {}
+    t0 = time.perf_counter()
+    written = 0
+    chunk: List[Dict[str, Any]] = []
+
+    def flush(fh, final: bool):
+        nonlocal written
+        if not chunk:
+            return
+        gp.assign_goals(chunk, used, batch_size=args.batch_size, concurrency=args.concurrency,
+                        rpm=args.rpm, rounds=args.goal_rounds)
+        # variety checks need a full chunk (or the whole output when it fits in one)
+        if len(chunk) == args.chunk or (final and written == 0):
+            VALIDATORS[args.condition](chunk)
+        fh.write("".join(json.dumps(p, ensure_ascii=False) + "\n" for p in chunk))
+        written += len(chunk)
+        chunk.clear()
+
+    with open(out_path, "w", encoding="utf-8") as fh:
+        for p in stream_personas(args.condition, args.count, t=args.strength, seed=args.seed, tracker_out=meta):
+            chunk.append(p)
+            if len(chunk) >= args.chunk:
+                flush(fh, False)
+        flush(fh, True)
+
+    rep = meta["tracker"].report(meta["names"], meta["level_names"])
+    rep.update({"condition": args.condition, "count": written, "array_rows": meta["rows"],
+                "full_cycles": written // meta["rows"], "seed": args.seed,
+                "elapsed_s": round(time.perf_counter() - t0, 2)})
+    cov_path = out_path.rsplit(".", 1)[0] + ".coverage.json"
+    with open(cov_path, "w", encoding="utf-8") as f:
+        json.dump(rep, f, ensure_ascii=False, indent=2)
+    print(f"{written} personas, {rep['array_rows']}-row {rep['strength']}-wise array, "
+          f"{100 * rep['coverage']:.1f}% of {rep['tuples_total']} combinations covered ({rep['elapsed_s']}s)")
+    for f, counts in rep["levels"].items():
+        vals = list(counts.values())
+        print(f"  {f:>13}: {len(vals)} levels, {min(vals)}–{max(vals)} personas each")
+    if isinstance(used, gp.GoalIndex):
+        print(f"Goal index: {used.loaded} loaded, {used.hits} near-duplicates rejected ({used.comparisons} comparisons)")
+        used.save()
+    print(f"✅ Saved {out_path} / {cov_path}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--condition", choices=["uniform","diet","diverse"], required=True)
+    ap.add_argument("--count", type=int, default=1000)
+    ap.add_argument("--strength", type=int, default=2, help="t-wise coverage (2 = pairwise)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=str, default=None, help="JSONL path (default: personas_<condition>.jsonl)")
+    ap.add_argument("--chunk", type=int, default=1000, help="Personas per goal/validation/write chunk")
+    ap.add_argument("--batch_size", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rpm", type=int, default=0)
+    ap.add_argument("--goal_rounds", type=int, default=2)
+    ap.add_argument("--goal_index", type=str, default=None, help="Shared goal index (see generate_personas.py)")
+    ap.add_argument("--dedup_threshold", type=float, default=0.8)
+    ap.add_argument("--exclude_from", "--exclude-from", nargs="*", default=[])
+    main(ap.parse_args())